@@ -0,0 +1,354 @@
+"""
+Genesis Frontier - Economy Benchmarks
+Throughput, latency percentiles and peak memory of the economy hot paths.
+
+    python bench_economy.py                          # full suite, JSON lines on stdout
+    python bench_economy.py --quick --output bench_output.txt
+    python bench_economy.py --only process_turn --engine vectorized
+
+Each result is one JSON object per line (see run_case for the fields), so
+runs can be diffed, plotted as scaling curves, or compared across engines.
+"""
+
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Sequence
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from resource_economy import (
+    PlanetState, EconomyManager, BuildingType, ConstructionQueue, BUILDING_ORDER, RESOURCE_ORDER,
+    create_building, percentile
+)
+from planet_batch import PlanetBatch
+from instrumentation import TurnInstruments
+from trade_network import TradeNetwork
+
+
+BUILDING_SIZES = (10, 100, 1_000, 10_000, 100_000)
+PLANET_SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+QUICK_LIMIT = 1_000
+
+# Buildings on each planet of the many-planet benchmarks
+BUILDINGS_PER_PLANET = 10
+
+# Trade routes out of each planet of the trade benchmarks, and the planets
+# whose balances drift by TRADE_DRIFT between incremental re-solves
+ROUTES_PER_PLANET = 3
+TRADE_CHANGES = 10
+TRADE_DRIFT = 1.1
+
+# An operation runs at least MIN_OPS times and then until `min_time`
+# seconds have passed or MAX_OPS runs are done. Operations quicker than
+# MIN_SAMPLE_NS are repeated within each timed sample, so clock overhead
+# does not swamp them; their latencies are per-run averages of a sample.
+MIN_OPS = 3
+MAX_OPS = 1000
+MIN_SAMPLE_NS = 20_000
+
+
+def make_planet(buildings: int, vectorized: bool = False, seed: int = 0, name: str = "Bench") -> PlanetState:
+    """A planet with `buildings` buildings of every type in turn, stocked for a long run."""
+    planet = PlanetState(name=name, seed=seed, population=1000, vectorized=vectorized)
+    for resource_type in planet.resources:
+        planet.resources[resource_type] = 1_000_000.0
+    planet.buildings.extend(
+        create_building(BUILDING_ORDER[i % len(BUILDING_ORDER)]) for i in range(buildings)
+    )
+    return planet
+
+
+# A setup takes (size, engine) and returns the operation to time
+Setup = Callable[[int, str], Callable[[], object]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    unit: str  # what `size` counts
+    sizes: Sequence[int]
+    engines: Sequence[str]
+    setup: Setup
+    # The operation returns its own elapsed nanoseconds, leaving out undo work
+    self_timed: bool = False
+
+
+def _process_turn(size: int, engine: str):
+    planet = make_planet(size, engine in ("vectorized", "scheduled"))
+    if engine == "instrumented":
+        TurnInstruments().attach([planet])
+    elif engine == "aggregated":
+        planet.aggregate_buildings()
+    elif engine == "scheduled":
+        planet.schedule_failures()
+    elif engine == "queued":
+        # As many builds again under construction, none due during the run
+        planet.construction_queue = ConstructionQueue()
+        planet.construction_queue.extend(
+            (create_building(BUILDING_ORDER[i % len(BUILDING_ORDER)]), 1 << 40) for i in range(size)
+        )
+    return planet.process_turn
+
+
+def _calculate_stability(size: int, engine: str):
+    return make_planet(size, engine == "vectorized").calculate_stability
+
+
+def _construct_building(size: int, engine: str):
+    planet = make_planet(size, engine == "vectorized")
+    stockpiles = list(planet.resources.amounts)
+
+    def construct():
+        building = create_building(BuildingType.FARM)
+        start = time.perf_counter_ns()
+        built, _ = planet.construct_building(building)
+        elapsed = time.perf_counter_ns() - start
+        # Undo, so every run sees the same planet
+        if built:
+            planet.buildings.pop()
+            planet.expansion_rate -= 1
+        planet.resources.amounts[:] = stockpiles
+        return elapsed
+
+    return construct
+
+
+def _create_building(size: int, engine: str):
+    building_types = list(BUILDING_ORDER)
+
+    def create():
+        for building_type in building_types:
+            create_building(building_type)
+
+    return create
+
+
+def _simulate_construction(size: int, engine: str):
+    # Only the cached engine keeps results between runs; the others recompute
+    planet = make_planet(size, engine == "vectorized")
+    if engine == "cached":
+        planet.track_changes()
+    manager = EconomyManager(planet, seed=0, simulation_cache_size=256 if engine == "cached" else 0)
+    return lambda: manager.simulate_construction(BuildingType.FACTORY)
+
+
+def _simulate_all(size: int, engine: str):
+    # The build menu: every building type, uncached
+    manager = EconomyManager(make_planet(size, False), seed=0, simulation_cache_size=0)
+    if engine == "table":
+        return manager.simulate_all_constructions
+    building_types = list(BUILDING_ORDER)
+
+    def simulate_each():
+        for building_type in building_types:
+            manager.simulate_construction(building_type)
+
+    return simulate_each
+
+
+def _optimal_build_order(size: int, engine: str):
+    manager = EconomyManager(make_planet(size, engine == "vectorized"), seed=0)
+    return lambda: manager.get_optimal_build_order(turns=10)
+
+
+def _plan_build_order(size: int, engine: str):
+    # Same horizon as get_optimal_build_order, at the default beam width
+    manager = EconomyManager(make_planet(size, engine == "vectorized"), seed=0)
+    return lambda: manager.plan_build_order(turns=10)
+
+
+def _planets_turn(size: int, engine: str):
+    planets = [
+        make_planet(BUILDINGS_PER_PLANET, engine == "vectorized", seed=i, name=f"Bench {i}")
+        for i in range(size)
+    ]
+    if engine == "batch":
+        return PlanetBatch(planets).process_turn
+
+    def process_all():
+        for planet in planets:
+            planet.process_turn()
+
+    return process_all
+
+
+def _trade_solve(size: int, engine: str):
+    # Planets scattered on a plane, trading with near neighbours in x order
+    rng = random.Random(0)
+    planets = [PlanetState(name=f"Bench {i}") for i in range(size)]
+    places = sorted((rng.random() * size, rng.random() * size) for _ in range(size))
+    balances = {
+        planet.name: [rng.uniform(-100.0, 100.0) for _ in RESOURCE_ORDER] for planet in planets
+    }
+
+    def network():
+        trade = TradeNetwork(planets, shortage_cost=size * 10, balance=lambda planet: balances[planet.name])
+        for i, ((x, y), planet) in enumerate(zip(places, planets)):
+            for j in range(i + 1, min(i + 1 + ROUTES_PER_PLANET, size)):
+                (x2, y2), other = places[j], planets[j]
+                trade.set_route(planet.name, other.name, ((x - x2) ** 2 + (y - y2) ** 2) ** 0.5)
+        return trade
+
+    if engine == "cold":
+        return lambda: network().solve()
+
+    trade = network()
+    trade.solve()
+    changed = itertools.count()
+
+    def resolve():
+        for _ in range(TRADE_CHANGES):
+            change = next(changed)
+            # Up on one pass over the planets, back down on the next
+            drift = TRADE_DRIFT if change // size % 2 == 0 else 1 / TRADE_DRIFT
+            balance = balances[planets[change % size].name]
+            balance[:] = [amount * drift for amount in balance]
+        return trade.solve()
+
+    return resolve
+
+
+PLANET_ENGINES = ("loop", "vectorized")
+
+BENCHMARKS = (
+    Benchmark("process_turn", "buildings", BUILDING_SIZES, PLANET_ENGINES + ("instrumented", "aggregated", "queued", "scheduled"),
+              _process_turn),
+    Benchmark("calculate_stability", "buildings", BUILDING_SIZES, PLANET_ENGINES, _calculate_stability),
+    Benchmark("construct_building", "buildings", BUILDING_SIZES, PLANET_ENGINES, _construct_building, True),
+    Benchmark("create_building", "buildings", (len(BUILDING_ORDER),), ("loop",), _create_building),
+    Benchmark("simulate_construction", "buildings", BUILDING_SIZES, PLANET_ENGINES + ("cached",),
+              _simulate_construction),
+    Benchmark("simulate_all_constructions", "buildings", BUILDING_SIZES[:1], ("loop", "table"), _simulate_all),
+    Benchmark("get_optimal_build_order", "buildings", BUILDING_SIZES, PLANET_ENGINES, _optimal_build_order),
+    Benchmark("plan_build_order", "buildings", BUILDING_SIZES, PLANET_ENGINES, _plan_build_order),
+    Benchmark("planets_process_turn", "planets", PLANET_SIZES, PLANET_ENGINES + ("batch",), _planets_turn),
+    # A cold solve of thousands of planets takes seconds; re-solves are what run every turn
+    Benchmark("trade_solve", "planets", PLANET_SIZES[:3], ("cold",), _trade_solve),
+    Benchmark("trade_resolve", "planets", PLANET_SIZES[:4], ("incremental",), _trade_solve),
+)
+
+
+def _calibrate(op: Callable[[], object]) -> int:
+    """Runs per timed sample needed to reach MIN_SAMPLE_NS."""
+    repeat = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(repeat):
+            op()
+        if time.perf_counter_ns() - start >= MIN_SAMPLE_NS or repeat >= 1 << 16:
+            return repeat
+        repeat *= 2
+
+
+def _time_ops(benchmark: Benchmark, op: Callable[[], object], min_time: float,
+              max_ops: int) -> tuple:
+    """(per-run latencies in nanoseconds, runs per sample)."""
+    repeat = 1 if benchmark.self_timed else _calibrate(op)
+    runs = range(repeat)
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < max_ops and (len(latencies) < MIN_OPS or time.perf_counter() < deadline):
+        if benchmark.self_timed:
+            latencies.append(op())
+            continue
+        start = time.perf_counter_ns()
+        for _ in runs:
+            op()
+        latencies.append((time.perf_counter_ns() - start) / repeat)
+    return latencies, repeat
+
+
+def _peak_memory(benchmark: Benchmark, size: int, engine: str) -> int:
+    """Peak bytes allocated by setup plus one run, traced separately from the timing."""
+    tracemalloc.start()
+    try:
+        op = benchmark.setup(size, engine)
+        op()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(benchmark: Benchmark, size: int, engine: str, min_time: float = 0.5,
+             max_ops: int = MAX_OPS, memory: bool = True) -> Dict:
+    """Time one benchmark at one size on one engine and return its result record."""
+    op = benchmark.setup(size, engine)
+    latencies, repeat = _time_ops(benchmark, op, min_time, max_ops)
+    latencies.sort()
+    total = sum(latencies) * repeat / 1e9
+    ops = len(latencies) * repeat
+    ops_per_second = ops / total if total > 0 else float("inf")
+    return {
+        "benchmark": benchmark.name,
+        "engine": engine,
+        "size": size,
+        "unit": benchmark.unit,
+        "ops": ops,
+        "runs_per_sample": repeat,
+        "seconds": total,
+        "ops_per_second": ops_per_second,
+        # Buildings or planets handled per second
+        "items_per_second": ops_per_second * size,
+        "latency_us": {
+            name: percentile(latencies, pct) / 1e3
+            for name, pct in (("min", 0), ("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+        },
+        "peak_memory_bytes": _peak_memory(benchmark, size, engine) if memory else None,
+        "python": platform.python_version(),
+    }
+
+
+def run_suite(benchmarks: Iterable[Benchmark] = BENCHMARKS, max_size: Optional[int] = None,
+              engines: Optional[Sequence[str]] = None, min_time: float = 0.5,
+              max_ops: int = MAX_OPS, memory: bool = True) -> Iterable[Dict]:
+    """Yield a result record per benchmark, engine and size (sizes above max_size skipped)."""
+    for benchmark in benchmarks:
+        for engine in benchmark.engines:
+            if engines is not None and engine not in engines:
+                continue
+            for size in benchmark.sizes:
+                if max_size is not None and size > max_size:
+                    continue
+                yield run_case(benchmark, size, engine, min_time, max_ops, memory)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the economy hot paths.")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"only sizes up to {QUICK_LIMIT:,} and shorter runs")
+    parser.add_argument("--max-size", type=int, help="skip sizes above this")
+    parser.add_argument("--only", action="append", metavar="BENCHMARK",
+                        choices=[b.name for b in BENCHMARKS], help="run only this benchmark (repeatable)")
+    parser.add_argument("--engine", action="append", help="run only this engine (repeatable)")
+    parser.add_argument("--min-time", type=float, help="seconds to keep repeating each case")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    max_size = args.max_size
+    if args.quick:
+        max_size = min(max_size or QUICK_LIMIT, QUICK_LIMIT)
+    min_time = args.min_time if args.min_time is not None else (0.1 if args.quick else 0.5)
+    benchmarks = [b for b in BENCHMARKS if args.only is None or b.name in args.only]
+
+    out = open(args.output, "a") if args.output else sys.stdout
+    try:
+        for record in run_suite(benchmarks, max_size, args.engine, min_time, memory=not args.no_memory):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            # Progress for people watching a file-bound run
+            if out is not sys.stdout:
+                print(f"{record['benchmark']:24s} {record['engine']:12s} {record['size']:>7,} "
+                      f"{record['ops_per_second']:>12,.1f} ops/s  p50 {record['latency_us']['p50']:,.1f} µs",
+                      file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
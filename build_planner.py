@@ -0,0 +1,367 @@
+"""
+Genesis Frontier - Build Planner
+Multi-turn build-order search over a compact planet state.
+"""
+
+from operator import add, ge, itemgetter, mul
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import heapq
+import math
+import time
+
+from resource_economy import (
+    PlanetState, BuildingType, ResourceType, BUILDING_ORDER, BUILDING_TEMPLATES,
+    RESOURCE_ORDER, compute_stability, efficiency_for_stability
+)
+
+
+# Value of one unit of each resource (rare minerals count double, as in
+# EconomyManager's payback estimates)
+RESOURCE_VALUES = tuple(2.0 if rt == ResourceType.RARE_MINERALS else 1.0 for rt in RESOURCE_ORDER)
+
+# Planner states are flat tuples: stockpiles, gross production and upkeep
+# (one slot per resource each), then strain, building count, expansion rate.
+# Flat tuples hash fast and constructing a building is one vector add.
+_N = len(RESOURCE_ORDER)
+STOCK = slice(0, _N)
+GROSS = slice(_N, 2 * _N)
+UPKEEP = slice(2 * _N, 3 * _N)
+STRAIN = 3 * _N
+BUILDINGS = 3 * _N + 1
+EXPANSION = 3 * _N + 2
+
+FOOD = ResourceType.FOOD.index
+ENERGY = ResourceType.ENERGY.index
+
+# Relative slack on candidate bounds, for rounding between a bound and the
+# value it bounds
+BOUND_SLACK = 1e-9
+
+
+def plan_state(planet: PlanetState) -> tuple:
+    """A planet's state in the planner's flat layout."""
+    return (
+        *(planet.resources[rt] for rt in RESOURCE_ORDER),
+        *planet._gross,
+        *planet._upkeep,
+        planet._strain,
+        planet._building_count(),
+        planet.expansion_rate,
+    )
+
+
+def _building_options() -> List[tuple]:
+    """
+    One option per building type: (type, stability cost, a getter for the
+    stockpiles it costs and the amounts, the state change of constructing
+    it, and the change it makes to a state's value: stock value, and gross
+    production and upkeep plus energy use valued per turn).
+    """
+    options = []
+    for building_type in BUILDING_ORDER:
+        spec = BUILDING_TEMPLATES[building_type].spec
+        paid = [(i, cost) for i, cost in enumerate(spec.cost_vector) if cost]
+        # Two entries at least, so the getter always returns a tuple
+        paid = (paid * 2)[:max(2, len(paid))] if paid else [(0, -math.inf)] * 2
+        costs = (itemgetter(*(i for i, _ in paid)), tuple(cost for _, cost in paid))
+        delta = (
+            *(-cost for cost in spec.cost_vector),
+            *spec.production_vector,
+            *spec.upkeep_vector,
+            spec.stability_cost, 1, 1.0,
+        )
+        value_terms = (
+            -sum(map(mul, RESOURCE_VALUES, spec.cost_vector)),
+            sum(map(mul, RESOURCE_VALUES, spec.production_vector)),
+            sum(map(mul, RESOURCE_VALUES, spec.upkeep_vector)) + RESOURCE_VALUES[ENERGY] * 10,
+        )
+        options.append((building_type, spec.stability_cost, costs, delta, value_terms))
+    return options
+
+
+# Template specs never change, so every planner shares one set of options
+_OPTIONS = _building_options()
+
+
+def _greedy_score(option: tuple) -> float:
+    """get_optimal_build_order's score: net value per turn less a risk penalty."""
+    spec = BUILDING_TEMPLATES[option[0]].spec
+    value_per_turn = sum(weight * (produced - upkept) for weight, produced, upkept
+                         in zip(RESOURCE_VALUES, spec.production_vector, spec.upkeep_vector))
+    return value_per_turn - spec.risk_factor * 10
+
+
+# The options greedy considers (scores above its starting best of -1),
+# best first; ties keep building order, as greedy's strict comparison does
+_GREEDY_OPTIONS = sorted((option for option in _OPTIONS if _greedy_score(option) > -1),
+                         key=_greedy_score, reverse=True)
+
+
+class StateInfo(NamedTuple):
+    """What the planner needs to know about a state, computed once per state."""
+    stability: float
+    efficiency: float
+    stock_value: float
+    production_value: float  # value of one turn of net production
+
+
+class BuildPlanner:
+    """
+    Searches build schedules for a planet several turns ahead.
+
+    A schedule has one entry per turn: the building type to construct that
+    turn (or None), followed by process_turn - the way examples.py plays out
+    get_optimal_build_order. Building failures do not move stockpiles, so
+    turns are simulated exactly on flat state tuples instead of planet copies.
+
+    Plans are scored by value(): the stockpiles plus `payoff_turns` turns of
+    the resulting net production. The search is a beam search; with a node
+    or time budget it is widened (1, 2, 4, ... up to beam_width) while the
+    budget lasts. The greedy plan is the starting incumbent, so the result is
+    never worse than get_optimal_build_order's.
+    """
+
+    def __init__(self, planet: PlanetState, min_stability: float = 40.0, payoff_turns: int = 10):
+        self.population = planet.population
+        self.debt = planet.debt
+        self.start = plan_state(planet)
+
+        # Same floor as the greedy planner, and never below what construct_building allows
+        self.min_stability = max(30.0, min_stability)
+        self.payoff_turns = payoff_turns
+
+        self._options = _OPTIONS
+        self._option = {option[0]: option for option in self._options}
+
+        # Transposition tables: evaluated states, buildable types per state,
+        # and the state each pre-turn state ends its turn in
+        self._info: Dict[tuple, StateInfo] = {}
+        self._buildable: Dict[tuple, List[tuple]] = {}
+        self._turn_ends: Dict[tuple, tuple] = {}
+        self.nodes = 0
+        self.cache_hits = 0
+
+    # ------------------------------------------------------------------
+    # Turn model
+
+    def info(self, state: tuple) -> StateInfo:
+        """Stability, efficiency and value terms of a state (cached)."""
+        info = self._info.get(state)
+        if info is not None:
+            self.cache_hits += 1
+            return info
+
+        self.nodes += 1
+        stability = compute_stability(
+            state[STRAIN], state[STOCK], self.debt, state[EXPANSION], self.population
+        )
+        efficiency = efficiency_for_stability(stability)
+        # Net production (less food and building energy), valued
+        production_value = (
+            efficiency * sum(map(mul, RESOURCE_VALUES, state[GROSS]))
+            - sum(map(mul, RESOURCE_VALUES, state[UPKEEP]))
+            - RESOURCE_VALUES[FOOD] * self.population * 0.5
+            - RESOURCE_VALUES[ENERGY] * state[BUILDINGS] * 10
+        )
+
+        info = self._info[state] = StateInfo(
+            stability=stability,
+            efficiency=efficiency,
+            stock_value=sum(map(mul, RESOURCE_VALUES, state[STOCK])),
+            production_value=production_value,
+        )
+        return info
+
+    def value(self, state: tuple, turns_left: int = 0) -> float:
+        """Stockpile value plus the value of net production until payoff."""
+        info = self.info(state)
+        return info.stock_value + (turns_left + self.payoff_turns) * info.production_value
+
+    def can_build(self, state: tuple, building_type: BuildingType,
+                  min_stability: Optional[float] = None) -> bool:
+        """construct_building's checks, with the planner's stability floor."""
+        floor = self.min_stability if min_stability is None else min_stability
+        return bool(self._allowed(state, floor, [self._option[building_type]]))
+
+    def buildable(self, state: tuple) -> List[BuildingType]:
+        """Building types the planner may construct from this state."""
+        return [option[0] for option in self._buildable_options(state)]
+
+    def _allowed(self, state: tuple, floor: float, options: List[tuple]) -> List[tuple]:
+        stability = self.info(state).stability
+        return [
+            option for option in options
+            if stability - option[1] >= floor and all(map(ge, option[2][0](state), option[2][1]))
+        ]
+
+    def _buildable_options(self, state: tuple) -> List[tuple]:
+        buildable = self._buildable.get(state)
+        if buildable is None:
+            buildable = self._buildable[state] = self._allowed(state, self.min_stability, self._options)
+        return buildable
+
+    def build(self, state: tuple, building_type: BuildingType, expansion: float = 1.0) -> tuple:
+        """State after constructing a building (costs paid, totals updated)."""
+        built = tuple(map(add, state, self._option[building_type][3]))
+        if expansion != 1.0:
+            built = built[:EXPANSION] + (state[EXPANSION] + expansion,)
+        return built
+
+    def end_turn(self, state: tuple) -> tuple:
+        """State after process_turn (cached)."""
+        ended = self._turn_ends.get(state)
+        if ended is not None:
+            return ended
+
+        efficiency = self.info(state).efficiency
+        stock = [amount + efficiency * produced - upkept
+                 for amount, produced, upkept in zip(state[STOCK], state[GROSS], state[UPKEEP])]
+
+        food_consumption = self.population * 0.5
+        if stock[FOOD] >= food_consumption:
+            stock[FOOD] -= food_consumption
+        energy_consumption = state[BUILDINGS] * 10
+        if stock[ENERGY] >= energy_consumption:
+            stock[ENERGY] -= energy_consumption
+
+        ended = self._turn_ends[state] = (
+            *stock, *state[_N:EXPANSION], state[EXPANSION] * 0.8
+        )
+        return ended
+
+    def step(self, state: tuple, action: Optional[BuildingType]) -> tuple:
+        """One scheduled turn: build `action` if construct_building allows it, then end the turn."""
+        if action is not None and self.can_build(state, action, min_stability=30.0):
+            state = self.build(state, action)
+        return self.end_turn(state)
+
+    def evaluate(self, schedule: Sequence[Optional[BuildingType]]) -> float:
+        """Value at the end of a schedule, as executed by construct_building + process_turn."""
+        state = self.start
+        for action in schedule:
+            state = self.step(state, action)
+        return self.value(state)
+
+    # ------------------------------------------------------------------
+    # Plans
+
+    def greedy_schedule(self, turns: int) -> List[Optional[BuildingType]]:
+        """
+        EconomyManager.get_optimal_build_order, replayed on the compact state.
+        Its list is played one building per turn, so the schedule is the
+        list padded with idle turns.
+        """
+        order = []
+        state = self.start
+        for _ in range(turns):
+            # The greedy planner checks only its own 40 stability floor
+            allowed = self._allowed(state, 40.0, _GREEDY_OPTIONS)
+            if allowed:
+                best_building = allowed[0][0]
+                order.append(best_building)
+                # The greedy simulation appends without counting expansion
+                state = self.build(state, best_building, expansion=0.0)
+            state = self.end_turn(state)
+
+        return order + [None] * (turns - len(order))
+
+    def search(self, turns: int, beam_width: int = 2, max_nodes: Optional[int] = None,
+               time_budget: Optional[float] = None) -> Dict:
+        """
+        Best schedule for the next `turns` turns within the budgets.
+        max_nodes limits newly evaluated states, time_budget is in seconds;
+        when either runs out the best complete plan so far is returned.
+        """
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        node_limit = self.nodes + max_nodes if max_nodes is not None else None
+
+        def exhausted() -> bool:
+            return ((node_limit is not None and self.nodes >= node_limit)
+                    or (deadline is not None and time.perf_counter() >= deadline))
+
+        greedy = self.greedy_schedule(turns)
+        greedy_value = self.evaluate(greedy)
+        best_schedule, best_value = greedy, greedy_value
+
+        # Without a budget go straight to the full width; with one, widen
+        # gradually so a good complete plan exists early
+        budgeted = max_nodes is not None or time_budget is not None
+        complete = True
+        width = 1 if budgeted else beam_width
+        while True:
+            beam, finished = self._beam_pass(turns, width, exhausted)
+            for state, schedule in beam:
+                # A finished pass built only what evaluate would, so its end states stand
+                value = self.value(state) if finished else self.evaluate(schedule)
+                if value > best_value:
+                    best_schedule, best_value = schedule, value
+            if not finished:
+                complete = False
+                break
+            if width >= beam_width:
+                break
+            width = min(width * 2, beam_width)
+
+        return {
+            "schedule": list(best_schedule),
+            "build_order": [bt for bt in best_schedule if bt is not None],
+            "value": best_value,
+            "greedy_value": greedy_value,
+            "nodes": self.nodes,
+            "cache_hits": self.cache_hits,
+            "complete": complete,
+        }
+
+    def _beam_pass(self, turns: int, width: int, exhausted) -> Tuple[List[Tuple[tuple, tuple]], bool]:
+        """
+        One beam search pass. Returns the (end state, schedule) pairs left in
+        the beam (schedules padded with idle turns if the budget ran out)
+        and whether the pass finished.
+
+        Candidates are ranked right after construction, before their turn is
+        simulated, so only the `width` survivors pay for end_turn. Building
+        never raises stability, so a candidate is worth at most its parent's
+        value plus its building's at the parent's efficiency; candidates are
+        evaluated best bound first, until no bound can beat the beam.
+        """
+        payoff_turns = self.payoff_turns
+        beam = [(self.start, ())]
+        for depth in range(turns):
+            turns_left = turns - depth
+            weight = turns_left + payoff_turns
+            bounds = []
+            for state, schedule in beam:
+                if exhausted():
+                    return [(state, schedule + (None,) * turns_left) for state, schedule in beam], False
+                info = self.info(state)
+                value = info.stock_value + weight * info.production_value
+                bounds.append((value, state, schedule, None))
+                efficiency = info.efficiency
+                for option in self._buildable_options(state):
+                    stock_value, gross_value, drain_value = option[4]
+                    bound = value + stock_value + weight * (efficiency * gross_value - drain_value)
+                    bounds.append((bound, state, schedule, option))
+            bounds.sort(key=itemgetter(0), reverse=True)
+
+            ranked: List[tuple] = []  # min-heap of (value, order, state, schedule)
+            seen = set()
+            for order, (bound, state, schedule, option) in enumerate(bounds):
+                if len(ranked) == width and bound < ranked[0][0] - BOUND_SLACK * abs(bound):
+                    break
+                if option is None:
+                    schedule += (None,)
+                else:
+                    state = tuple(map(add, state, option[3]))
+                    schedule += (option[0],)
+                # Schedules reaching the same state are interchangeable
+                if state in seen:
+                    continue
+                seen.add(state)
+                entry = (self.value(state, turns_left), -order, state, schedule)
+                if len(ranked) < width:
+                    heapq.heappush(ranked, entry)
+                elif entry > ranked[0]:
+                    heapq.heapreplace(ranked, entry)
+            ranked.sort(reverse=True)
+            beam = [(self.end_turn(state), schedule) for _, _, state, schedule in ranked]
+        return beam, True
@@ -0,0 +1,260 @@
+"""
+Genesis Frontier - Command Log
+Event-sourced planet history: an append-only log of state-changing calls
+with periodic checkpoints, for crash recovery and audit replays.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+import os
+import pickle
+import struct
+
+from resource_economy import PlanetState, ProductionBuilding
+from planet_save import template_key, template_spec
+
+
+# File layout: a 16-byte header, then records of
+#   kind (uint8), a (uint8), b (uint16), payload length (uint32), value (int64)
+# followed by `payload length` bytes (only checkpoints have a payload).
+#   TURN        value = the turn it starts (planet.turn after it)
+#   ADVANCE     value = number of turns (advance_turns)
+#   CONSTRUCT   a = building type ordinal, b = level
+#   UPGRADE     value = the building's position in planet.buildings
+#   CHECKPOINT  value = planet.turn, payload = the whole planet
+#   QUEUE       a = building type ordinal, b = level (queue_construction)
+#   CANCEL      value = the building's position in the construction queue
+# Events are written before the call they record runs. Replaying them from a
+# checkpoint repeats the calls exactly, since each planet draws from its own
+# random stream, saved with the checkpoint.
+MAGIC = b"GFCL"
+VERSION = 2  # version 1 logs have no QUEUE or CANCEL records
+HEADER = struct.Struct("<4sH10x")
+RECORD = struct.Struct("<BBHIq")
+
+TURN = 1
+ADVANCE = 2
+CONSTRUCT = 3
+UPGRADE = 4
+CHECKPOINT = 5
+QUEUE = 6
+CANCEL = 7
+KINDS = (TURN, ADVANCE, CONSTRUCT, UPGRADE, CHECKPOINT, QUEUE, CANCEL)
+
+
+class LogRecord(NamedTuple):
+    offset: int  # where the record starts in the file
+    kind: int
+    a: int
+    b: int
+    value: int
+    payload: bytes
+
+
+def read_records(path: str) -> Tuple[list, int]:
+    """
+    All complete records in a log, and the length of the file they cover
+    (a record torn by a crash is left out).
+    """
+    with open(path, "rb") as log_file:
+        data = log_file.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a command log")
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a command log")
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"{path}: unsupported command log version {version}")
+
+    records = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        kind, a, b, length, value = RECORD.unpack_from(data, offset)
+        end = offset + RECORD.size + length
+        if kind not in KINDS or end > len(data):
+            break
+        records.append(LogRecord(offset, kind, a, b, value, data[offset + RECORD.size:end]))
+        offset = end
+    return records, offset
+
+
+def _apply(planet: PlanetState, record: LogRecord):
+    """Repeat one recorded call on a planet without a log attached."""
+    if record.kind == TURN:
+        planet.process_turn()
+        if planet.turn != record.value:
+            raise ValueError(f"Replay diverged: reached turn {planet.turn}, log says {record.value}")
+    elif record.kind == ADVANCE:
+        planet.advance_turns(record.value)
+    elif record.kind == CONSTRUCT:
+        planet.construct_building(ProductionBuilding.from_spec(template_spec(record.a, record.b)))
+    elif record.kind == UPGRADE:
+        planet.buildings[record.value].upgrade()
+    elif record.kind == QUEUE:
+        planet.queue_construction(ProductionBuilding.from_spec(template_spec(record.a, record.b)))
+    elif record.kind == CANCEL:
+        _, building = list(planet.construction_queue)[record.value]
+        planet.cancel_construction(building)
+
+
+def _replay(records: list, turn: Optional[int] = None) -> PlanetState:
+    """
+    Planet after the records (or as soon as it reaches `turn`), from the
+    latest checkpoint that is not past `turn`.
+    """
+    start = None
+    for index, record in enumerate(records):
+        if record.kind == CHECKPOINT and (turn is None or record.value <= turn):
+            start = index
+    if start is None:
+        raise ValueError("Command log has no checkpoint to start from")
+
+    planet = pickle.loads(records[start].payload)
+    for record in records[start + 1:]:
+        if turn is not None and planet.turn >= turn:
+            break
+        _apply(planet, record)
+    return planet
+
+
+def replay(path: str, turn: Optional[int] = None) -> PlanetState:
+    """
+    Rebuild a logged planet as it was on reaching `turn` (default: after
+    the last recorded call), from the nearest earlier checkpoint. For
+    audits: the log is only read.
+    """
+    records, _ = read_records(path)
+    return _replay(records, turn)
+
+
+def _turns_after_checkpoint(records: list) -> int:
+    turns = 0
+    for record in reversed(records):
+        if record.kind == CHECKPOINT:
+            break
+        if record.kind == TURN:
+            turns += 1
+        elif record.kind == ADVANCE:
+            turns += record.value
+    return turns
+
+
+class CommandLog:
+    """
+    Append-only event log for one planet.
+
+    Attaching a log (CommandLog(path, planet)) makes the planet record each
+    process_turn, advance_turns, construct_building, queue_construction,
+    cancel_construction and building upgrade as a 16-byte event. Every `checkpoint_every` turns the whole planet is
+    written too, so recovery replays at most that many turns. Events are
+    fsynced in batches of `sync_every` (and at every checkpoint): a crash
+    loses at most the unsynced tail.
+
+    Other changes (editing stockpiles or the building list directly) are not
+    events; call checkpoint() after making them. As with planet saves, only
+    buildings made from templates can be constructed while logging.
+    """
+
+    def __init__(self, path: str, planet: PlanetState, checkpoint_every: int = 100,
+                 sync_every: int = 64):
+        """Start a new log for a planet, beginning with a checkpoint."""
+        self.path = path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.sync_every = max(1, sync_every)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION))
+        self._attach(planet)
+        self.checkpoint()
+
+    def _attach(self, planet: PlanetState):
+        self.planet = planet
+        self._unsynced = 0
+        self._turns_since_checkpoint = 0
+        planet.command_log = self
+
+    @classmethod
+    def recover(cls, path: str, checkpoint_every: int = 100, sync_every: int = 64) -> "CommandLog":
+        """
+        Reopen a log after a crash: rebuild its planet from the last
+        checkpoint and the events after it, drop any torn trailing record,
+        and keep logging to the same file. The planet is log.planet.
+        """
+        records, end = read_records(path)
+        planet = _replay(records)
+        log = cls.__new__(cls)
+        log.path = path
+        log.checkpoint_every = max(1, checkpoint_every)
+        log.sync_every = max(1, sync_every)
+        log._file = open(path, "r+b")
+        log._file.truncate(end)
+        log._file.seek(end)
+        log._attach(planet)
+        log._turns_since_checkpoint = _turns_after_checkpoint(records)
+        return log
+
+    # Recording (called by PlanetState and ProductionBuilding)
+
+    def _write(self, kind: int, a: int = 0, b: int = 0, value: int = 0, payload: bytes = b""):
+        self._file.write(RECORD.pack(kind, a, b, len(payload), value))
+        if payload:
+            self._file.write(payload)
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def _before_turns(self, turns: int):
+        if self._turns_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+        self._turns_since_checkpoint += turns
+
+    def record_turn(self, planet: PlanetState):
+        self._before_turns(1)
+        self._write(TURN, value=planet.turn + 1)
+
+    def record_advance(self, planet: PlanetState, turns: int):
+        self._before_turns(turns)
+        self._write(ADVANCE, value=turns)
+
+    def record_construction(self, planet: PlanetState, building: ProductionBuilding):
+        type_index, level = template_key(building.spec)
+        self._write(CONSTRUCT, type_index, level)
+
+    def record_queued_construction(self, planet: PlanetState, building: ProductionBuilding):
+        type_index, level = template_key(building.spec)
+        self._write(QUEUE, type_index, level)
+
+    def record_cancellation(self, planet: PlanetState, building: ProductionBuilding):
+        position = next(row for row, (_, queued) in enumerate(planet.construction_queue)
+                        if queued is building)
+        self._write(CANCEL, value=position)
+
+    def record_upgrade(self, planet: PlanetState, position: int):
+        self._write(UPGRADE, value=position)
+
+    # Durability
+
+    def checkpoint(self):
+        """Write the whole planet, so recovery can start here."""
+        self._write(CHECKPOINT, value=self.planet.turn, payload=pickle.dumps(self.planet, pickle.HIGHEST_PROTOCOL))
+        self._turns_since_checkpoint = 0
+        self.sync()
+
+    def sync(self):
+        """Flush and fsync everything written so far."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        """Sync, close the file and detach from the planet."""
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+        if self.planet.command_log is self:
+            self.planet.command_log = None
+
+    def __enter__(self) -> "CommandLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
@@ -0,0 +1,130 @@
+"""
+Genesis Frontier - Delta Publisher
+Per-turn planet updates for clients, sending only the report fields that changed.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from resource_economy import PlanetState
+
+
+class _Subscription:
+    """What one subscriber has of one planet."""
+    __slots__ = ("acked", "keyframe_turn", "pending")
+
+    def __init__(self):
+        self.acked: Optional[int] = None  # tracker epoch of the last acknowledged frame
+        self.keyframe_turn = 0
+        self.pending: Dict[int, int] = {}  # turn -> epoch of frames not yet acknowledged
+
+
+class DeltaPublisher:
+    """
+    Economic reports for many subscribers, sent as deltas.
+
+    Published planets track their own changes (PlanetState.track_changes),
+    so a subscriber's update holds only the report fields changed since the
+    last turn it acknowledged, found from the planet's dirty marks without
+    building or diffing full reports. Stockpiles are sent per resource; net
+    production is sent whole when any of it changes.
+
+    Each update is one frame per planet:
+        {"planet": name, "turn": turn, "keyframe": bool, "fields": {...}}
+    A keyframe's fields are the full get_economic_report(); a delta's are
+    the changed subset, to merge into the subscriber's copy (the
+    "resources" and "net_production" dicts merge key by key). Subscribers
+    get keyframes until they acknowledge one, and again every
+    `keyframe_interval` turns so a client that lost a frame recovers.
+    Planets with nothing new for a subscriber are left out.
+    """
+
+    def __init__(self, planets: Iterable[PlanetState] = (), keyframe_interval: int = 50):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.planets: Dict[str, PlanetState] = {}
+        self._subscriptions: Dict[Hashable, Dict[str, _Subscription]] = {}
+        self.keyframes = 0
+        self.deltas = 0
+        for planet in planets:
+            self.add_planet(planet)
+
+    # Planets and subscribers
+
+    def add_planet(self, planet: PlanetState):
+        """Publish a planet (this starts tracking its changes)."""
+        if planet.name in self.planets:
+            raise ValueError(f"Planet {planet.name!r} is already published")
+        planet.track_changes()
+        self.planets[planet.name] = planet
+
+    def remove_planet(self, name: str) -> PlanetState:
+        """Stop publishing a planet. It keeps tracking changes."""
+        planet = self.planets.pop(name)
+        for subscriptions in self._subscriptions.values():
+            subscriptions.pop(name, None)
+        return planet
+
+    def subscribe(self, subscriber: Hashable):
+        """Add a subscriber (any hashable id); its first updates are keyframes."""
+        self._subscriptions.setdefault(subscriber, {})
+
+    def unsubscribe(self, subscriber: Hashable):
+        self._subscriptions.pop(subscriber, None)
+
+    # Updates
+
+    def updates(self, subscriber: Hashable) -> List[Dict]:
+        """Frames bringing a subscriber up to date with every planet."""
+        subscriptions = self._subscriptions[subscriber]
+        frames = []
+        for name, planet in self.planets.items():
+            subscription = subscriptions.get(name)
+            if subscription is None:
+                subscription = subscriptions[name] = _Subscription()
+
+            tracker = planet._tracker
+            keyframe = (subscription.acked is None
+                        or planet.turn - subscription.keyframe_turn >= self.keyframe_interval)
+            if keyframe:
+                fields = planet.get_economic_report()
+            else:
+                fields = planet.get_report_changes(subscription.acked)
+                if not fields:
+                    continue
+
+            # This frame holds every change up to the epoch cut here
+            epoch = tracker.cut()
+            if keyframe:
+                subscription.keyframe_turn = planet.turn
+                subscription.pending = {planet.turn: epoch}
+                self.keyframes += 1
+            else:
+                # Acknowledging a turn covers its first frame, so later
+                # changes in the same turn are sent again
+                subscription.pending.setdefault(planet.turn, epoch)
+                self.deltas += 1
+            frames.append({"planet": name, "turn": planet.turn, "keyframe": keyframe, "fields": fields})
+        return frames
+
+    def publish(self) -> Dict[Hashable, List[Dict]]:
+        """Updates for every subscriber, e.g. once per tick."""
+        return {subscriber: self.updates(subscriber) for subscriber in self._subscriptions}
+
+    def acknowledge(self, subscriber: Hashable, planet: str, turn: int) -> bool:
+        """
+        Record that a subscriber applied the frame for `turn` of a planet, so
+        its next deltas start from there. Returns False for turns that were
+        not sent (or were superseded by a later keyframe).
+        """
+        subscription = self._subscriptions[subscriber].get(planet)
+        if subscription is None:
+            return False
+        epoch = subscription.pending.get(turn)
+        if epoch is None:
+            return False
+        if subscription.acked is None or epoch > subscription.acked:
+            subscription.acked = epoch
+        subscription.pending = {
+            pending_turn: pending_epoch
+            for pending_turn, pending_epoch in subscription.pending.items() if pending_turn > turn
+        }
+        return True
@@ -0,0 +1,369 @@
+"""
+Genesis Frontier - Economy Server
+Authoritative asyncio tick server for many planets behind a local JSON API.
+
+    python economy_server.py --port 8765 --tick 1.0
+
+    POST /command   {"command": "construct", "planet": "Kepler", "building": "farm"}
+    GET  /status
+
+Commands: "planets", "report", "simulate" and "trends" are answered at
+once; "construct" is queued and applied at the start of the next tick,
+before the turn, and answered then.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+
+from resource_economy import PlanetState, EconomyManager, BuildingType, create_building
+
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted
+MAX_BODY = 64 * 1024
+
+# Answered without waiting for a tick (they do not change any planet)
+READ_COMMANDS = ("planets", "report", "simulate", "trends")
+QUEUED_COMMANDS = ("construct",)
+
+HTTP_REASONS = {
+    200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 408: "Request Timeout", 413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class CommandError(ValueError):
+    """A command that cannot be carried out; `status` is its HTTP status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def json_safe(value):
+    """Replace infinities and NaN (not valid JSON) with None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+class EconomyServer:
+    """
+    Owns a registry of planets and advances them all once per tick.
+
+    Everything runs on one event loop: a tick is a synchronous step, so
+    commands never see a planet mid-turn, and client I/O never holds up a
+    tick. Planet-changing commands wait in a queue (at most `max_pending`)
+    until the next tick applies them in arrival order, or fail after
+    `request_timeout` seconds. If a tick raises, the tick loop stops and
+    queued and later changes fail with status 503; reads still work.
+    """
+
+    def __init__(self, tick_interval: float = 1.0, instruments=None,
+                 max_pending: int = 10_000, request_timeout: float = 10.0):
+        self.tick_interval = tick_interval
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        # Optional instrumentation.TurnInstruments shared by every planet
+        self.instruments = instruments
+        self.managers: Dict[str, EconomyManager] = {}
+        self.ticks = 0
+        self.overruns = 0  # ticks that started late because the last one overran
+        self._pending: Deque[Tuple[dict, asyncio.Future]] = deque()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._tick_error: Optional[BaseException] = None  # what stopped the tick loop
+
+    # Registry
+
+    def add_planet(self, planet: PlanetState, seed: Optional[int] = None) -> EconomyManager:
+        """Host a planet; names must be unique."""
+        if planet.name in self.managers:
+            raise ValueError(f"Planet {planet.name!r} is already hosted")
+        manager = EconomyManager(planet, seed=seed, instruments=self.instruments)
+        self.managers[planet.name] = manager
+        return manager
+
+    def remove_planet(self, name: str) -> EconomyManager:
+        """Stop hosting a planet."""
+        manager = self.managers.pop(name)
+        if manager.planet.instruments is self.instruments:
+            manager.planet.instruments = None
+        return manager
+
+    # Commands
+
+    def _manager(self, command: dict) -> EconomyManager:
+        name = command.get("planet")
+        if not isinstance(name, str):
+            raise CommandError("planet must be a planet name")
+        manager = self.managers.get(name)
+        if manager is None:
+            raise CommandError(f"Unknown planet {name!r}", 404)
+        return manager
+
+    @staticmethod
+    def _building_type(command: dict) -> BuildingType:
+        try:
+            return BuildingType(command.get("building"))
+        except ValueError:
+            raise CommandError(f"Unknown building {command.get('building')!r}") from None
+
+    def _check(self, command: dict) -> str:
+        """Validate a command up front, so bad ones fail without waiting for a tick."""
+        if not isinstance(command, dict):
+            raise CommandError("A command must be a JSON object")
+        kind = command.get("command")
+        if kind not in READ_COMMANDS and kind not in QUEUED_COMMANDS:
+            raise CommandError(f"Unknown command {kind!r}")
+        if kind != "planets":
+            self._manager(command)
+        if kind in ("simulate", "construct"):
+            self._building_type(command)
+        if kind == "trends":
+            turns = command.get("turns", 10)
+            if not isinstance(turns, int) or isinstance(turns, bool) or turns < 0:
+                raise CommandError("turns must be a non-negative integer")
+        return kind
+
+    def execute(self, command: dict) -> dict:
+        """Carry out any command right away (the tick loop uses this for queued ones)."""
+        kind = self._check(command)
+        if kind == "planets":
+            return {"planets": [
+                {"name": name, "turn": manager.planet.turn}
+                for name, manager in self.managers.items()
+            ]}
+
+        manager = self._manager(command)
+        planet = manager.planet
+        if kind == "report":
+            return planet.get_economic_report()
+        if kind == "trends":
+            return manager.get_economic_trends(command.get("turns", 10))
+        if kind == "simulate":
+            return manager.simulate_construction(self._building_type(command))
+
+        success, message = planet.construct_building(create_building(self._building_type(command)))
+        return {"success": success, "message": message, "turn": planet.turn}
+
+    async def submit(self, command: dict) -> dict:
+        """Answer a command: reads at once, changes after the next tick applies them."""
+        kind = self._check(command)
+        if kind in READ_COMMANDS:
+            return self.execute(command)
+        if self._tick_error is not None:
+            raise CommandError(f"Ticks have stopped: {self._tick_error!r}", 503)
+        if len(self._pending) >= self.max_pending:
+            raise CommandError("Command queue is full", 503)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((command, future))
+        try:
+            # On timeout the future is cancelled, and the tick skips it
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            raise CommandError("No tick applied the command in time", 503) from None
+
+    # Ticks
+
+    def tick(self):
+        """Apply the queued commands, then advance every planet one turn."""
+        pending, self._pending = self._pending, deque()
+        for command, future in pending:
+            if future.done():  # the client gave up
+                continue
+            try:
+                future.set_result(self.execute(command))
+            except CommandError as e:  # the planet went away while queued
+                future.set_exception(e)
+
+        for manager in self.managers.values():
+            manager.planet.process_turn()
+            manager.record_turn()
+        self.ticks += 1
+
+    async def run_ticks(self):
+        """Tick every tick_interval seconds, on a fixed schedule."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            self.tick()
+            deadline += self.tick_interval
+            delay = deadline - loop.time()
+            if delay < 0:
+                # Overran: start the next tick now rather than bursting to catch up
+                self.overruns += 1
+                deadline = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def _ticker_done(self, ticker: asyncio.Task):
+        # Ticks only end by stop() cancelling them, or by a tick raising
+        if ticker.cancelled() or ticker.exception() is None:
+            return
+        self._tick_error = ticker.exception()
+        logger.error("Tick loop stopped at tick %d", self.ticks, exc_info=self._tick_error)
+        pending, self._pending = self._pending, deque()
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(CommandError(f"Ticks have stopped: {self._tick_error!r}", 503))
+
+    def status(self) -> dict:
+        status = {
+            "ticks": self.ticks,
+            "tick_interval": self.tick_interval,
+            "overruns": self.overruns,
+            "planets": len(self.managers),
+            "pending_commands": len(self._pending),
+        }
+        if self._tick_error is not None:
+            status["tick_error"] = repr(self._tick_error)
+        if self.instruments is not None:
+            status["instruments"] = self.instruments.summary()
+        return status
+
+    # HTTP
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        """Start ticking and listening. Returns the asyncio server (port 0 picks a free port)."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self._tick_error = None
+        self._ticker = asyncio.create_task(self.run_ticks())
+        self._ticker.add_done_callback(self._ticker_done)
+        return self._server
+
+    async def stop(self):
+        """Stop ticking and listening; queued commands are cancelled."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass  # a failed tick, already logged by _ticker_done
+            self._ticker = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        pending, self._pending = self._pending, deque()
+        for _, future in pending:
+            future.cancel()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await self.start(host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One request per connection. A slow client only holds up its own
+        # connection, and is dropped once request_timeout passes.
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(self._read_request(reader), self.request_timeout)
+                status, payload = await self._route(method, path, body)
+            except asyncio.TimeoutError:
+                status, payload = 408, {"error": "Request timed out"}
+            except CommandError as e:
+                status, payload = e.status, {"error": str(e)}
+            writer.write(self._response(status, payload))
+            await asyncio.wait_for(writer.drain(), self.request_timeout)
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise CommandError("Request headers too large", 413) from None
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise CommandError("Malformed request line") from None
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise CommandError("Bad Content-Length") from None
+        if length > MAX_BODY:
+            raise CommandError("Request body too large", 413)
+        body = await reader.readexactly(length) if length > 0 else b""
+        return method, path.split("?", 1)[0], body
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Optional[dict]]:
+        if method == "OPTIONS":  # CORS preflight from browser clients
+            return 204, None
+        if path == "/status":
+            if method != "GET":
+                raise CommandError("Use GET /status", 405)
+            return 200, self.status()
+        if path == "/command":
+            if method != "POST":
+                raise CommandError("Use POST /command", 405)
+            try:
+                command = json.loads(body)
+            except ValueError:
+                raise CommandError("Body is not valid JSON") from None
+            return 200, await self.submit(command)
+        raise CommandError(f"No such endpoint {path}", 404)
+
+    @staticmethod
+    def _response(status: int, payload: Optional[dict]) -> bytes:
+        body = b"" if payload is None else json.dumps(json_safe(payload)).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+            "Connection: close",
+        ]
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the economy tick server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick", type=float, default=1.0, help="seconds per tick")
+    parser.add_argument("--planets", nargs="*", default=["Kepler-442b"], help="planet names to host")
+    parser.add_argument("--seed", type=int, help="seed the planets (planet i gets seed + i)")
+    args = parser.parse_args(argv)
+
+    server = EconomyServer(tick_interval=args.tick)
+    for index, name in enumerate(args.planets):
+        seed = None if args.seed is None else args.seed + index
+        server.add_planet(PlanetState(name=name, seed=seed), seed=seed)
+    print(f"Hosting {len(server.managers)} planet(s) on http://{args.host}:{args.port} "
+          f"({args.tick:g}s ticks)")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Genesis Frontier - History Log
+Append-only on-disk turn history with memory-mapped, zero-copy reads.
+"""
+
+from array import array
+from typing import Optional
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+from resource_economy import PlanetState, HISTORY_METRICS, HISTORY_COLUMNS, history_values
+
+
+# File layout: a 16-byte header, then one fixed-width record per turn with
+# every HISTORY_METRICS value as a native float64. Turn and building counts
+# are stored as floats too (exact below 2**53), so a record is a plain row
+# of doubles and any range of records can be viewed in place.
+MAGIC = b"GFHL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIB3x")  # magic, version, metrics, record size, little-endian
+METRIC_COUNT = len(HISTORY_METRICS)
+RECORD_SIZE = 8 * METRIC_COUNT
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _check_header(data: bytes, path: str):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a history log")
+    magic, version, metrics, record_size, little = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a history log")
+    if version != VERSION or metrics != METRIC_COUNT or record_size != RECORD_SIZE:
+        raise ValueError(f"{path}: unsupported history log layout (version {version})")
+    if bool(little) != LITTLE_ENDIAN:
+        raise ValueError(f"{path} was written with the other byte order")
+
+
+class HistoryLog:
+    """
+    Append-only history file for one planet.
+
+    record() buffers turns in memory and writes them with one file write
+    per `buffer_turns` turns; flush() and close() write whatever is left.
+    Opening an existing log appends to it.
+    """
+
+    def __init__(self, path: str, buffer_turns: int = 256):
+        self.path = path
+        self.buffer_turns = max(1, buffer_turns)
+        self._buffer = array("d")
+        self._file = open(path, "ab")
+        size = self._file.tell()
+        if size == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, METRIC_COUNT, RECORD_SIZE, LITTLE_ENDIAN))
+            return
+        
+        try:
+            with open(path, "rb") as existing:
+                _check_header(existing.read(HEADER.size), path)
+        except ValueError:
+            self._file.close()
+            raise
+        # Drop a partly written record left by an interrupted write
+        torn = (size - HEADER.size) % RECORD_SIZE
+        if torn:
+            self._file.truncate(size - torn)
+
+    def record(self, planet: PlanetState):
+        """Append the planet's current turn."""
+        self._buffer.extend(history_values(planet))
+        if len(self._buffer) >= self.buffer_turns * METRIC_COUNT:
+            self.flush()
+
+    def flush(self):
+        """Write buffered turns to the file."""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = array("d")
+        self._file.flush()
+
+    def close(self):
+        """Flush and close the file."""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> "HistoryLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HistoryLogReader:
+    """
+    Memory-mapped view of a history log.
+
+    records() and column() return memoryviews into the mapped file, so no
+    turn data is copied until it is read (numpy.asarray(view) wraps one
+    without copying too). The reader sees the turns flushed before it was
+    opened; release its views before closing it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as log_file:
+            size = os.fstat(log_file.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path} is not a history log")
+            self._map = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        _check_header(self._map[:HEADER.size], path)
+        # A partly written trailing record is ignored
+        self._count = (size - HEADER.size) // RECORD_SIZE
+        self._values = memoryview(self._map)[HEADER.size:HEADER.size + self._count * RECORD_SIZE].cast("d")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> memoryview:
+        """
+        Records start..stop-1 as a (records, metrics) view of floats, indexed
+        view[record, HISTORY_COLUMNS[metric]]. An empty range gives an empty
+        one-dimensional view.
+        """
+        start, stop, _ = slice(start, stop).indices(self._count)
+        rows = self._values[start * METRIC_COUNT:max(start, stop) * METRIC_COUNT]
+        if not rows:
+            return rows
+        return rows.cast("B").cast("d", (stop - start, METRIC_COUNT))
+
+    def column(self, metric: str, start: int = 0, stop: Optional[int] = None) -> memoryview:
+        """One metric over records start..stop-1, as a strided view."""
+        start, stop, _ = slice(start, stop).indices(self._count)
+        offset = HISTORY_COLUMNS[metric]
+        return self._values[start * METRIC_COUNT + offset:max(start, stop) * METRIC_COUNT:METRIC_COUNT]
+
+    def turn_range(self, first: int, last: int) -> memoryview:
+        """Records for turns first..last inclusive (turns are recorded in order)."""
+        turns = self.column("turn")
+        start = bisect.bisect_left(turns, first)
+        stop = bisect.bisect_right(turns, last)
+        turns.release()
+        return self.records(start, stop)
+
+    def close(self):
+        """Unmap the file. Views returned by the reader must be released first."""
+        self._values.release()
+        self._map.close()
+
+    def __enter__(self) -> "HistoryLogReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,101 @@
+"""
+Genesis Frontier - Turn Instrumentation
+Opt-in per-phase timings and counters for PlanetState.process_turn.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+from resource_economy import PlanetState, TurnSample, TURN_PHASES
+
+
+# A hook is called after every instrumented turn
+TurnHook = Callable[[PlanetState, TurnSample], None]
+
+
+class TurnInstruments:
+    """
+    Aggregated turn timings and counters for any number of planets.
+
+    Attach it to planets (attach(), EconomyManager(instruments=...) or
+    planet.instruments = ...) and their process_turn times each phase of
+    the turn: stability effects, production, risk rolls and consumption.
+    Planets without instruments pay a single attribute check per turn.
+    Turns that advance_turns applies in closed form are not timed.
+
+    Hooks are called with (planet, sample) after every turn, for exporting
+    samples or flagging slow ticks as they happen.
+    """
+
+    def __init__(self, hooks: Iterable[TurnHook] = ()):
+        self.hooks: List[TurnHook] = list(hooks)
+        self.reset()
+
+    def reset(self):
+        """Clear the aggregates (hooks and attached planets are kept)."""
+        self.turns = 0
+        self.phase_ns = [0] * len(TURN_PHASES)
+        self.phase_max_ns = [0] * len(TURN_PHASES)
+        self.buildings = 0
+        self.failures = 0
+        self.shortages = 0
+        # (planet name, sample) of the slowest turn seen
+        self.slowest: Optional[tuple] = None
+        self._slowest_ns = -1
+
+    def attach(self, planets: Iterable[PlanetState]):
+        """Instrument these planets' turns."""
+        for planet in planets:
+            planet.instruments = self
+
+    def detach(self, planets: Iterable[PlanetState]):
+        """Stop instrumenting these planets' turns."""
+        for planet in planets:
+            if planet.instruments is self:
+                planet.instruments = None
+
+    def record_turn(self, planet: PlanetState, sample: TurnSample):
+        """Add one turn (called by PlanetState.process_turn)."""
+        self.turns += 1
+        phases = sample[1:5]
+        phase_ns = self.phase_ns
+        phase_max_ns = self.phase_max_ns
+        for index, elapsed in enumerate(phases):
+            phase_ns[index] += elapsed
+            if elapsed > phase_max_ns[index]:
+                phase_max_ns[index] = elapsed
+        total = sum(phases)
+        if total > self._slowest_ns:
+            self._slowest_ns = total
+            self.slowest = (planet.name, sample)
+        self.buildings += sample.buildings
+        self.failures += sample.failures
+        self.shortages += sample.shortages
+
+        for hook in self.hooks:
+            hook(planet, sample)
+
+    def summary(self) -> Dict:
+        """Totals, per-turn means and maxima, in microseconds."""
+        turns = max(1, self.turns)
+        phases = {
+            phase: {
+                "total_us": total / 1e3,
+                "mean_us": total / turns / 1e3,
+                "max_us": most / 1e3,
+            }
+            for phase, total, most in zip(TURN_PHASES, self.phase_ns, self.phase_max_ns)
+        }
+        slowest = None
+        if self.slowest is not None:
+            name, sample = self.slowest
+            slowest = {"planet": name, "turn": sample.turn, "total_us": self._slowest_ns / 1e3}
+        return {
+            "turns": self.turns,
+            "total_us": sum(self.phase_ns) / 1e3,
+            "phases": phases,
+            "buildings": self.buildings,
+            "failures": self.failures,
+            "shortages": self.shortages,
+            "failure_rate": self.failures / self.buildings if self.buildings else 0.0,
+            "slowest": slowest,
+        }
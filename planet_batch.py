@@ -0,0 +1,291 @@
+"""
+Genesis Frontier - Planet Batches
+Lockstep simulation of many planets with their state held in shared columns.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator, List, Optional
+import copy
+import random
+
+from resource_economy import (
+    PlanetState, ProductionBuilding, ResourceType, BuildingTable,
+    RESOURCE_ORDER, compute_stability, efficiency_for_stability
+)
+
+
+class BatchResources(MutableMapping):
+    """Dict-like view of one planet's stockpiles inside a PlanetBatch."""
+
+    def __init__(self, batch: "PlanetBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    def __getitem__(self, resource_type: ResourceType) -> float:
+        try:
+            return self._batch.resources[resource_type.index][self._index]
+        except (AttributeError, TypeError):
+            raise KeyError(resource_type) from None
+
+    def __setitem__(self, resource_type: ResourceType, amount: float):
+        try:
+            self._batch.resources[resource_type.index][self._index] = amount
+        except (AttributeError, TypeError):
+            raise KeyError(resource_type) from None
+
+    def __delitem__(self, resource_type: ResourceType):
+        # Every planet in a batch tracks every resource; deleting empties it
+        self[resource_type] = 0.0
+
+    def get(self, resource_type: ResourceType, default=None):
+        try:
+            return self[resource_type]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[ResourceType]:
+        return iter(RESOURCE_ORDER)
+
+    def __len__(self) -> int:
+        return len(RESOURCE_ORDER)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+def _column_property(column: str, doc: str) -> property:
+    """Property reading and writing this planet's slot of a batch column."""
+    def get(self):
+        return getattr(self._batch, column)[self._index]
+
+    def set(self, value):
+        getattr(self._batch, column)[self._index] = value
+
+    return property(get, set, doc=doc)
+
+
+def _standalone_planet(state: dict) -> PlanetState:
+    """Unpickle a batch planet as a plain PlanetState."""
+    planet = PlanetState.__new__(PlanetState)
+    planet.__setstate__(state)
+    return planet
+
+
+class BatchPlanet(PlanetState):
+    """
+    PlanetState-compatible view of one planet in a PlanetBatch.
+
+    Scalar fields and stockpiles read and write the batch columns, so the
+    regular PlanetState methods (construct_building, get_economic_report,
+    ...) work unchanged on the shared state.
+    """
+
+    def __init__(self, batch: "PlanetBatch", index: int, buildings: Iterable[ProductionBuilding],
+                 seed: Optional[int] = None, rng: Optional[random.Random] = None):
+        self._batch = batch
+        self._index = index
+        self._table = BuildingTable()
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.buildings = buildings
+
+    name = _column_property("names", "Planet name")
+    stability = _column_property("stability", "Stability as of the last turn")
+    population = _column_property("population", "Population")
+    debt = _column_property("debt", "Outstanding debt")
+    expansion_rate = _column_property("expansion_rate", "Recent expansion rate")
+    turn = _column_property("turn", "Turn counter")
+
+    @property
+    def resources(self) -> BatchResources:
+        return BatchResources(self._batch, self._index)
+
+    @resources.setter
+    def resources(self, resources):
+        view = self.resources
+        for resource_type in RESOURCE_ORDER:
+            view[resource_type] = resources.get(resource_type, 0.0)
+
+    @property
+    def vectorized(self) -> bool:
+        # Batch planets always run on their building table
+        return True
+
+    def track_changes(self):
+        # PlanetBatch.process_turn writes the columns directly, past any tracking
+        raise TypeError("Batch planets cannot track changes; track a to_planet() copy instead")
+
+    def schedule_failures(self):
+        # PlanetBatch.process_turn rolls every planet's building table
+        raise TypeError("Batch planets cannot schedule failures")
+
+    def aggregate_buildings(self):
+        # PlanetBatch.process_turn rolls failures on each planet's building table
+        raise TypeError("Batch planets cannot aggregate buildings; aggregate a to_planet() copy instead")
+
+    def to_planet(self) -> PlanetState:
+        """Standalone copy of this planet, detached from the batch."""
+        planet = PlanetState(
+            name=self.name,
+            resources=dict(self.resources),
+            buildings=copy.deepcopy(list(self.buildings)),
+            stability=self.stability,
+            population=self.population,
+            debt=self.debt,
+            expansion_rate=self.expansion_rate,
+            turn=self.turn,
+            vectorized=True,
+            seed=self.seed,
+        )
+        planet.rng.setstate(self.rng.getstate())
+        if self.construction_queue is not None:
+            planet.construction_queue = self.construction_queue.copy()
+        return planet
+
+    def __reduce_ex__(self, protocol):
+        # Copies and pickles of a view are standalone planets
+        return _standalone_planet, (self.to_planet().__getstate__(),)
+
+
+class PlanetBatch:
+    """
+    Many planets advanced in lockstep.
+
+    Stockpiles, stability, population and the other per-planet scalars live
+    in one column per field (one column per resource for stockpiles), and
+    process_turn advances every planet in a single call. Each planet keeps
+    its own BuildingTable and running totals; per-planet building aggregates
+    are copied into the strain and building_count columns every turn.
+    """
+
+    def __init__(self, planets: Iterable[PlanetState] = ()):
+        self.names: List[str] = []
+        self.resources = [array("d") for _ in RESOURCE_ORDER]
+        self.stability = array("d")
+        self.population = array("q")
+        self.debt = array("d")
+        self.expansion_rate = array("d")
+        self.turn = array("q")
+
+        # Building aggregates
+        self.strain = array("d")
+        self.building_count = array("q")
+
+        self.planets: List[BatchPlanet] = []
+        for planet in planets:
+            self.add(planet)
+
+    def __len__(self) -> int:
+        return len(self.planets)
+
+    def __getitem__(self, index: int) -> BatchPlanet:
+        return self.planets[index]
+
+    def __iter__(self) -> Iterator[BatchPlanet]:
+        return iter(self.planets)
+
+    def add(self, planet: PlanetState) -> BatchPlanet:
+        """
+        Copy a planet's state into the batch and return its view.
+        The batch takes over the planet's buildings, construction queue,
+        random stream and command log, so keep using the returned view
+        rather than the original planet.
+        """
+        index = len(self.planets)
+        self.names.append(planet.name)
+        for column, resource_type in zip(self.resources, RESOURCE_ORDER):
+            column.append(planet.resources.get(resource_type, 0.0))
+        self.stability.append(planet.stability)
+        self.population.append(planet.population)
+        self.debt.append(planet.debt)
+        self.expansion_rate.append(planet.expansion_rate)
+        self.turn.append(planet.turn)
+        self.strain.append(0.0)
+        self.building_count.append(0)
+
+        buildings = list(planet.buildings)
+        planet.buildings = []  # release any table bindings on the original
+        view = BatchPlanet(self, index, buildings, seed=planet.seed, rng=planet.rng)
+        view.construction_queue = planet.construction_queue
+        log = planet.command_log
+        if log is not None:
+            # The log follows the planet into the batch
+            planet.command_log = None
+            view.command_log = log
+            log.planet = view
+        self.planets.append(view)
+        self._refresh_aggregates(index)
+        return view
+
+    def _refresh_aggregates(self, index: int):
+        planet = self.planets[index]
+        self.strain[index] = planet._strain
+        self.building_count[index] = len(planet.buildings)
+
+    def process_turn(self):
+        """
+        Advance every planet by one turn.
+
+        Applies the same rules as PlanetState.process_turn. Every planet
+        draws its risk rolls from its own random stream, so the result
+        matches ticking each planet on its own, in any order and however
+        the planets are split across batches or workers.
+        """
+        planets = self.planets
+        resources = self.resources
+
+        # Logged planets record the turn before it runs, as process_turn does
+        for planet in planets:
+            if planet.command_log is not None:
+                planet.command_log.record_turn(planet)
+
+        self.turn = array("q", [turn + 1 for turn in self.turn])
+
+        # Building aggregates
+        self.strain = array("d", [planet._strain for planet in planets])
+        self.building_count = array("q", [len(planet.buildings) for planet in planets])
+
+        # Stability (clamped) and the resulting efficiency tiers
+        self.stability = array("d", [
+            compute_stability(strain, stockpiles, debt, expansion_rate, population)
+            for strain, debt, expansion_rate, population, *stockpiles in zip(
+                self.strain, self.debt, self.expansion_rate, self.population, *resources
+            )
+        ])
+        efficiencies = [efficiency_for_stability(stability) for stability in self.stability]
+
+        # Production and risk rolls
+        for index, (planet, efficiency) in enumerate(zip(planets, efficiencies)):
+            planet._set_uniform_efficiency(efficiency)
+            for column, produced, upkept in zip(resources, planet._gross, planet._upkeep):
+                column[index] += efficiency * produced - upkept
+            planet._roll_table_failures()
+
+        # Population consumption: 0.5 food per person, only if it is in stock
+        food = resources[ResourceType.FOOD.index]
+        for index, population in enumerate(self.population):
+            consumption = population * 0.5
+            if food[index] >= consumption:
+                food[index] -= consumption
+
+        # Energy consumption: 10 per building, only if it is in stock
+        energy = resources[ResourceType.ENERGY.index]
+        for index, count in enumerate(self.building_count):
+            consumption = count * 10
+            if energy[index] >= consumption:
+                energy[index] -= consumption
+
+        # Expansion rate decays over time
+        self.expansion_rate = array("d", [rate * 0.8 for rate in self.expansion_rate])
+
+        # Queued construction due this turn
+        for index, planet in enumerate(planets):
+            due = planet.next_completion()
+            if due is not None and due <= planet.turn:
+                planet._complete_constructions()
+                self._refresh_aggregates(index)
+
+    def get_economic_reports(self) -> List[dict]:
+        """Economic report for every planet, in batch order."""
+        return [planet.get_economic_report() for planet in self.planets]
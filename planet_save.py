@@ -0,0 +1,380 @@
+"""
+Genesis Frontier - Planet Saves
+Compact, versioned binary save format for planets.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Tuple
+import gc
+import random
+import struct
+import sys
+
+import resource_economy
+from resource_economy import (
+    PlanetState, ProductionBuilding, BuildingSpec, BuildingCounts, ConstructionQueue, FailureSchedule,
+    ResourceStock, BUILDING_ORDER, BUILDING_TEMPLATES, RESOURCE_ORDER, get_building_spec
+)
+
+
+# File layout (all header fields little-endian):
+#   file header   magic, version, planet count
+#   per planet    record length, then:
+#     fields      flags, name and seed lengths, stability, population, debt,
+#                 expansion rate, turn, building count
+#     name        UTF-8
+#     seed        signed little-endian integer (if FLAG_SEED)
+#     totals      stockpiles, strain, gross production, upkeep, output (float64)
+#     buildings   type ordinals (uint8), levels (uint8), efficiencies (float64)
+#     random      Mersenne Twister state: 625 uint32 + gauss flag + float64
+#                 (if FLAG_RANDOM_STATE)
+#     queue       build count (uint32), then completion turns (int64), type
+#                 ordinals (uint8), levels (uint8) and efficiencies (float64)
+#                 in completion order (if FLAG_QUEUE)
+#     failures    scheduled count (uint32), then building rows (uint32) and
+#                 failure turns (int64) in failure order (if FLAG_FAILURES)
+# Building stats are not stored: each building is a template at a level,
+# resolved through get_building_spec on load.
+MAGIC = b"GFPS"
+VERSION = 4  # each version adds a flag: 2 FLAG_AGGREGATED, 3 FLAG_QUEUE, 4 FLAG_FAILURES
+FILE_HEADER = struct.Struct("<4sHI")
+RECORD_LENGTH = struct.Struct("<I")
+FIELDS = struct.Struct("<BHHdqddqI")
+RANDOM_EXTRA = struct.Struct("<Bd")
+QUEUE_LENGTH = struct.Struct("<I")
+SCHEDULE_LENGTH = struct.Struct("<I")
+
+FLAG_SEED = 1
+FLAG_RANDOM_STATE = 2
+FLAG_VECTORIZED = 4
+FLAG_AGGREGATED = 8  # buildings load as counts (PlanetState.aggregate_buildings)
+FLAG_QUEUE = 16  # has buildings under construction (PlanetState.queue_construction)
+FLAG_FAILURES = 32  # failures are scheduled (PlanetState.schedule_failures)
+
+# Flags each version can set; a reader must not skip sections it cannot read
+VERSION_FLAGS = {1: FLAG_SEED | FLAG_RANDOM_STATE | FLAG_VECTORIZED}
+VERSION_FLAGS[2] = VERSION_FLAGS[1] | FLAG_AGGREGATED
+VERSION_FLAGS[3] = VERSION_FLAGS[2] | FLAG_QUEUE
+VERSION_FLAGS[4] = VERSION_FLAGS[3] | FLAG_FAILURES
+
+_N = len(RESOURCE_ORDER)
+TOTALS = 4 * _N + 1  # stockpiles, strain, gross, upkeep, output
+MT_WORDS = 625
+SWAP = sys.byteorder != "little"
+
+# Template specs by (type ordinal, level), filled on demand
+_specs: Dict[Tuple[int, int], BuildingSpec] = {}
+
+
+def template_spec(type_index: int, level: int) -> BuildingSpec:
+    """Shared template spec for a building type ordinal and level."""
+    spec = _specs.get((type_index, level))
+    if spec is None:
+        if type_index >= len(BUILDING_ORDER):
+            raise ValueError(f"Unknown building type ordinal {type_index}")
+        building_type = BUILDING_ORDER[type_index]
+        if not 1 <= level <= BUILDING_TEMPLATES[building_type].max_level:
+            raise ValueError(f"Invalid level {level} for {building_type.name}")
+        spec = _specs[(type_index, level)] = get_building_spec(building_type, level)
+    return spec
+
+
+def template_key(spec: BuildingSpec) -> Tuple[int, int]:
+    """(type ordinal, level) of a template spec; other specs cannot be saved."""
+    key = (spec.type.index, spec.level)
+    template = template_spec(*key)
+    if template is not spec and template.__reduce__() != spec.__reduce__():
+        raise ValueError(f"{spec.name}: only buildings made from templates can be saved")
+    return key
+
+
+def _little(column: array) -> bytes:
+    if SWAP:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _column(typecode: str, data, count: int, offset: int) -> Tuple[array, int]:
+    column = array(typecode)
+    end = offset + count * column.itemsize
+    if end > len(data):
+        raise ValueError("Truncated planet save")
+    column.frombytes(data[offset:end])
+    if SWAP:
+        column.byteswap()
+    return column, end
+
+
+class SavedBuildings:
+    """
+    A loaded planet's building columns, turned into buildings on first use.
+
+    Lazily loaded planets share these like a fork shares its base planet's
+    buildings (see PlanetState.fork), so turns, construction and reports
+    work without creating a building object per building.
+    """
+    _forks = None  # never changes, so never has to release forks
+
+    def __init__(self, types: array, levels: array, efficiency: array):
+        self.types = types
+        self.levels = levels
+        self.efficiency = efficiency
+
+    def _building_count(self) -> int:
+        return len(self.types)
+
+    def _spec_at(self, row: int) -> BuildingSpec:
+        return template_spec(self.types[row], self.levels[row])
+
+    def _risk_column(self) -> array:
+        return array("d", [template_spec(t, level).risk_factor for t, level in zip(self.types, self.levels)])
+
+    def _copy_buildings(self) -> List[ProductionBuilding]:
+        return [
+            ProductionBuilding.from_spec(template_spec(t, level), efficiency)
+            for t, level, efficiency in zip(self.types, self.levels, self.efficiency)
+        ]
+
+
+def _building_columns(planet: PlanetState) -> Tuple[array, array, array]:
+    """Type ordinals, levels and efficiencies of a planet's buildings."""
+    base = planet._fork_base
+    if isinstance(base, SavedBuildings):
+        # Lazily loaded and not expanded yet: reuse the loaded columns
+        types, levels = array("B", base.types), array("B", base.levels)
+        if planet._fork_efficiency is None:
+            efficiency = array("d", base.efficiency)
+        else:
+            efficiency = array("d", [planet._fork_efficiency]) * len(types)
+            for row in planet._fork_failed:
+                efficiency[row] *= 0.5
+        buildings = planet._fork_added
+    elif planet.aggregated:
+        # One building per count, grouped
+        types, levels, efficiency = array("B"), array("B"), array("d")
+        for (spec, spec_efficiency), count in planet._fork_base.counts.items():
+            type_index, level = template_key(spec)
+            types.extend(array("B", [type_index]) * count)
+            levels.extend(array("B", [level]) * count)
+            efficiency.extend(array("d", [spec_efficiency]) * count)
+        buildings = ()
+    else:
+        types, levels, efficiency = array("B"), array("B"), array("d")
+        buildings = planet.buildings
+
+    keys: Dict[int, Tuple[int, int]] = {}
+    for building in buildings:
+        spec = building.spec
+        key = keys.get(id(spec))
+        if key is None:
+            key = keys[id(spec)] = template_key(spec)
+        types.append(key[0])
+        levels.append(key[1])
+        efficiency.append(building.production_efficiency)
+    return types, levels, efficiency
+
+
+def _pack_planet(planet: PlanetState, random_state: bool) -> bytes:
+    types, levels, efficiency = _building_columns(planet)
+    name = planet.name.encode("utf-8")
+    seed = b""
+    flags = FLAG_VECTORIZED if planet.vectorized else 0
+    if planet.seed is not None:
+        if not isinstance(planet.seed, int):
+            raise ValueError(f"{planet.name}: only integer seeds can be saved")
+        flags |= FLAG_SEED
+        seed = planet.seed.to_bytes(planet.seed.bit_length() // 8 + 1, "little", signed=True)
+    if random_state:
+        flags |= FLAG_RANDOM_STATE
+    if planet.aggregated:
+        flags |= FLAG_AGGREGATED
+    queued = list(planet.construction_queue or ())
+    if queued:
+        flags |= FLAG_QUEUE
+    if planet.failures_scheduled:
+        flags |= FLAG_FAILURES
+
+    parts = [
+        FIELDS.pack(
+            flags, len(name), len(seed), planet.stability, planet.population,
+            planet.debt, planet.expansion_rate, planet.turn, len(types),
+        ),
+        name,
+        seed,
+        _little(array("d", [
+            *(planet.resources[rt] for rt in RESOURCE_ORDER),
+            planet._strain, *planet._gross, *planet._upkeep, *planet._output,
+        ])),
+        _little(types),
+        _little(levels),
+        _little(efficiency),
+    ]
+    if random_state:
+        _, words, gauss = planet.rng.getstate()
+        parts.append(_little(array("I", words)))
+        parts.append(RANDOM_EXTRA.pack(gauss is not None, gauss or 0.0))
+    if queued:
+        keys = [template_key(building.spec) for _, building in queued]
+        parts.append(QUEUE_LENGTH.pack(len(queued)))
+        parts.append(_little(array("q", [turn for turn, _ in queued])))
+        parts.append(_little(array("B", [type_index for type_index, _ in keys])))
+        parts.append(_little(array("B", [level for _, level in keys])))
+        parts.append(_little(array("d", [building.production_efficiency for _, building in queued])))
+    if planet.failures_scheduled:
+        rows = {id(building): row for row, building in enumerate(planet.buildings)}
+        scheduled = list(planet._failures)
+        parts.append(SCHEDULE_LENGTH.pack(len(scheduled)))
+        parts.append(_little(array("I", [rows[id(building)] for _, building in scheduled])))
+        parts.append(_little(array("q", [turn for turn, _ in scheduled])))
+    return b"".join(parts)
+
+
+def _unpack_planet(data: memoryview, lazy: bool, known_flags: int) -> PlanetState:
+    offset = 0
+    (flags, name_length, seed_length, stability, population, debt,
+     expansion_rate, turn, count) = FIELDS.unpack_from(data, offset)
+    if flags & ~known_flags:
+        raise ValueError(f"Unknown planet save flags {flags & ~known_flags:#x}")
+    offset += FIELDS.size
+    name = bytes(data[offset:offset + name_length]).decode("utf-8")
+    offset += name_length
+    seed = None
+    if flags & FLAG_SEED:
+        seed = int.from_bytes(data[offset:offset + seed_length], "little", signed=True)
+    offset += seed_length
+    totals, offset = _column("d", data, TOTALS, offset)
+    types, offset = _column("B", data, count, offset)
+    levels, offset = _column("B", data, count, offset)
+    efficiency, offset = _column("d", data, count, offset)
+
+    # Restored field by field (as PlanetState.fork does): the dataclass
+    # constructor would build a building list and totals only to replace them
+    planet = PlanetState.__new__(PlanetState)
+    planet.name = name
+    stock = ResourceStock()
+    stock.amounts = totals[:_N].tolist()
+    planet.resources = stock
+    planet.stability = stability
+    planet.population = population
+    planet.debt = debt
+    planet.expansion_rate = expansion_rate
+    planet.turn = turn
+    planet.vectorized = bool(flags & FLAG_VECTORIZED)
+    planet.seed = seed
+    if flags & FLAG_RANDOM_STATE:
+        words, offset = _column("I", data, MT_WORDS, offset)
+        has_gauss, gauss = RANDOM_EXTRA.unpack_from(data, offset)
+        planet.rng = random.Random.__new__(random.Random)
+        planet.rng.setstate((3, tuple(words), gauss if has_gauss else None))
+        offset += RANDOM_EXTRA.size
+    else:
+        planet.rng = random.Random(seed)
+    if flags & FLAG_QUEUE:
+        (queued,) = QUEUE_LENGTH.unpack_from(data, offset)
+        offset += QUEUE_LENGTH.size
+        turns, offset = _column("q", data, queued, offset)
+        queue_types, offset = _column("B", data, queued, offset)
+        queue_levels, offset = _column("B", data, queued, offset)
+        queue_efficiency, offset = _column("d", data, queued, offset)
+        planet.construction_queue = ConstructionQueue()
+        planet.construction_queue.extend(
+            (ProductionBuilding.from_spec(template_spec(type_index, level), spec_efficiency), turn)
+            for turn, type_index, level, spec_efficiency
+            in zip(turns, queue_types, queue_levels, queue_efficiency)
+        )
+    if flags & FLAG_FAILURES:
+        (scheduled,) = SCHEDULE_LENGTH.unpack_from(data, offset)
+        offset += SCHEDULE_LENGTH.size
+        failure_rows, offset = _column("I", data, scheduled, offset)
+        failure_turns, offset = _column("q", data, scheduled, offset)
+
+    planet._strain = totals[_N]
+    planet._gross = totals[_N + 1:2 * _N + 1].tolist()
+    planet._upkeep = totals[2 * _N + 1:3 * _N + 1].tolist()
+    planet._output = totals[3 * _N + 1:].tolist()
+    if flags & FLAG_AGGREGATED:
+        counts = BuildingCounts()
+        for type_index, level, spec_efficiency in zip(types, levels, efficiency):
+            counts.add(template_spec(type_index, level), spec_efficiency)
+        planet._share_buildings(counts)
+        if resource_economy.DEBUG_AGGREGATES:
+            planet.verify_aggregates()
+        return planet
+    planet._share_buildings(SavedBuildings(types, levels, efficiency))
+    if flags & FLAG_FAILURES:
+        # The schedule refers to building objects, so these load eagerly
+        planet._own_buildings()
+        buildings = planet.buildings
+        planet._failures = FailureSchedule()
+        planet._failures.extend((buildings[row], turn) for row, turn in zip(failure_rows, failure_turns))
+    elif not lazy:
+        planet._own_buildings()
+    # Expanded buildings keep the saved totals, as lazy ones do; debug runs
+    # check them (a lazy load would have to expand its buildings to check)
+    if resource_economy.DEBUG_AGGREGATES and planet._fork_base is None:
+        planet.verify_aggregates()
+    return planet
+
+
+def dumps(planets: Iterable[PlanetState], random_state: bool = True) -> bytes:
+    """
+    Save planets to bytes. With random_state=False the random streams are
+    left out (about 2.5 KB per planet); loaded planets then restart their
+    stream from the seed.
+    """
+    records = [_pack_planet(planet, random_state) for planet in planets]
+    parts = [FILE_HEADER.pack(MAGIC, VERSION, len(records))]
+    for record in records:
+        parts.append(RECORD_LENGTH.pack(len(record)))
+        parts.append(record)
+    return b"".join(parts)
+
+
+def loads(data: bytes, lazy: bool = False) -> List[PlanetState]:
+    """
+    Load planets saved by dumps(). With lazy=True buildings stay packed
+    until a planet's building list is first used; turns, construction and
+    reports work on the packed buildings. Aggregated planets load aggregated,
+    and planets with scheduled failures load eagerly.
+    """
+    data = memoryview(data)
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("Not a planet save")
+    magic, version, count = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a planet save")
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"Unsupported planet save version {version}")
+    known_flags = VERSION_FLAGS[version]
+
+    planets = []
+    offset = FILE_HEADER.size
+    # Loading only creates objects that are kept, so pause the cycle
+    # collector instead of letting it rescan them every few hundred planets
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(count):
+            (length,) = RECORD_LENGTH.unpack_from(data, offset)
+            offset += RECORD_LENGTH.size
+            planets.append(_unpack_planet(data[offset:offset + length], lazy, known_flags))
+            offset += length
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Truncated or corrupt planet save: {e}") from None
+    finally:
+        if collecting:
+            gc.enable()
+    return planets
+
+
+def save(path: str, planets: Iterable[PlanetState], random_state: bool = True):
+    """Save planets to a file (see dumps)."""
+    with open(path, "wb") as save_file:
+        save_file.write(dumps(planets, random_state))
+
+
+def load(path: str, lazy: bool = False) -> List[PlanetState]:
+    """Load planets from a file (see loads)."""
+    with open(path, "rb") as save_file:
+        return loads(save_file.read(), lazy)
@@ -4,9 +4,20 @@ A planetary management MMO resource economy with risk-reward mechanics.
 """
 
 from enum import Enum
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field, fields, replace
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from array import array
+from operator import attrgetter, lt, mul, sub
+import copy
+import heapq
+import itertools
 import math
+import random
+import time
+import weakref
 
 
 class ResourceType(Enum):
@@ -16,6 +27,10 @@ class ResourceType(Enum):
     RARE_MINERALS = "rare_minerals"
     ENERGY = "energy"
     MANUFACTURED_GOODS = "manufactured_goods"
+    
+    def __init__(self, value):
+        # Dense ordinal for array-backed storage; an attribute read, not a hash
+        self.index = len(type(self).__members__)
 
 
 class BuildingType(Enum):
@@ -33,6 +48,238 @@ class BuildingType(Enum):
     DEEP_CORE_EXTRACTOR = "deep_core_extractor"
     FUSION_REACTOR = "fusion_reactor"
     ADVANCED_FACTORY = "advanced_factory"
+    
+    def __init__(self, value):
+        # Dense ordinal for array-backed storage
+        self.index = len(type(self).__members__)
+
+
+# Check PlanetState's running totals against a full recompute on every use
+DEBUG_AGGREGATES = False
+
+# Dense ordinals used by the array-backed code paths (same as .index)
+RESOURCE_ORDER = tuple(ResourceType)
+RESOURCE_INDEX = {rt: rt.index for rt in RESOURCE_ORDER}
+BUILDING_ORDER = tuple(BuildingType)
+BUILDING_INDEX = {bt: bt.index for bt in BUILDING_ORDER}
+
+
+# Risk rolls are uniform 32-bit draws: a building fails when draw < risk * RISK_SCALE
+RISK_SCALE = 2.0 ** 32
+
+
+def draw_risk_rolls(rng: random.Random, count: int) -> array:
+    """
+    Draw count independent uniform 32-bit risk rolls with a single
+    getrandbits call. The byte order is fixed, so a seed gives the same
+    rolls on every platform.
+    """
+    if count <= 0:
+        return array("I")
+    return array("I", rng.getrandbits(32 * count).to_bytes(4 * count, "little"))
+
+
+def skip_risk_rolls(rng: random.Random, count: int):
+    """
+    Advance rng past count risk rolls without evaluating them, leaving it
+    where count draws from draw_risk_rolls would.
+    """
+    while count > 0:
+        chunk = min(count, 1 << 20)  # bound the temporary integer to 4 MB
+        rng.getrandbits(32 * chunk)
+        count -= chunk
+
+
+def binomial_variate(rng: random.Random, n: int, p: float) -> int:
+    """
+    Number of successes in n trials of probability p, in O(1) expected
+    time for any n: inversion for small means, otherwise Hormann's BTRS
+    (transformed rejection with squeeze), as in Python 3.12's
+    random.binomialvariate. Kept here so a seed gives the same draws on
+    every Python version.
+    """
+    if n <= 0 or p <= 0.0:
+        return 0
+    if p >= 1.0:
+        return n
+    if p > 0.5:
+        return n - binomial_variate(rng, n, 1.0 - p)
+    
+    uniform = rng.random
+    if n * p < 10.0:
+        # Inversion: geometric gaps between successes
+        successes = trials = 0
+        log_q = math.log2(1.0 - p)
+        if not log_q:
+            return 0
+        while True:
+            trials += math.floor(math.log2(1.0 - uniform()) / log_q) + 1
+            if trials > n:
+                return successes
+            successes += 1
+    
+    spq = math.sqrt(n * p * (1.0 - p))
+    b = 1.15 + 2.53 * spq
+    a = -0.0873 + 0.0248 * b + 0.01 * p
+    c = n * p + 0.5
+    vr = 0.92 - 4.2 / b
+    alpha = lpq = mode = h = None
+    while True:
+        u = uniform() - 0.5
+        us = 0.5 - abs(u)
+        k = math.floor((2.0 * a / us + b) * u + c)
+        if k < 0 or k > n:
+            continue
+        v = uniform()
+        if us >= 0.07 and v <= vr:
+            return k
+        if alpha is None:
+            alpha = (2.83 + 5.1 / b) * spq
+            lpq = math.log(p / (1.0 - p))
+            mode = math.floor((n + 1) * p)
+            h = math.lgamma(mode + 1) + math.lgamma(n - mode + 1)
+        v *= alpha / (a / (us * us) + b)
+        if v > 0 and math.log(v) <= h - math.lgamma(k + 1) - math.lgamma(n - k + 1) + (k - mode) * lpq:
+            return k
+
+
+def geometric_variate(rng: random.Random, p: float) -> Optional[int]:
+    """
+    Number of trials of probability p up to and including the first
+    success (at least 1), by inversion. None when p is too small to ever
+    succeed.
+    """
+    if p >= 1.0:
+        return 1
+    log_q = math.log2(1.0 - p) if p > 0.0 else 0.0
+    if not log_q:
+        return None
+    return math.floor(math.log2(1.0 - rng.random()) / log_q) + 1
+
+
+def resource_vector(amounts: Mapping[ResourceType, float]) -> tuple:
+    """Dense tuple of amounts indexed by ResourceType.index."""
+    vector = [0.0] * len(RESOURCE_ORDER)
+    for resource_type, amount in amounts.items():
+        vector[resource_type.index] = amount
+    return tuple(vector)
+
+
+class ResourceStock(MutableMapping):
+    """
+    Resource stockpiles as a fixed-length list indexed by ResourceType.index.
+    
+    Dict-like, so existing code keeps using planet.resources[...]; every
+    resource type is always present (missing ones read as 0.0).
+    """
+    __slots__ = ("amounts",)
+    
+    def __init__(self, amounts: Optional[Mapping[ResourceType, float]] = None):
+        self.amounts = [0.0] * len(RESOURCE_ORDER)
+        if amounts:
+            for resource_type, amount in amounts.items():
+                self[resource_type] = amount
+    
+    def __getitem__(self, resource_type: ResourceType) -> float:
+        # Any key that is not a ResourceType (even a str, which has .index) is missing
+        try:
+            return self.amounts[resource_type.index]
+        except (AttributeError, TypeError):
+            raise KeyError(resource_type) from None
+    
+    def __setitem__(self, resource_type: ResourceType, amount: float):
+        try:
+            self.amounts[resource_type.index] = amount
+        except (AttributeError, TypeError):
+            raise KeyError(resource_type) from None
+    
+    def __delitem__(self, resource_type: ResourceType):
+        self[resource_type] = 0.0
+    
+    def get(self, resource_type: ResourceType, default=None):
+        try:
+            return self.amounts[resource_type.index]
+        except (AttributeError, TypeError):
+            return default
+    
+    def __iter__(self):
+        return iter(RESOURCE_ORDER)
+    
+    def __len__(self) -> int:
+        return len(RESOURCE_ORDER)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
+    
+    def __reduce__(self):
+        return (ResourceStock, (dict(self),))
+
+
+# Report fields tracked by ChangeTracker besides the stockpiles, which are
+# tracked per resource
+TRACKED_FIELDS = ("turn", "stability", "population", "buildings", "expansion_rate", "debt",
+                  "net_production")
+
+
+class ChangeTracker:
+    """
+    Dirty flags for one planet's report fields (see PlanetState.track_changes).
+
+    Every change is stamped with the current epoch. cut() closes the epoch,
+    so after cutting epoch E, changed_since(E) names exactly the fields
+    changed since then, however many readers share the tracker. `version`
+    counts changes, so it moves whenever any tracked field does.
+    """
+    __slots__ = ("epoch", "stamps", "resource_stamps", "version")
+
+    def __init__(self):
+        # Everything counts as changed in the first epoch
+        self.epoch = 1
+        self.stamps = dict.fromkeys(TRACKED_FIELDS, 1)
+        self.resource_stamps = [1] * len(RESOURCE_ORDER)
+        self.version = 0
+
+    def mark(self, field_name: str):
+        self.stamps[field_name] = self.epoch
+        self.version += 1
+
+    def mark_resource(self, index: int):
+        self.resource_stamps[index] = self.epoch
+        self.version += 1
+
+    def cut(self) -> int:
+        """Close the current epoch and return it."""
+        epoch = self.epoch
+        self.epoch += 1
+        return epoch
+
+    def changed_since(self, epoch: int) -> Tuple[List[str], List[ResourceType]]:
+        """Fields and resources changed after `epoch` was cut."""
+        fields_changed = [name for name, stamp in self.stamps.items() if stamp > epoch]
+        resources_changed = [
+            resource_type for resource_type, stamp in zip(RESOURCE_ORDER, self.resource_stamps)
+            if stamp > epoch
+        ]
+        return fields_changed, resources_changed
+
+
+class TrackedResourceStock(ResourceStock):
+    """ResourceStock that marks changed stockpiles on a ChangeTracker."""
+    __slots__ = ("tracker",)
+
+    def __init__(self, amounts: Mapping[ResourceType, float], tracker: ChangeTracker):
+        self.tracker = tracker
+        super().__init__(amounts)
+
+    def __setitem__(self, resource_type: ResourceType, amount: float):
+        try:
+            index = resource_type.index
+            changed = self.amounts[index] != amount
+        except (AttributeError, TypeError):
+            raise KeyError(resource_type) from None
+        if changed:
+            self.amounts[index] = amount
+            self.tracker.mark_resource(index)
 
 
 @dataclass
@@ -52,47 +299,162 @@ class Resource:
         raise ValueError("Cannot subtract resources of different types")
 
 
-@dataclass
-class ProductionBuilding:
+@dataclass(frozen=True, eq=False)
+class BuildingSpec:
     """
-    Represents a production building with costs, outputs, and upkeep.
+    Immutable stats shared by every building of one type at one level.
+    
+    Specs are flyweights: all Farms at level 1 point at the same spec, and
+    upgrade() moves a building to the (also shared) next-level spec.
     """
     type: BuildingType
     name: str
     description: str
+    construction_costs: Mapping[ResourceType, float]
+    construction_time: int
+    produces: Mapping[ResourceType, float]
+    upkeep_costs: Mapping[ResourceType, float] = field(default_factory=dict)
+    stability_cost: float = 0.0
+    risk_factor: float = 0.0
+    level: int = 1
+    max_level: int = 5
     
-    # Construction costs
-    construction_costs: Dict[ResourceType, float]
-    construction_time: int  # in game turns/cycles
+    def __post_init__(self):
+        # Read-only views so a shared spec cannot be edited through one building
+        for name in ("construction_costs", "produces", "upkeep_costs"):
+            object.__setattr__(self, name, MappingProxyType(dict(getattr(self, name))))
+        
+        # Dense per-resource vectors (indexed by ResourceType.index) for hot loops
+        object.__setattr__(self, "cost_vector", resource_vector(self.construction_costs))
+        object.__setattr__(self, "production_vector", resource_vector(self.produces))
+        object.__setattr__(self, "upkeep_vector", resource_vector(self.upkeep_costs))
+        
+        # (resource type, produced, upkept) for each resource this building touches
+        touched = list(self.produces) + [rt for rt in self.upkeep_costs if rt not in self.produces]
+        object.__setattr__(self, "net_terms", tuple(
+            (rt, self.produces.get(rt, 0.0), self.upkeep_costs.get(rt, 0.0)) for rt in touched
+        ))
     
-    # Production
-    produces: Dict[ResourceType, float]  # per turn
-    production_efficiency: float = 1.0  # 0.0 to 1.0
+    def upgraded(self) -> "BuildingSpec":
+        """Spec for the next level, built once and then shared."""
+        upgraded = self.__dict__.get("_upgraded")
+        if upgraded is None:
+            upgraded = replace(
+                self,
+                # Production +25%, upkeep +20%, stability cost +15% per level
+                produces={rt: amount * 1.25 for rt, amount in self.produces.items()},
+                upkeep_costs={rt: amount * 1.20 for rt, amount in self.upkeep_costs.items()},
+                stability_cost=self.stability_cost * 1.15,
+                level=self.level + 1,
+            )
+            object.__setattr__(self, "_upgraded", upgraded)
+        return upgraded
     
-    # Upkeep costs per turn
-    upkeep_costs: Dict[ResourceType, float] = field(default_factory=dict)
+    def __copy__(self):
+        return self
     
-    # Stability impact
-    stability_cost: float = 0.0  # how much this building strains the planet
-    risk_factor: float = 0.0  # risk of failure/accident
+    def __deepcopy__(self, memo):
+        return self
     
-    # Level and upgrades
-    level: int = 1
-    max_level: int = 5
+    def __reduce__(self):
+        # Dataclass fields only; the cached upgrade chain is rebuilt on demand
+        values = [getattr(self, f.name) for f in fields(self)]
+        for i, value in enumerate(values):
+            if isinstance(value, MappingProxyType):
+                values[i] = dict(value)
+        return (BuildingSpec, tuple(values))
+
+
+def _spec_property(name: str, doc: str) -> property:
+    """Building attribute served by its spec; assigning gives the building its own spec."""
+    def get(self):
+        return getattr(self.spec, name)
+    
+    def set(self, value):
+        self._replace_spec(replace(self.spec, **{name: value}))
+    
+    return property(get, set, doc=doc)
+
+
+_building_ids = itertools.count(1)
+
+
+class ProductionBuilding:
+    """
+    Represents a production building with costs, outputs, and upkeep.
+    
+    Stats come from a shared BuildingSpec; the instance itself only holds
+    its spec, production efficiency and id.
+    """
+    __slots__ = ("spec", "_efficiency", "id", "_owner", "_table", "_row")
+    
+    def __init__(
+        self,
+        type: BuildingType,
+        name: str,
+        description: str,
+        construction_costs: Dict[ResourceType, float],
+        construction_time: int,  # in game turns/cycles
+        produces: Dict[ResourceType, float],  # per turn
+        production_efficiency: float = 1.0,  # 0.0 to 1.0
+        upkeep_costs: Optional[Dict[ResourceType, float]] = None,
+        stability_cost: float = 0.0,  # how much this building strains the planet
+        risk_factor: float = 0.0,  # risk of failure/accident
+        level: int = 1,
+        max_level: int = 5,
+    ):
+        self.spec = BuildingSpec(
+            type=type,
+            name=name,
+            description=description,
+            construction_costs=construction_costs,
+            construction_time=construction_time,
+            produces=produces,
+            upkeep_costs=upkeep_costs or {},
+            stability_cost=stability_cost,
+            risk_factor=risk_factor,
+            level=level,
+            max_level=max_level,
+        )
+        self._efficiency = production_efficiency
+        self.id = next(_building_ids)
+        self._detach()
+    
+    @classmethod
+    def from_spec(cls, spec: BuildingSpec, production_efficiency: float = 1.0) -> "ProductionBuilding":
+        """Create a building on an existing (shared) spec."""
+        building = cls.__new__(cls)
+        building.spec = spec
+        building._efficiency = production_efficiency
+        building.id = next(_building_ids)
+        building._detach()
+        return building
+    
+    def _detach(self):
+        # Not on any planet (_owner) or in any building table (_table/_row)
+        self._owner = None
+        self._table = None
+        self._row = -1
+    
+    type = _spec_property("type", "Building type")
+    name = _spec_property("name", "Display name")
+    description = _spec_property("description", "Description")
+    construction_costs = _spec_property("construction_costs", "Construction costs")
+    construction_time = _spec_property("construction_time", "Construction time in turns")
+    produces = _spec_property("produces", "Production per turn")
+    upkeep_costs = _spec_property("upkeep_costs", "Upkeep costs per turn")
+    stability_cost = _spec_property("stability_cost", "How much this building strains the planet")
+    risk_factor = _spec_property("risk_factor", "Risk of failure/accident per turn")
+    level = _spec_property("level", "Current level")
+    max_level = _spec_property("max_level", "Highest reachable level")
     
     def get_net_production(self) -> Dict[ResourceType, float]:
         """Calculate net production after upkeep costs."""
-        net = {}
-        
-        # Add production
-        for resource_type, amount in self.produces.items():
-            net[resource_type] = amount * self.production_efficiency
-        
-        # Subtract upkeep
-        for resource_type, amount in self.upkeep_costs.items():
-            net[resource_type] = net.get(resource_type, 0) - amount
-        
-        return net
+        efficiency = self.production_efficiency
+        return {
+            resource_type: produced * efficiency - upkept
+            for resource_type, produced, upkept in self.spec.net_terms
+        }
     
     def get_total_construction_cost(self) -> float:
         """Get total construction cost as a single value (for comparison)."""
@@ -114,19 +476,730 @@ class ProductionBuilding:
         if self.level >= self.max_level:
             return False
         
-        self.level += 1
-        # Increase production by 25% per level
-        for resource_type in self.produces:
-            self.produces[resource_type] *= 1.25
-        
-        # Increase upkeep by 20% per level
-        for resource_type in self.upkeep_costs:
-            self.upkeep_costs[resource_type] *= 1.20
+        owner = self._owner
+        if owner is not None and owner.command_log is not None:
+            owner.command_log.record_upgrade(owner, owner._building_position(self))
+        self._replace_spec(self.spec.upgraded())
+        return True
+    
+    def _replace_spec(self, spec: BuildingSpec):
+        """Switch to another spec, keeping the owning planet in step."""
+        owner = self._owner
+        if owner is not None:
+            owner._untrack_building(self)
         
-        # Increase stability cost slightly
-        self.stability_cost *= 1.15
+        risk_factor = self.spec.risk_factor
+        self.spec = spec
         
+        # Keep the owning planet's running totals and building table in step
+        if owner is not None:
+            owner._track_building(self)
+            if spec.risk_factor != risk_factor:
+                owner._risk_changed(self)
+        if self._table is not None:
+            self._table.refresh(self)
+    
+    @property
+    def production_efficiency(self) -> float:
+        """Current production efficiency (0.0 to 1.1)."""
+        if self._table is not None:
+            return self._table.efficiency[self._row]
+        return self._efficiency
+    
+    @production_efficiency.setter
+    def production_efficiency(self, value: float):
+        if self._owner is not None:
+            self._owner._efficiency_changed(self, self.production_efficiency, value)
+        if self._table is not None:
+            self._table.efficiency[self._row] = value
+        else:
+            self._efficiency = value
+    
+    def _key(self) -> tuple:
+        spec = self.spec
+        return (
+            spec.type, spec.name, spec.description, dict(spec.construction_costs),
+            spec.construction_time, dict(spec.produces), self.production_efficiency,
+            dict(spec.upkeep_costs), spec.stability_cost, spec.risk_factor,
+            spec.level, spec.max_level,
+        )
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key() == other._key()
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (
+            f"ProductionBuilding(type={self.type!r}, name={self.name!r}, "
+            f"level={self.level}, production_efficiency={self.production_efficiency!r}, "
+            f"id={self.id})"
+        )
+    
+    def __getstate__(self):
+        # Copies and pickles never carry the planet or table binding along
+        return {
+            "spec": self.spec,
+            "_efficiency": self.production_efficiency,
+            "id": self.id,
+        }
+    
+    def __setstate__(self, state):
+        self.spec = state["spec"]
+        self._efficiency = state["_efficiency"]
+        self.id = state["id"]
+        self._detach()
+    
+    def __copy__(self):
+        clone = ProductionBuilding.from_spec(self.spec, self.production_efficiency)
+        clone.id = self.id
+        return clone
+    
+    def __deepcopy__(self, memo):
+        # Specs are immutable and shared, so a deep copy is as cheap as a shallow one
+        return self.__copy__()
+
+
+class BuildingTable:
+    """
+    Structure-of-arrays view of a planet's buildings.
+    
+    Each building occupies one row; per-resource production and upkeep are
+    stored as one column per ResourceType so a turn reduces to a handful of
+    column sums instead of a dict per building.
+    """
+    
+    def __init__(self, buildings: Iterable[ProductionBuilding] = ()):
+        self.rows: List[ProductionBuilding] = []
+        self.types = array("B")
+        self.levels = array("B")
+        self.efficiency = array("d")
+        self.stability_cost = array("d")
+        self.risk_factor = array("d")
+        self.production = [array("d") for _ in RESOURCE_ORDER]
+        self.upkeep = [array("d") for _ in RESOURCE_ORDER]
+        for building in buildings:
+            self.append(building)
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def append(self, building: ProductionBuilding):
+        """Add a building as a new row and bind it to the table."""
+        efficiency = building.production_efficiency
+        if building._table is not None:
+            raise ValueError(f"{building.name} already belongs to a building table")
+        building._table = self
+        building._row = len(self.rows)
+        self.rows.append(building)
+        spec = building.spec
+        self.types.append(spec.type.index)
+        self.levels.append(spec.level)
+        self.efficiency.append(efficiency)
+        self.stability_cost.append(spec.stability_cost)
+        self.risk_factor.append(spec.risk_factor)
+        for column, amount in zip(self.production, spec.production_vector):
+            column.append(amount)
+        for column, amount in zip(self.upkeep, spec.upkeep_vector):
+            column.append(amount)
+    
+    def _columns(self) -> List[array]:
+        return [self.types, self.levels, self.efficiency, self.stability_cost,
+                self.risk_factor] + self.production + self.upkeep
+    
+    def _detach(self, building: ProductionBuilding):
+        building._efficiency = self.efficiency[building._row]
+        building._table = None
+        building._row = -1
+    
+    def remove(self, building: ProductionBuilding):
+        """
+        Remove a building's row. The rows after it move up one, so rows stay
+        in building list order and risk rolls keep drawing in that order.
+        """
+        row = building._row
+        self._detach(building)
+        for column in self._columns():
+            del column[row]
+        del self.rows[row]
+        for moved in itertools.islice(self.rows, row, None):
+            moved._row -= 1
+    
+    def remove_all(self, buildings: Iterable[ProductionBuilding]):
+        """Remove many buildings' rows in one pass, keeping the rest in order."""
+        buildings = list(buildings)
+        if len(buildings) == 1:
+            self.remove(buildings[0])
+            return
+        removed = set()
+        for building in buildings:
+            removed.add(building._row)
+            self._detach(building)
+        self._keep([row for row in range(len(self.rows)) if row not in removed])
+    
+    def reorder(self, buildings: Iterable[ProductionBuilding]):
+        """Put the rows in the order of `buildings` (this table's buildings, reordered)."""
+        self._keep([building._row for building in buildings])
+    
+    def _keep(self, rows: List[int]):
+        # Keep just these rows, in this order
+        for column in self._columns():
+            column[:] = array(column.typecode, map(column.__getitem__, rows))
+        self.rows = [self.rows[row] for row in rows]
+        for row, building in enumerate(self.rows):
+            building._row = row
+    
+    def refresh(self, building: ProductionBuilding):
+        """Re-read a building's row after its stats changed (e.g. upgrade)."""
+        row = building._row
+        spec = building.spec
+        self.types[row] = spec.type.index
+        self.levels[row] = spec.level
+        self.stability_cost[row] = spec.stability_cost
+        self.risk_factor[row] = spec.risk_factor
+        for column, amount in zip(self.production, spec.production_vector):
+            column[row] = amount
+        for column, amount in zip(self.upkeep, spec.upkeep_vector):
+            column[row] = amount
+    
+    def fill_efficiency(self, value: float):
+        """Set every building to the same production efficiency."""
+        self.efficiency = array("d", [value]) * len(self.rows)
+    
+    def total_strain(self) -> float:
+        """Total stability cost of all buildings."""
+        return sum(self.stability_cost)
+    
+    def net_production(self) -> List[float]:
+        """Net production per resource, indexed like RESOURCE_ORDER."""
+        efficiency = self.efficiency
+        return [
+            sum(map(mul, efficiency, produced)) - sum(upkept)
+            for produced, upkept in zip(self.production, self.upkeep)
+        ]
+    
+    def roll_failures(self, rng: random.Random) -> List[int]:
+        """
+        Roll every building's failure check as one batch of draws (one per
+        row, in row order). Failed buildings drop to half efficiency.
+        Returns the failed rows.
+        """
+        draws = draw_risk_rolls(rng, len(self.rows))
+        thresholds = map(mul, self.risk_factor, itertools.repeat(RISK_SCALE))
+        failed = list(itertools.compress(range(len(self.rows)), map(lt, draws, thresholds)))
+        efficiency = self.efficiency
+        for row in failed:
+            efficiency[row] *= 0.5
+        return failed
+
+
+class BuildingList(list):
+    """
+    A planet's building list.
+    
+    Behaves like a plain list but tells the owning planet about buildings
+    entering or leaving it, so its running totals and building table stay
+    in sync.
+    """
+    
+    def __init__(self, planet: "PlanetState", buildings: Iterable[ProductionBuilding] = ()):
+        super().__init__(buildings)
+        self._planet = planet
+        planet._buildings_added(self)
+    
+    def append(self, building: ProductionBuilding):
+        self._planet._release_forks()
+        super().append(building)
+        self._planet._buildings_added((building,))
+    
+    def extend(self, buildings: Iterable[ProductionBuilding]):
+        buildings = list(buildings)
+        self._planet._release_forks()
+        super().extend(buildings)
+        self._planet._buildings_added(buildings)
+    
+    def __iadd__(self, buildings):
+        self.extend(buildings)
+        return self
+    
+    def insert(self, index: int, building: ProductionBuilding):
+        self._planet._release_forks()
+        super().insert(index, building)
+        self._planet._buildings_added((building,))
+        if self[-1] is not building:
+            self._planet._buildings_reordered()
+    
+    def pop(self, index: int = -1) -> ProductionBuilding:
+        self._planet._release_forks()
+        building = super().pop(index)
+        self._planet._buildings_removed((building,))
+        return building
+    
+    def remove(self, building: ProductionBuilding):
+        self._planet._release_forks()
+        super().remove(building)
+        self._planet._buildings_removed((building,))
+    
+    def clear(self):
+        self._planet._release_forks()
+        removed = list(self)
+        super().clear()
+        self._planet._buildings_removed(removed)
+    
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            removed, value = self[index], list(value)
+            added = value
+        else:
+            removed, added = [self[index]], [value]
+        self._planet._release_forks()
+        super().__setitem__(index, value)
+        self._planet._buildings_removed(removed)
+        self._planet._buildings_added(added)
+        self._planet._buildings_reordered()
+    
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        self._planet._release_forks()
+        super().__delitem__(index)
+        self._planet._buildings_removed(removed)
+    
+    def sort(self, *, key=None, reverse: bool = False):
+        self._planet._release_forks()
+        super().sort(key=key, reverse=reverse)
+        self._planet._buildings_reordered()
+    
+    def reverse(self):
+        self._planet._release_forks()
+        super().reverse()
+        self._planet._buildings_reordered()
+    
+    def __imul__(self, n):
+        raise TypeError("A building can only appear once in a planet's building list")
+    
+    def copy(self) -> List[ProductionBuilding]:
+        return list(self)
+    
+    def __reduce_ex__(self, protocol):
+        # Detached copies are plain lists; the planet re-wraps them
+        return (list, (list(self),))
+
+
+class BuildingCounts:
+    """
+    An aggregated planet's buildings (see PlanetState.aggregate_buildings):
+    how many buildings share each (spec, efficiency), in first-seen order.
+    
+    The planet uses these like a fork uses its base planet's buildings, so
+    turns, construction and reports never create building objects. Unlike
+    a fork's base, counts belong to one planet; forks get their own copy.
+    """
+    _forks = None
+    
+    def __init__(self, counts: Optional[Mapping[Tuple[BuildingSpec, float], int]] = None):
+        self.counts: Dict[Tuple[BuildingSpec, float], int] = dict(counts or {})
+        self.total = sum(self.counts.values())
+    
+    def copy(self) -> "BuildingCounts":
+        return BuildingCounts(self.counts)
+    
+    def add(self, spec: BuildingSpec, efficiency: float, count: int = 1):
+        key = (spec, efficiency)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total += count
+    
+    def move(self, spec: BuildingSpec, efficiency: float, new_efficiency: float, count: int):
+        """Give `count` buildings of one group a new efficiency."""
+        key = (spec, efficiency)
+        left = self.counts[key] - count
+        if left:
+            self.counts[key] = left
+        else:
+            del self.counts[key]
+        key = (spec, new_efficiency)
+        self.counts[key] = self.counts.get(key, 0) + count
+    
+    def set_efficiency(self, efficiency: float):
+        """Put every building on the same efficiency."""
+        merged: Dict[Tuple[BuildingSpec, float], int] = {}
+        for (spec, _), count in self.counts.items():
+            key = (spec, efficiency)
+            merged[key] = merged.get(key, 0) + count
+        self.counts = merged
+    
+    def _building_count(self) -> int:
+        return self.total
+    
+    def _spec_at(self, row: int) -> BuildingSpec:
+        for (spec, _), count in self.counts.items():
+            if row < count:
+                return spec
+            row -= count
+        raise IndexError("building row out of range")
+    
+    def _risk_column(self) -> array:
+        column = array("d")
+        for (spec, _), count in self.counts.items():
+            column.extend(array("d", [spec.risk_factor]) * count)
+        return column
+    
+    def _copy_buildings(self) -> List[ProductionBuilding]:
+        return [
+            ProductionBuilding.from_spec(spec, efficiency)
+            for (spec, efficiency), count in self.counts.items()
+            for _ in range(count)
+        ]
+
+
+class BuildingHeap:
+    """
+    Buildings keyed by a turn, in a min-heap: popping a turn's buildings
+    takes O(log n) each, and a turn with nothing due costs one comparison.
+    Buildings due on the same turn pop in the order they were pushed.
+    Removed buildings are dropped lazily, once they reach the top.
+    """
+    
+    # Heap keys are plain ints, turn << SEQUENCE_BITS | push sequence number,
+    # which compare several times faster than tuples
+    SEQUENCE_BITS = 48
+    SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+    
+    def __init__(self):
+        self._heap: List[int] = []
+        self._queued: Dict[int, ProductionBuilding] = {}  # sequence -> building
+        self._keys: Dict[int, int] = {}  # id(building) -> its heap key
+        self._sequence = 0
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def __contains__(self, building: ProductionBuilding) -> bool:
+        return id(building) in self._keys
+    
+    def __iter__(self) -> Iterator[Tuple[int, ProductionBuilding]]:
+        """(turn, building) pairs in the order they pop."""
+        queued = self._queued
+        for key in sorted(self._keys.values()):
+            yield key >> self.SEQUENCE_BITS, queued[key & self.SEQUENCE_MASK]
+    
+    def _key(self, building: ProductionBuilding, turn: int) -> int:
+        """Register a building for `turn` and return its heap key."""
+        if id(building) in self._keys:
+            raise ValueError(f"{building.name} is already queued")
+        sequence = self._sequence
+        self._sequence += 1
+        key = self._keys[id(building)] = turn << self.SEQUENCE_BITS | sequence
+        self._queued[sequence] = building
+        return key
+    
+    def push(self, building: ProductionBuilding, turn: int):
+        """Queue a building for `turn`."""
+        heapq.heappush(self._heap, self._key(building, turn))
+    
+    def extend(self, items: Iterable[Tuple[ProductionBuilding, int]]):
+        """Queue many (building, turn) pairs at once."""
+        keys = []
+        try:
+            for building, turn in items:
+                keys.append(self._key(building, turn))
+        except ValueError:
+            for key in keys:
+                del self._keys[id(self._queued.pop(key & self.SEQUENCE_MASK))]
+            raise
+        heap = self._heap
+        if len(keys) * 16 < len(heap):
+            for key in keys:
+                heapq.heappush(heap, key)
+        else:
+            # Rebuilding the heap is linear, cheaper than pushing a large batch
+            heap.extend(keys)
+            heapq.heapify(heap)
+    
+    def remove(self, building: ProductionBuilding) -> bool:
+        """Remove a queued building; False if it is not queued."""
+        key = self._keys.pop(id(building), None)
+        if key is None:
+            return False
+        del self._queued[key & self.SEQUENCE_MASK]
+        if len(self._heap) > 2 * len(self._keys) + 16:
+            # Mostly removed: drop the stale keys rather than carry them
+            self._heap = sorted(self._keys.values())
+        else:
+            self._drop_removed()
         return True
+    
+    def _drop_removed(self):
+        # Keeps a live key at the top, so next_turn is a peek
+        heap = self._heap
+        queued = self._queued
+        while heap and heap[0] & self.SEQUENCE_MASK not in queued:
+            heapq.heappop(heap)
+    
+    def turn_of(self, building: ProductionBuilding) -> Optional[int]:
+        """Turn a building is queued for, or None."""
+        key = self._keys.get(id(building))
+        return None if key is None else key >> self.SEQUENCE_BITS
+    
+    def next_turn(self) -> Optional[int]:
+        """Earliest queued turn, or None when nothing is queued."""
+        return self._heap[0] >> self.SEQUENCE_BITS if self._heap else None
+    
+    def pop_due(self, turn: int) -> List[ProductionBuilding]:
+        """Remove and return the buildings queued for `turn` or earlier, in order."""
+        heap = self._heap
+        queued = self._queued
+        limit = (turn + 1) << self.SEQUENCE_BITS
+        done = []
+        while heap and heap[0] < limit:
+            building = queued.pop(heapq.heappop(heap) & self.SEQUENCE_MASK, None)
+            if building is not None:
+                del self._keys[id(building)]
+                done.append(building)
+        self._drop_removed()
+        return done
+    
+    def __getstate__(self):
+        # Indexed by object ids, so the index is rebuilt on load
+        keys = sorted(self._keys.values())
+        return {
+            "sequence": self._sequence,
+            "keys": keys,
+            "buildings": [self._queued[key & self.SEQUENCE_MASK] for key in keys],
+        }
+    
+    def __setstate__(self, state):
+        self._sequence = state["sequence"]
+        self._heap = list(state["keys"])  # sorted, so already a heap
+        self._queued = {}
+        self._keys = {}
+        for key, building in zip(self._heap, state["buildings"]):
+            self._queued[key & self.SEQUENCE_MASK] = building
+            self._keys[id(building)] = key
+
+
+class ConstructionQueue(BuildingHeap):
+    """
+    Buildings under construction on one planet (see
+    PlanetState.queue_construction), keyed on completion turn. Builds due
+    on the same turn complete in the order they were queued.
+    """
+    
+    def _key(self, building: ProductionBuilding, turn: int) -> int:
+        if building._owner is not None:
+            raise ValueError(f"{building.name} already belongs to a planet")
+        return super()._key(building, turn)
+    
+    def cancel(self, building: ProductionBuilding) -> bool:
+        """Remove a queued building; False if it is not queued."""
+        return self.remove(building)
+    
+    def next_completion(self) -> Optional[int]:
+        """Turn the next build completes on, or None when nothing is queued."""
+        return self.next_turn()
+    
+    def copy(self) -> "ConstructionQueue":
+        """Copy holding copies of the queued buildings (for forks)."""
+        state = self.__getstate__()
+        state["buildings"] = [copy.copy(building) for building in state["buildings"]]
+        queue = ConstructionQueue()
+        queue.__setstate__(state)
+        return queue
+
+
+class FailureSchedule(BuildingHeap):
+    """
+    The turn each of a planet's buildings fails next (see
+    PlanetState.schedule_failures).
+    
+    A building fails on each turn with probability risk_factor,
+    independently of other turns, so the wait until its next failure is
+    geometric: drawn once when the building joins the planet, fails or
+    changes risk, it gives the same failures as rolling every turn.
+    """
+    
+    def schedule(self, building: ProductionBuilding, turn: int, rng: random.Random):
+        """Draw a building's next failure after `turn`."""
+        self.remove(building)
+        wait = geometric_variate(rng, building.risk_factor)
+        if wait is not None:
+            self.push(building, turn + wait)
+    
+    def reschedule_due(self, turn: int, rng: random.Random) -> List[ProductionBuilding]:
+        """
+        Pop the buildings failing by `turn` and draw their next failure
+        after it. Returns them, in failure order.
+        """
+        heap = self._heap
+        queued = self._queued
+        keys = self._keys
+        limit = (turn + 1) << self.SEQUENCE_BITS
+        due = []
+        while heap and heap[0] < limit:
+            building = queued.pop(heap[0] & self.SEQUENCE_MASK, None)
+            if building is None:
+                heapq.heappop(heap)
+                continue
+            due.append(building)
+            wait = geometric_variate(rng, building.risk_factor)
+            if wait is None:
+                heapq.heappop(heap)
+                del keys[id(building)]
+                continue
+            # Replacing the top in place is one sift instead of a pop and a push
+            sequence = self._sequence
+            self._sequence += 1
+            queued[sequence] = building
+            key = keys[id(building)] = (turn + wait) << self.SEQUENCE_BITS | sequence
+            heapq.heapreplace(heap, key)
+        self._drop_removed()
+        return due
+
+
+def compute_stability(
+    total_strain: float, stockpiles: List[float], debt: float,
+    expansion_rate: float, population: int
+) -> float:
+    """
+    Stability from its inputs; stockpiles are indexed like RESOURCE_ORDER.
+    Shared by PlanetState and the batch simulator so the rules live in one place.
+    """
+    stability = unclamped_stability(total_strain, stockpiles, debt, expansion_rate, population)
+    
+    # Clamp between 0 and 100
+    return max(0.0, min(100.0, stability))
+
+
+def unclamped_stability(
+    total_strain: float, stockpiles: List[float], debt: float,
+    expansion_rate: float, population: int
+) -> float:
+    """compute_stability before clamping to 0-100 (used to find tier crossings)."""
+    stability = 100.0
+    
+    # Building strain
+    stability -= total_strain
+    
+    # Resource shortages
+    for amount in stockpiles:
+        if amount < 0:
+            # Negative resources (debt) severely impact stability
+            stability += amount * 0.1  # Each negative unit reduces stability
+    
+    # Debt impact
+    if debt > 0:
+        debt_penalty = min(30, debt * 0.01)
+        stability -= debt_penalty
+    
+    # Rapid expansion penalty
+    if expansion_rate > 5:
+        expansion_penalty = (expansion_rate - 5) * 2
+        stability -= expansion_penalty
+    
+    # Population pressure
+    food_per_capita = stockpiles[ResourceType.FOOD.index] / max(1, population)
+    if food_per_capita < 1.0:
+        stability -= (1.0 - food_per_capita) * 20
+    
+    return stability
+
+
+# Stability values where efficiency_for_stability changes tier
+EFFICIENCY_TIER_BOUNDS = (30.0, 50.0, 70.0, 90.0)
+
+# Longest repeating pattern of turns advance_turns looks for
+MAX_CYCLE_PERIOD = 32
+
+# Relative rounding within which a cycling stockpile counts as having paid
+CYCLE_ROUNDING = 1e-12
+
+
+def turns_until_crossing(value: float, step: float, threshold: float) -> float:
+    """
+    First j >= 1 at which `value + j * step < threshold` stops having the
+    same truth value it has at j = 0 (math.inf if it never changes).
+    """
+    if value < threshold:
+        if step <= 0:
+            return math.inf
+        return max(1, math.ceil((threshold - value) / step))
+    if step >= 0:
+        return math.inf
+    return math.floor((value - threshold) / -step) + 1
+
+
+def cycled_stock(amount: float, made: float, used: float, turns: int) -> float:
+    """
+    Stockpile after `turns` turns that add `made` and pay `used` whenever the
+    stockpile covers it (for 0 < made < used and 0 <= amount < used).
+    """
+    total = amount + turns * made
+    left = total % used
+    # A total that is a multiple of used pays (consumption is paid when the
+    # stockpile covers it exactly), even when rounding leaves it just short
+    if used - left <= CYCLE_ROUNDING * total:
+        return 0.0
+    return left
+
+
+def efficiency_for_stability(stability: float) -> float:
+    """Production efficiency tier for a stability value."""
+    # Low stability causes problems
+    if stability < 30:
+        # Critical instability: production efficiency drops
+        efficiency = 0.5
+    elif stability < 50:
+        # Moderate instability: slight production drops
+        efficiency = 0.75
+    elif stability < 70:
+        # Minor instability
+        efficiency = 0.9
+    else:
+        # Stable: full production
+        efficiency = 1.0
+    
+    # Very high stability gives bonuses
+    if stability > 90:
+        efficiency = 1.1
+    
+    return efficiency
+
+
+class PlanetSnapshot(NamedTuple):
+    """
+    Compact, picklable copy of a planet's simulation state.
+
+    Buildings are stored as an index into the distinct specs plus an
+    efficiency column, so shipping a snapshot to another process costs a few
+    bytes per building instead of pickling every building object.
+    """
+    name: str
+    resources: Tuple[float, ...]
+    specs: Tuple[BuildingSpec, ...]
+    building_specs: array  # 'H': index into specs, one per building
+    efficiency: array      # 'd': production efficiency, one per building
+    stability: float
+    population: int
+    debt: float
+    expansion_rate: float
+    turn: int
+
+
+# Phases of a turn, in order, as timed for PlanetState.instruments
+TURN_PHASES = ("stability", "production", "risk", "consumption")
+
+
+class TurnSample(NamedTuple):
+    """Timings (nanoseconds) and counters of one instrumented turn."""
+    turn: int
+    stability_ns: int
+    production_ns: int
+    risk_ns: int
+    consumption_ns: int
+    buildings: int    # buildings processed (one risk roll each)
+    failures: int     # buildings that failed their risk roll
+    shortages: int    # end-of-turn consumption that could not be paid
 
 
 @dataclass
@@ -136,7 +1209,7 @@ class PlanetState:
     """
     name: str
     
-    # Resource stockpiles
+    # Resource stockpiles (stored as a ResourceStock)
     resources: Dict[ResourceType, float] = field(default_factory=lambda: {
         ResourceType.FOOD: 1000.0,
         ResourceType.METALS: 500.0,
@@ -161,22 +1234,491 @@ class PlanetState:
     # Counters
     turn: int = 0
     
+    # Process turns over the array-backed BuildingTable
+    vectorized: bool = False
+    
+    # Seed for this planet's own random stream (None: seeded from the OS)
+    seed: Optional[int] = None
+    
+    def __post_init__(self):
+        # Per-planet stream: results depend only on the seed, never on which
+        # other planets were ticked in the same process
+        self.rng = random.Random(self.seed)
+    
+    # Created on the first vectorized turn, then kept in sync by BuildingList
+    _table = None
+    
+    # Copy-on-write (see fork): a fork shares its base planet's buildings
+    # until either side changes them. Until then _fork_base is the base
+    # planet, _fork_added the fork's own new buildings, and _fork_efficiency
+    # and _fork_failed the efficiencies its turns gave the shared buildings.
+    # _forks holds the forks still sharing this planet's buildings. A base
+    # can also be any object with _forks, _building_count, _spec_at,
+    # _risk_column and _copy_buildings (planet_save's lazily loaded buildings,
+    # or the BuildingCounts of an aggregated planet).
+    _fork_base = None
+    _forks = None
+    _risk_cache = None  # risk factors in building order while unchanged
+    
+    # Opt-in turn instrumentation (instrumentation.TurnInstruments or any
+    # object with record_turn(planet, sample)); one can serve many planets.
+    # Not copied by fork, pickling or saves.
+    instruments = None
+    
+    # Opt-in event log (command_log.CommandLog) told about every turn,
+    # construction and upgrade before it happens. Not copied either.
+    command_log = None
+    
+    # Opt-in dirty tracking of report fields (see track_changes). Not copied.
+    _tracker = None
+    
+    # Buildings under construction (ConstructionQueue), created by the first
+    # queue_construction; each joins the planet at the end of the turn it is due.
+    construction_queue = None
+    
+    # Opt-in FailureSchedule replacing the per-turn risk rolls (see
+    # schedule_failures). Pickled and saved, but not given to forks.
+    _failures = None
+    
+    def _get_resources(self) -> ResourceStock:
+        return self._resources
+    
+    def _set_resources(self, resources: Mapping[ResourceType, float]):
+        if self._tracker is not None:
+            resources = TrackedResourceStock(resources, self._tracker)
+        elif not isinstance(resources, ResourceStock):
+            resources = ResourceStock(resources)
+        self._resources = resources
+    
+    def _get_buildings(self) -> List[ProductionBuilding]:
+        if self._fork_base is not None:
+            self._own_buildings()
+        return self._buildings
+    
+    def _set_buildings(self, buildings: Iterable[ProductionBuilding]):
+        if self._fork_base is not None:
+            self._own_buildings()
+        self._release_forks()
+        old = self.__dict__.get("_buildings")
+        if old is not None:
+            self._buildings_removed(old)
+        self._reset_aggregates()
+        self._buildings = BuildingList(self, buildings)
+    
+    def _buildings_added(self, buildings: Iterable[ProductionBuilding]):
+        for building in buildings:
+            if building._owner is not None:
+                raise ValueError(f"{building.name} already belongs to a planet")
+            building._owner = self
+            if self._table is not None:
+                self._table.append(building)
+            self._track_building(building)
+            if self._failures is not None:
+                self._failures.schedule(building, self.turn, self.rng)
+        if self._tracker is not None:
+            self._tracker.mark("buildings")
+    
+    def _buildings_removed(self, buildings: Iterable[ProductionBuilding]):
+        if self._table is not None:
+            buildings = list(buildings)
+            self._table.remove_all(buildings)
+        for building in buildings:
+            self._untrack_building(building)
+            if self._failures is not None:
+                self._failures.remove(building)
+            building._owner = None
+        if self._tracker is not None:
+            self._tracker.mark("buildings")
+        if not self._buildings:
+            # Start an empty planet from exact zeros rather than rounding residue
+            self._reset_aggregates()
+    
+    def _buildings_reordered(self):
+        # The building table keeps building list order, which risk rolls follow
+        if self._table is not None:
+            self._table.reorder(self._buildings)
+        if self._tracker is not None:
+            self._tracker.mark("buildings")
+    
+    # Running totals over all buildings, indexed like RESOURCE_ORDER:
+    # _strain is total stability cost, _gross and _upkeep are per-turn
+    # production and upkeep, _output is production at current efficiencies.
+    
+    def _reset_aggregates(self):
+        self._strain = 0.0
+        self._gross = [0.0] * len(RESOURCE_ORDER)
+        self._upkeep = [0.0] * len(RESOURCE_ORDER)
+        self._output = [0.0] * len(RESOURCE_ORDER)
+        if self._tracker is not None:
+            self._tracker.mark("net_production")
+    
+    def _track_building(self, building: ProductionBuilding, sign: float = 1.0):
+        """Add (or with sign=-1, remove) a building's share of the running totals."""
+        self._track_spec(building.spec, building.production_efficiency, sign)
+    
+    def _track_spec(self, spec: BuildingSpec, efficiency: float, count: float = 1.0):
+        """Add `count` buildings' share of the running totals (negative removes)."""
+        self._strain += count * spec.stability_cost
+        weight = count * efficiency
+        for index, (produced, upkept) in enumerate(zip(spec.production_vector, spec.upkeep_vector)):
+            if produced:
+                self._gross[index] += count * produced
+                self._output[index] += weight * produced
+            if upkept:
+                self._upkeep[index] += count * upkept
+        if self._tracker is not None:
+            self._tracker.mark("net_production")
+    
+    def _untrack_building(self, building: ProductionBuilding):
+        self._release_forks()
+        self._track_building(building, -1.0)
+    
+    def _efficiency_changed(self, building: ProductionBuilding, old: float, new: float):
+        self._release_forks()
+        self._shift_output(building.spec, new - old)
+    
+    def _shift_output(self, spec: BuildingSpec, delta: float):
+        """Account for one building's efficiency changing by delta."""
+        for resource_type, produced, _ in spec.net_terms:
+            if produced:
+                self._output[resource_type.index] += delta * produced
+        if self._tracker is not None:
+            self._tracker.mark("net_production")
+    
+    def refresh_aggregates(self):
+        """Recompute the running totals from scratch, dropping rounding residue."""
+        self._reset_aggregates()
+        base = self._fork_base
+        if isinstance(base, BuildingCounts):
+            for (spec, efficiency), count in base.counts.items():
+                self._track_spec(spec, efficiency, count)
+            return
+        for building in self.buildings:
+            self._track_building(building)
+    
+    def verify_aggregates(self):
+        """Check the running totals against a full recompute."""
+        strain, gross, upkeep, output = self._strain, self._gross, self._upkeep, self._output
+        self.refresh_aggregates()
+        cached = [strain] + gross + upkeep + output
+        expected = [self._strain] + self._gross + self._upkeep + self._output
+        for got, want in zip(cached, expected):
+            if not math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-6):
+                raise AssertionError(
+                    f"{self.name}: cached totals {cached} drifted from {expected}"
+                )
+    
+    def building_table(self) -> BuildingTable:
+        """Get the array-backed building table, building it on first use."""
+        if self._table is None:
+            self._table = BuildingTable(self.buildings)
+        return self._table
+    
+    def __getstate__(self):
+        # Running totals are kept as they are: recomputing them can round
+        # differently, and a copy would drift from the planet it was made from
+        totals = (self._strain, list(self._gross), list(self._upkeep), list(self._output))
+        aggregated = self.aggregated
+        if self._fork_base is not None and not aggregated:
+            self._own_buildings()
+        state = self.__dict__.copy()
+        for derived in ("_table", "_forks", "_risk_cache", "instruments", "command_log", "_tracker"):
+            state.pop(derived, None)
+        state["_strain"], state["_gross"], state["_upkeep"], state["_output"] = totals
+        if aggregated:
+            # Copied with the counts, which pickle as they are
+            state["_fork_base"] = self._fork_base.copy()
+        else:
+            state["_buildings"] = list(state["_buildings"])
+        return state
+    
+    def __setstate__(self, state):
+        buildings = state.pop("_buildings")
+        failures = state.pop("_failures", None)  # restored as saved, not redrawn
+        # Pickles from before the totals were kept recompute them
+        totals = [state.pop(name, None) for name in ("_strain", "_gross", "_upkeep", "_output")]
+        for name in TRACKED_SCALARS:
+            # Pickles from before these fields became properties
+            if name in state:
+                state["_" + name] = state.pop(name)
+        self.__dict__.update(state)
+        if buildings is None:
+            self._buildings = None
+            self.refresh_aggregates()
+        else:
+            self.buildings = buildings
+        if totals[0] is not None:
+            self._strain, self._gross, self._upkeep, self._output = totals
+        if failures is not None:
+            self._failures = failures
+    
+    def snapshot(self) -> PlanetSnapshot:
+        """
+        Compact copy of this planet's state (everything except its random
+        stream and construction queue).
+        """
+        spec_index: Dict[int, int] = {}
+        specs: List[BuildingSpec] = []
+        building_specs = array("H")
+        efficiency = array("d")
+        if self.aggregated:
+            groups = self._fork_base.counts.items()
+        else:
+            groups = (((b.spec, b.production_efficiency), 1) for b in self.buildings)
+        for (spec, spec_efficiency), count in groups:
+            index = spec_index.get(id(spec))
+            if index is None:
+                index = spec_index[id(spec)] = len(specs)
+                specs.append(spec)
+            building_specs.extend(array("H", [index]) * count)
+            efficiency.extend(array("d", [spec_efficiency]) * count)
+        
+        return PlanetSnapshot(
+            name=self.name,
+            resources=tuple(self.resources[rt] for rt in RESOURCE_ORDER),
+            specs=tuple(specs),
+            building_specs=building_specs,
+            efficiency=efficiency,
+            stability=self.stability,
+            population=self.population,
+            debt=self.debt,
+            expansion_rate=self.expansion_rate,
+            turn=self.turn,
+        )
+    
+    @classmethod
+    def from_snapshot(
+        cls, snapshot: PlanetSnapshot, seed: Optional[int] = None, vectorized: bool = True
+    ) -> "PlanetState":
+        """Rebuild a planet from a snapshot, with a fresh random stream."""
+        specs = snapshot.specs
+        return cls(
+            name=snapshot.name,
+            resources=dict(zip(RESOURCE_ORDER, snapshot.resources)),
+            buildings=[
+                ProductionBuilding.from_spec(specs[index], efficiency)
+                for index, efficiency in zip(snapshot.building_specs, snapshot.efficiency)
+            ],
+            stability=snapshot.stability,
+            population=snapshot.population,
+            debt=snapshot.debt,
+            expansion_rate=snapshot.expansion_rate,
+            turn=snapshot.turn,
+            vectorized=vectorized,
+            seed=seed,
+        )
+    
+    def fork(self, seed: Optional[int] = None) -> "PlanetState":
+        """
+        Copy-on-write copy of this planet for what-if simulation.
+        
+        The fork gets its own stockpiles, counters and running totals but
+        shares this planet's buildings, so forking takes the same time for
+        ten buildings or ten thousand. New buildings (add_building,
+        construct_building) and turns are recorded on the fork alone; the
+        shared buildings are copied only when the fork's building list is
+        used directly or when this planet changes its buildings or ticks.
+        The fork continues this planet's random stream unless given a seed.
+        """
+        child = PlanetState.__new__(PlanetState)
+        child.name = self.name
+        child.resources = dict(self.resources)
+        child.stability = self.stability
+        child.population = self.population
+        child.debt = self.debt
+        child.expansion_rate = self.expansion_rate
+        child.turn = self.turn
+        child.vectorized = self.vectorized
+        if seed is None:
+            child.seed = self.seed
+            child.rng = copy.copy(self.rng)
+        else:
+            child.seed = seed
+            child.rng = random.Random(seed)
+        
+        child._strain = self._strain
+        child._gross = list(self._gross)
+        child._upkeep = list(self._upkeep)
+        child._output = list(self._output)
+        if self.construction_queue is not None:
+            child.construction_queue = self.construction_queue.copy()
+        if self.aggregated:
+            # Counts are small, so an aggregated fork gets its own
+            child._share_buildings(self._fork_base.copy())
+            return child
+        child._share_buildings(self)
+        
+        if self._forks is None:
+            self._forks = weakref.WeakValueDictionary()
+        self._forks[id(child)] = child
+        return child
+    
+    def _share_buildings(self, base):
+        """Use `base`'s buildings until either side changes them (see fork)."""
+        self._buildings = None
+        self._fork_base = base
+        self._fork_added = []
+        self._fork_efficiency = None
+        self._fork_failed = []
+        self._fork_risk = None
+    
+    def _own_buildings(self):
+        """Give a fork its own copies of the buildings it shares."""
+        base = self._fork_base
+        buildings = base._copy_buildings()
+        if self._fork_efficiency is not None:
+            for building in buildings:
+                building._efficiency = self._fork_efficiency
+            for row in self._fork_failed:
+                buildings[row]._efficiency *= 0.5
+        for building in self._fork_added:
+            building._owner = None
+        buildings += self._fork_added
+        
+        if base._forks is not None:
+            base._forks.pop(id(self), None)
+        for name in ("_fork_base", "_fork_added", "_fork_efficiency", "_fork_failed", "_fork_risk"):
+            delattr(self, name)
+        
+        # Same building content, so this planet's own forks stay valid and
+        # its running totals are kept rather than recomputed
+        totals = self._strain, self._gross, self._upkeep, self._output
+        self._reset_aggregates()
+        self._buildings = BuildingList(self, buildings)
+        self._strain, self._gross, self._upkeep, self._output = totals
+    
+    def _release_forks(self):
+        """Let forks sharing this planet's buildings copy them before they change."""
+        if self._risk_cache is not None:
+            self._risk_cache = None
+        forks = self._forks
+        if forks:
+            self._forks = None
+            for fork in list(forks.values()):
+                if fork._fork_base is self:
+                    fork._own_buildings()
+    
+    @property
+    def aggregated(self) -> bool:
+        """Whether buildings are kept as counts (see aggregate_buildings)."""
+        return isinstance(self._fork_base, BuildingCounts)
+    
+    def aggregate_buildings(self):
+        """
+        Keep buildings as counts of identical buildings instead of objects.
+        
+        Most buildings are copies of a template at the same level and
+        efficiency, so turns, stability and reports on an aggregated planet
+        cost per distinct (building spec, efficiency) group rather than per
+        building: a failed building just moves to a half-efficiency group
+        until the next turn. Each group draws its number of failures from
+        one binomial roll, which fails buildings with the same odds as one
+        roll per building but takes a different random stream.
+        
+        Buildings added later are counted too; the objects passed to
+        add_building or construct_building are not kept. Using
+        planet.buildings directly expands the counts back into building
+        objects (grouped, not in construction order) and ends aggregation.
+        """
+        if self.aggregated:
+            return
+        self._failures = None
+        counts = BuildingCounts()
+        for building in self.buildings:
+            counts.add(building.spec, building.production_efficiency)
+        self.buildings = []
+        self._table = None
+        self._share_buildings(counts)
+        self.refresh_aggregates()
+        if self._tracker is not None:
+            self._tracker.mark("buildings")
+    
+    @property
+    def failures_scheduled(self) -> bool:
+        """Whether failures come from a schedule (see schedule_failures)."""
+        return self._failures is not None
+    
+    def schedule_failures(self):
+        """
+        Draw each building's next failure turn ahead instead of rolling
+        every building every turn.
+        
+        Buildings rarely fail (risk_factor 0.01 to 0.15 a turn), so each
+        building's wait until its next failure is drawn from the geometric
+        distribution when it joins the planet, and again after it fails or
+        its risk changes. A turn then only touches the buildings failing on
+        it: risk handling costs O(failures) instead of O(buildings). Failures
+        have the same odds as the per-turn rolls but take a different random
+        stream. Forks of the planet roll per building as usual, and
+        aggregated planets already draw failures per group.
+        """
+        if self._failures is not None:
+            return
+        if self.aggregated:
+            raise ValueError("Aggregated planets draw failures per group already")
+        schedule = FailureSchedule()
+        for building in self.buildings:
+            schedule.schedule(building, self.turn, self.rng)
+        self._failures = schedule
+    
+    def _risk_changed(self, building: ProductionBuilding):
+        if self._failures is not None:
+            self._failures.schedule(building, self.turn, self.rng)
+    
+    def _building_count(self) -> int:
+        """Number of buildings, without copying a fork's shared buildings."""
+        if self._fork_base is not None:
+            return self._fork_base._building_count() + len(self._fork_added)
+        return len(self.buildings)
+    
+    def _spec_at(self, row: int) -> BuildingSpec:
+        """Spec of the building in the given row, looking through to shared buildings."""
+        base = self._fork_base
+        if base is None:
+            return self.buildings[row].spec
+        shared = base._building_count()
+        return base._spec_at(row) if row < shared else self._fork_added[row - shared].spec
+    
+    def _building_position(self, building: ProductionBuilding) -> int:
+        """Position of one of this planet's buildings in its building list."""
+        if self._fork_base is not None:
+            return next(row for row, owned in enumerate(self.buildings) if owned is building)
+        self.building_table()  # built once; its rows follow the building list
+        return building._row
+    
+    def _copy_buildings(self) -> List[ProductionBuilding]:
+        """Detached copies of the buildings, for a fork taking them over."""
+        return [copy.copy(building) for building in self.buildings]
+    
+    def _risk_column(self) -> array:
+        """Risk factor of every building, in building order."""
+        base = self._fork_base
+        if base is None:
+            if self._risk_cache is None:
+                self._risk_cache = array("d", [building.risk_factor for building in self.buildings])
+            return self._risk_cache
+        if self._fork_risk is None:
+            self._fork_risk = base._risk_column()
+        return self._fork_risk + array("d", [building.risk_factor for building in self._fork_added])
+    
     def add_resource(self, resource_type: ResourceType, amount: float):
         """Add resources to stockpile."""
-        self.resources[resource_type] = self.resources.get(resource_type, 0) + amount
+        self.resources[resource_type] += amount
     
     def remove_resource(self, resource_type: ResourceType, amount: float) -> bool:
         """Remove resources from stockpile. Returns False if insufficient."""
-        current = self.resources.get(resource_type, 0)
+        stock = self.resources
+        current = stock[resource_type]
         if current >= amount:
-            self.resources[resource_type] = current - amount
+            stock[resource_type] = current - amount
             return True
         return False
     
     def has_resources(self, costs: Dict[ResourceType, float]) -> bool:
         """Check if planet has enough resources."""
+        stock = self.resources
         for resource_type, amount in costs.items():
-            if self.resources.get(resource_type, 0) < amount:
+            if stock[resource_type] < amount:
                 return False
         return True
     
@@ -185,101 +1727,562 @@ class PlanetState:
         Calculate planet stability based on various factors.
         Stability ranges from 0 (collapsed) to 100 (perfect).
         """
-        stability = 100.0
-        
-        # Building strain
-        total_strain = sum(b.stability_cost for b in self.buildings)
-        stability -= total_strain
-        
-        # Resource shortages
-        for resource_type in ResourceType:
-            amount = self.resources.get(resource_type, 0)
-            if amount < 0:
-                # Negative resources (debt) severely impact stability
-                stability += amount * 0.1  # Each negative unit reduces stability
-        
-        # Debt impact
-        if self.debt > 0:
-            debt_penalty = min(30, self.debt * 0.01)
-            stability -= debt_penalty
-        
-        # Rapid expansion penalty
-        if self.expansion_rate > 5:
-            expansion_penalty = (self.expansion_rate - 5) * 2
-            stability -= expansion_penalty
-        
-        # Population pressure
-        food_per_capita = self.resources.get(ResourceType.FOOD, 0) / max(1, self.population)
-        if food_per_capita < 1.0:
-            stability -= (1.0 - food_per_capita) * 20
+        if DEBUG_AGGREGATES:
+            self.verify_aggregates()
         
-        # Clamp between 0 and 100
-        return max(0.0, min(100.0, stability))
+        return compute_stability(
+            self._strain,
+            [self.resources[rt] for rt in RESOURCE_ORDER],
+            self.debt,
+            self.expansion_rate,
+            self.population,
+        )
     
-    def apply_stability_effects(self):
-        """Apply effects based on current stability."""
+    def apply_stability_effects(self) -> float:
+        """Apply effects based on current stability. Returns the efficiency applied."""
         self.stability = self.calculate_stability()
         
-        # Low stability causes problems
-        if self.stability < 30:
-            # Critical instability: production efficiency drops
-            for building in self.buildings:
-                building.production_efficiency = 0.5
-        elif self.stability < 50:
-            # Moderate instability: slight production drops
-            for building in self.buildings:
-                building.production_efficiency = 0.75
-        elif self.stability < 70:
-            # Minor instability
-            for building in self.buildings:
-                building.production_efficiency = 0.9
+        efficiency = efficiency_for_stability(self.stability)
+        self._set_uniform_efficiency(efficiency)
+        return efficiency
+    
+    def _set_uniform_efficiency(self, efficiency: float):
+        """Put every building on the same efficiency."""
+        self._release_forks()
+        if self._fork_base is not None:
+            if self.aggregated:
+                self._fork_base.set_efficiency(efficiency)
+            else:
+                self._fork_efficiency = efficiency
+                self._fork_failed = []
+                for building in self._fork_added:
+                    building._efficiency = efficiency
+        elif self._table is not None:
+            self._table.fill_efficiency(efficiency)
         else:
-            # Stable: full production
-            for building in self.buildings:
-                building.production_efficiency = 1.0
-        
-        # Very high stability gives bonuses
-        if self.stability > 90:
             for building in self.buildings:
-                building.production_efficiency = 1.1
+                building._efficiency = efficiency
+        output = [efficiency * amount for amount in self._gross]
+        if self._tracker is not None and output != self._output:
+            self._tracker.mark("net_production")
+        self._output = output
     
     def process_turn(self):
         """Process one turn of the economy."""
-        self.turn += 1
+        if self.command_log is not None:
+            self.command_log.record_turn(self)
+        if self.instruments is not None:
+            self._process_turn_instrumented()
+            return
+        
+        self._start_turn()
         
         # Calculate and apply stability effects
-        self.apply_stability_effects()
+        efficiency = self.apply_stability_effects()
+        
+        self._apply_production(efficiency)
+        self._roll_failures(efficiency)
+        self._apply_consumption()
+        if self.construction_queue is not None:
+            self._complete_constructions()
+    
+    def _process_turn_instrumented(self):
+        """process_turn with each phase timed, reported to self.instruments."""
+        clock = time.perf_counter_ns
+        start = clock()
+        self._start_turn()
+        efficiency = self.apply_stability_effects()
+        stability_done = clock()
+        self._apply_production(efficiency)
+        production_done = clock()
+        failures = self._roll_failures(efficiency)
+        risk_done = clock()
+        shortages = self._apply_consumption()
+        end = clock()
+        if self.construction_queue is not None:
+            self._complete_constructions()
+        
+        self.instruments.record_turn(self, TurnSample(
+            self.turn,
+            stability_done - start,
+            production_done - stability_done,
+            risk_done - production_done,
+            end - risk_done,
+            self._building_count(),
+            failures,
+            shortages,
+        ))
+    
+    def _start_turn(self):
+        if self.vectorized and self._fork_base is None:
+            # Build the table first so the efficiency reset is a column fill
+            self.building_table()
+        self.turn += 1
+    
+    def _apply_production(self, efficiency: float):
+        """
+        Add every building's production less its upkeep. The vectorized
+        turn and forks sharing buildings use the running totals: one sum
+        per resource instead of one per building.
+        """
+        if self.vectorized or self._fork_base is not None:
+            for resource_type, produced, upkept in zip(RESOURCE_ORDER, self._gross, self._upkeep):
+                amount = efficiency * produced - upkept
+                if amount:
+                    self.add_resource(resource_type, amount)
+            return
         
-        # Process all buildings
+        stock = self.resources
         for building in self.buildings:
-            net_production = building.get_net_production()
-            
-            # Apply production
-            for resource_type, amount in net_production.items():
-                self.add_resource(resource_type, amount)
-            
-            # Random events based on risk factor
-            import random
-            if random.random() < building.risk_factor:
-                # Building failure - no production this turn
-                building.production_efficiency *= 0.5
+            building_efficiency = building.production_efficiency
+            for resource_type, produced, upkept in building.spec.net_terms:
+                stock[resource_type] += produced * building_efficiency - upkept
+    
+    def _roll_failures(self, efficiency: float) -> int:
+        """
+        One risk roll per building, in building order; a failed building
+        loses half its efficiency (no production this turn). Returns the
+        number of failures.
+        """
+        if self._fork_base is not None:
+            if self.aggregated:
+                return self._roll_count_failures()
+            return self._roll_shared_failures(efficiency)
+        if self._failures is not None:
+            return self._roll_scheduled_failures()
+        if self.vectorized:
+            return len(self._roll_table_failures())
         
+        failures = 0
+        risk_rolls = draw_risk_rolls(self.rng, len(self.buildings))
+        for building, roll in zip(self.buildings, risk_rolls):
+            if roll < building.risk_factor * RISK_SCALE:
+                building.production_efficiency *= 0.5
+                failures += 1
+        return failures
+    
+    def _roll_shared_failures(self, efficiency: float) -> int:
+        """Risk rolls for a fork still sharing its base planet's buildings."""
+        # Shared buildings first, then the fork's own
+        risk = self._risk_column()
+        draws = draw_risk_rolls(self.rng, len(risk))
+        thresholds = map(mul, risk, itertools.repeat(RISK_SCALE))
+        shared = len(risk) - len(self._fork_added)
+        failures = 0
+        for row in itertools.compress(range(len(risk)), map(lt, draws, thresholds)):
+            if row < shared:
+                self._fork_failed.append(row)
+                self._shift_output(self._spec_at(row), -0.5 * efficiency)
+            else:
+                self._fork_added[row - shared].production_efficiency *= 0.5
+            failures += 1
+        return failures
+    
+    def _roll_count_failures(self) -> int:
+        """
+        Risk rolls for an aggregated planet: one binomial draw per group of
+        identical buildings, so the cost depends on the number of groups.
+        Failed buildings move to a half-efficiency group until the next turn.
+        """
+        counts = self._fork_base
+        rng = self.rng
+        failures = 0
+        for (spec, efficiency), count in list(counts.counts.items()):
+            failed = binomial_variate(rng, count, spec.risk_factor)
+            if failed:
+                counts.move(spec, efficiency, efficiency * 0.5, failed)
+                self._shift_output(spec, -0.5 * efficiency * failed)
+                failures += failed
+        return failures
+    
+    def _roll_scheduled_failures(self) -> int:
+        """
+        Failures from the failure schedule: only the buildings due to fail
+        this turn are touched, and each draws its next failure turn.
+        """
+        failed = self._failures.reschedule_due(self.turn, self.rng)
+        if not failed:
+            return 0
+        self._release_forks()
+        # Halve the failed buildings' efficiencies directly, then settle the
+        # totals once per spec rather than once per building
+        table = self._table
+        shifts: Dict[BuildingSpec, float] = {}
+        for building in failed:
+            if table is not None:
+                efficiency = table.efficiency[building._row]
+                table.efficiency[building._row] = efficiency * 0.5
+            else:
+                efficiency = building._efficiency
+                building._efficiency = efficiency * 0.5
+            shifts[building.spec] = shifts.get(building.spec, 0.0) - 0.5 * efficiency
+        for spec, delta in shifts.items():
+            self._shift_output(spec, delta)
+        return len(failed)
+    
+    def _roll_table_failures(self) -> List[ProductionBuilding]:
+        """Risk rolls over the building table. Returns the failed buildings."""
+        self._release_forks()
+        table = self._table
+        failed = [table.rows[row] for row in table.roll_failures(self.rng)]
+        for building in failed:
+            # Failures halved the efficiency in the table; settle the totals
+            efficiency = building.production_efficiency
+            self._efficiency_changed(building, efficiency * 2, efficiency)
+        return failed
+    
+    def _apply_consumption(self) -> int:
+        """
+        Apply end-of-turn population and building consumption. Returns the
+        number of shortages (consumption not paid for lack of stock).
+        """
         # Population consumption
         food_consumption = self.population * 0.5  # 0.5 food per person per turn
-        self.remove_resource(ResourceType.FOOD, food_consumption)
+        fed = self.remove_resource(ResourceType.FOOD, food_consumption)
         
         # Energy consumption
-        energy_consumption = len(self.buildings) * 10  # Base energy per building
-        self.remove_resource(ResourceType.ENERGY, energy_consumption)
+        energy_consumption = self._building_count() * 10  # Base energy per building
+        powered = self.remove_resource(ResourceType.ENERGY, energy_consumption)
         
         # Update expansion rate (decays over time)
         self.expansion_rate *= 0.8
+        return (not fed) + (not powered)
+    
+    def advance_turns(self, turns: int):
+        """
+        Advance the economy by several turns, with the same result as calling
+        process_turn that many times, within these limits:
+        
+        - Stockpiles and stability agree up to float rounding, since a
+          stretch of turns is summed in one step. A stockpile that pays its
+          consumption every few turns and ends within rounding of paying is
+          taken to have paid (turn by turn it can go either way).
+        - With scheduled failures (schedule_failures) failures due in a
+          skipped stretch are redrawn from its end, and aggregated planets
+          draw nothing for skipped turns: later failures have the same odds
+          as when stepping but come from a different random stream.
+        
+        Once expansion_rate has decayed to 5 or below, stockpiles change by a
+        fixed amount per turn until the next event: an efficiency tier change,
+        a stockpile changing sign, food per capita crossing 1, or food/energy
+        consumption becoming (un)affordable. Each such stretch is applied in
+        one step, as are stockpiles that pay consumption only every few turns
+        and short repeating patterns of turns. Event turns, turns completing
+        queued construction and the final turn go through process_turn.
+        Building failures only last until the next efficiency reset, so the
+        skipped turns just move the random stream past their rolls.
+        """
+        if turns < 0:
+            raise ValueError("turns must be non-negative")
+        
+        log = self.command_log
+        if log is not None:
+            # Logged as one event; replay calls advance_turns too
+            log.record_advance(self, turns)
+            self.command_log = None
+            try:
+                self.advance_turns(turns)
+            finally:
+                self.command_log = log
+            return
+        
+        remaining = turns
+        stepped: List[tuple] = []  # signatures of the turns stepped since the last jump
+        while remaining > 1:
+            # Stop short of the next completion, which changes the buildings
+            limit = remaining - 1
+            due = self.next_completion()
+            if due is not None:
+                limit = min(limit, due - self.turn - 1)
+            jumped = limit > 0 and (self._fast_forward(limit)
+                                    or self._fast_forward_cycles(stepped, limit))
+            if jumped:
+                stepped.clear()
+            else:
+                if self.expansion_rate <= 5 and limit > 0:
+                    stepped.append(self._turn_plan(self._stock_vector())[0])
+                    del stepped[:-2 * MAX_CYCLE_PERIOD]
+                else:
+                    stepped.clear()
+                self.process_turn()
+                jumped = 1
+            remaining -= jumped
+        if remaining:
+            self.process_turn()
+    
+    def _skip_turn_rolls(self, turns: int):
+        """Move the random stream past the risk rolls of turns applied in closed form."""
+        if self._failures is not None:
+            # Failures in the skipped turns changed nothing that lasts; the
+            # wait is memoryless, so their next failures are drawn from now
+            self._failures.reschedule_due(self.turn, self.rng)
+            return
+        if self.aggregated:
+            # Binomial draws take a varying number of random numbers, so an
+            # aggregated planet's skipped turns draw nothing
+            return
+        skip_risk_rolls(self.rng, turns * self._building_count())
+    
+    def _stock_vector(self) -> List[float]:
+        resources = self.resources
+        return [resources[rt] for rt in RESOURCE_ORDER]
+    
+    def _consumption_vector(self) -> List[float]:
+        """End-of-turn consumption per resource (paid only when affordable)."""
+        consumption = [0.0] * len(RESOURCE_ORDER)
+        consumption[ResourceType.FOOD.index] = self.population * 0.5
+        consumption[ResourceType.ENERGY.index] = self._building_count() * 10
+        return consumption
+    
+    def _turn_plan(self, stock: List[float]) -> tuple:
+        """
+        How a turn starting from `stock` plays out (with expansion_rate <= 5).
+        Returns (signature, change): turns with equal signatures change the
+        stockpiles by the same amounts, and within a signature stability is
+        linear in the stockpiles.
+        """
+        stability = unclamped_stability(
+            self._strain, stock, self.debt, self.expansion_rate, self.population
+        )
+        efficiency = efficiency_for_stability(stability)
+        paid = []
+        change = []
+        for amount, produced, upkept, used in zip(
+            stock, self._gross, self._upkeep, self._consumption_vector()
+        ):
+            made = efficiency * produced - upkept
+            pays = bool(used) and amount + made >= used
+            paid.append(pays)
+            change.append(made - used if pays else made)
+        
+        signature = (
+            efficiency, tuple(paid),
+            tuple(amount < 0 for amount in stock),
+            stock[ResourceType.FOOD.index] < max(1, self.population),
+        )
+        return signature, change
+    
+    def _fast_forward(self, max_turns: int) -> int:
+        """
+        Apply up to max_turns turns in closed form, stopping before the first
+        turn that behaves differently from the current one. Returns the
+        number of turns applied (0 when the next turn has to be stepped).
+        """
+        if self.expansion_rate > 5 or max_turns < 2:
+            return 0
+        if DEBUG_AGGREGATES:
+            self.verify_aggregates()
+        
+        food = ResourceType.FOOD.index
+        per_capita = max(1, self.population)
+        
+        stock = self._stock_vector()
+        stability = unclamped_stability(
+            self._strain, stock, self.debt, self.expansion_rate, self.population
+        )
+        efficiency = efficiency_for_stability(stability)
+        production = [efficiency * produced - upkept
+                      for produced, upkept in zip(self._gross, self._upkeep)]
+        consumption = self._consumption_vector()
+        
+        # A stockpile below its consumption with a smaller positive production
+        # only pays consumption when it can: it cycles as (x + j * made) mod used.
+        # Every other stockpile changes by a fixed amount per turn.
+        cycling = [0 < made < used and 0 <= amount < used
+                   for amount, made, used in zip(stock, production, consumption)]
+        change = [made - used if amount + made >= used else made
+                  for amount, made, used in zip(stock, production, consumption)]
+        hungry = stock[food] < per_capita
+        
+        # Stability is linear in the turn count apart from a cycling food
+        # stockpile, which keeps it within [base, base + spread)
+        slope = sum(0.1 * step for amount, step, cycles in zip(stock, change, cycling)
+                    if amount < 0 and not cycles)
+        base, spread = stability, 0.0
+        if cycling[food]:
+            base -= 20 * stock[food] / per_capita
+            spread = 20 * consumption[food] / per_capita
+        elif hungry:
+            slope += 20 * change[food] / per_capita
+        
+        if efficiency_for_stability(base + spread) != efficiency_for_stability(base):
+            return 0
+        
+        crossings = [max_turns]
+        for amount, made, used, step, cycles in zip(stock, production, consumption, change, cycling):
+            if cycles:
+                continue
+            crossings.append(turns_until_crossing(amount, step, 0.0))
+            if used:
+                crossings.append(turns_until_crossing(amount + made, step, used))
+        if not cycling[food]:
+            crossings.append(turns_until_crossing(stock[food], change[food], per_capita))
+        for bound in EFFICIENCY_TIER_BOUNDS:
+            crossings.append(turns_until_crossing(base, slope, bound))
+            crossings.append(turns_until_crossing(base + spread, slope, bound))
+        turns = min(crossings)
+        
+        def stock_after(turn: int) -> List[float]:
+            return [
+                cycled_stock(amount, made, used, turn) if cycles else amount + turn * step
+                for amount, made, used, step, cycles
+                in zip(stock, production, consumption, change, cycling)
+            ]
+        
+        def unchanged_at(turn: int) -> bool:
+            later = stock_after(turn)
+            for amount, now, made, used, cycles in zip(later, stock, production, consumption, cycling):
+                if cycles:
+                    continue
+                if (amount < 0) != (now < 0) or (amount + made >= used) != (now + made >= used):
+                    return False
+            if not cycling[food] and (later[food] < per_capita) != hungry:
+                return False
+            later_base = unclamped_stability(
+                self._strain, later, self.debt, self.expansion_rate, self.population
+            )
+            if cycling[food]:
+                later_base -= 20 * later[food] / per_capita
+            return (efficiency_for_stability(later_base) == efficiency
+                    and efficiency_for_stability(later_base + spread) == efficiency)
+        
+        # Every condition is monotone over the stretch, so it holds throughout
+        # iff it holds on the last turn; this absorbs rounding at the crossings
+        # (and the strict > 90 tier bound)
+        while turns >= 2 and not unchanged_at(turns - 1):
+            turns -= 1
+        if turns < 2:
+            return 0
+        
+        self.turn += turns
+        self.stability = compute_stability(
+            self._strain, stock_after(turns - 1), self.debt,
+            self.expansion_rate * 0.8 ** (turns - 1), self.population
+        )
+        self._set_uniform_efficiency(efficiency)
+        
+        resources = self.resources
+        for resource_type, amount in zip(RESOURCE_ORDER, stock_after(turns)):
+            resources[resource_type] = amount
+        self.expansion_rate *= 0.8 ** turns
+        
+        self._skip_turn_rolls(turns)
+        return turns
+    
+    def _fast_forward_cycles(self, stepped: List[tuple], max_turns: int) -> int:
+        """
+        Apply whole repetitions of a cycle of turns in closed form.
+        
+        Stockpiles that pay consumption only every few turns can push
+        stability back and forth across a tier bound, so the turns repeat a
+        short pattern instead of settling. Once the last few stepped turns
+        repeat, each further repetition moves the stockpiles by the same
+        total, and every phase's signature is monotone in the repetition
+        count, so the number of repetitions that keep the pattern is found
+        by a search over that count. Returns the number of turns applied.
+        """
+        if self.expansion_rate > 5:
+            return 0
+        
+        for period in range(2, min(len(stepped) // 2, MAX_CYCLE_PERIOD) + 1):
+            if stepped[-period:] == stepped[-2 * period:-period]:
+                break
+        else:
+            return 0
+        max_cycles = max_turns // period
+        if max_cycles < 1:
+            return 0
+        
+        stock = self._stock_vector()
+        phases = []
+        state = stock
+        for _ in range(period):
+            signature, change = self._turn_plan(state)
+            phases.append((signature, change))
+            state = [amount + step for amount, step in zip(state, change)]
+        cycle_change = [amount - start for amount, start in zip(state, stock)]
+        
+        def phase_starts(cycle: int) -> List[List[float]]:
+            state = [amount + cycle * step for amount, step in zip(stock, cycle_change)]
+            starts = []
+            for _, change in phases:
+                starts.append(state)
+                state = [amount + step for amount, step in zip(state, change)]
+            return starts
+        
+        def repeats(cycle: int) -> bool:
+            return all(self._turn_plan(start)[0] == signature
+                       for start, (signature, _) in zip(phase_starts(cycle), phases))
+        
+        # Largest cycle index below max_cycles that still repeats: grow, then bisect
+        good, bad = 0, 1
+        while bad < max_cycles and repeats(bad):
+            good, bad = bad, min(bad * 2, max_cycles)
+        while bad - good > 1:
+            middle = (good + bad) // 2
+            if repeats(middle):
+                good = middle
+            else:
+                bad = middle
+        cycles = good + 1
+        
+        turns = cycles * period
+        last_start = phase_starts(cycles - 1)[-1]
+        self.turn += turns
+        self.stability = compute_stability(
+            self._strain, last_start, self.debt,
+            self.expansion_rate * 0.8 ** (turns - 1), self.population
+        )
+        self._set_uniform_efficiency(phases[-1][0][0])
+        
+        resources = self.resources
+        for resource_type, amount, step in zip(RESOURCE_ORDER, stock, cycle_change):
+            resources[resource_type] = amount + cycles * step
+        self.expansion_rate *= 0.8 ** turns
+        
+        self._skip_turn_rolls(turns)
+        return turns
+    
+    def add_building(self, building: ProductionBuilding):
+        """
+        Add a building without costs or checks (construct_building does both).
+        A fork keeps sharing its base planet's buildings; an aggregated
+        planet counts the building instead of keeping it.
+        """
+        if self._fork_base is None:
+            self.buildings.append(building)
+            return
+        self._release_forks()
+        if self.aggregated:
+            if building._owner is not None:
+                raise ValueError(f"{building.name} already belongs to a planet")
+            self._fork_base.add(building.spec, building.production_efficiency)
+            self._track_building(building)
+            if self._tracker is not None:
+                self._tracker.mark("buildings")
+            return
+        self._buildings_added((building,))
+        self._fork_added.append(building)
     
     def construct_building(self, building: ProductionBuilding) -> tuple[bool, str]:
         """
         Attempt to construct a building.
         Returns (success, message).
         """
+        if self.command_log is not None:
+            self.command_log.record_construction(self, building)
+        
+        success, message = self._start_construction(building)
+        if not success:
+            return success, message
+        
+        # Add building
+        self.add_building(building)
+        
+        return True, f"Successfully constructed {building.name}"
+    
+    def _start_construction(self, building: ProductionBuilding) -> tuple[bool, str]:
+        """Check a construction, then pay for it and count the expansion."""
         # Check if we have resources
         if not self.has_resources(building.construction_costs):
             return False, "Insufficient resources"
@@ -295,13 +2298,74 @@ class PlanetState:
         for resource_type, amount in building.construction_costs.items():
             self.remove_resource(resource_type, amount)
         
-        # Add building
-        self.buildings.append(building)
-        
         # Update expansion rate
         self.expansion_rate += 1
         
-        return True, f"Successfully constructed {building.name}"
+        return True, f"Started construction of {building.name}"
+    
+    def _queue(self) -> ConstructionQueue:
+        if self.construction_queue is None:
+            self.construction_queue = ConstructionQueue()
+        return self.construction_queue
+    
+    def queue_construction(self, building: ProductionBuilding) -> tuple[bool, str]:
+        """
+        Start constructing a building. Costs, checks and expansion are as
+        for construct_building, but the building joins the planet only at
+        the end of turn `turn + construction_time` (at the earliest, the
+        end of the next turn). Returns (success, message).
+        """
+        if self.command_log is not None:
+            self.command_log.record_queued_construction(self, building)
+        
+        success, message = self._start_construction(building)
+        if success:
+            self._queue().push(building, self.turn + building.construction_time)
+        return success, message
+    
+    def queue_constructions(self, buildings: Iterable[ProductionBuilding]) -> List[tuple[bool, str]]:
+        """
+        queue_construction for each building in turn, with the accepted
+        ones added to the queue together. Returns each (success, message).
+        """
+        results = []
+        started = []
+        for building in buildings:
+            if self.command_log is not None:
+                self.command_log.record_queued_construction(self, building)
+            success, message = self._start_construction(building)
+            if success:
+                started.append((building, self.turn + building.construction_time))
+            results.append((success, message))
+        if started:
+            self._queue().extend(started)
+        return results
+    
+    def cancel_construction(self, building: ProductionBuilding) -> bool:
+        """
+        Stop constructing a queued building and refund its construction
+        costs (the expansion it counted stays). False if it is not queued.
+        """
+        queue = self.construction_queue
+        if queue is None or building not in queue:
+            return False
+        if self.command_log is not None:
+            self.command_log.record_cancellation(self, building)
+        queue.cancel(building)
+        for resource_type, amount in building.construction_costs.items():
+            self.add_resource(resource_type, amount)
+        return True
+    
+    def next_completion(self) -> Optional[int]:
+        """Turn the next queued building completes on, or None."""
+        if self.construction_queue is None:
+            return None
+        return self.construction_queue.next_completion()
+    
+    def _complete_constructions(self):
+        """Add the queued buildings due by this turn."""
+        for building in self.construction_queue.pop_due(self.turn):
+            self.add_building(building)
     
     def get_economic_report(self) -> Dict:
         """Generate a comprehensive economic report."""
@@ -310,20 +2374,94 @@ class PlanetState:
             "stability": self.stability,
             "population": self.population,
             "resources": {rt.value: self.resources.get(rt, 0) for rt in ResourceType},
-            "buildings": len(self.buildings),
+            "buildings": self._building_count(),
             "expansion_rate": self.expansion_rate,
             "debt": self.debt,
         }
         
-        # Calculate net production
-        net_production = {}
-        for building in self.buildings:
-            for resource_type, amount in building.get_net_production().items():
-                net_production[resource_type] = net_production.get(resource_type, 0) + amount
-        
-        report["net_production"] = {rt.value: net_production.get(rt, 0) for rt in ResourceType}
+        report["net_production"] = self._net_production_report()
         
         return report
+    
+    def _net_production_report(self) -> Dict[str, float]:
+        """Net production from the running totals."""
+        if DEBUG_AGGREGATES:
+            self.verify_aggregates()
+        return {
+            rt.value: output - upkeep
+            for rt, output, upkeep in zip(RESOURCE_ORDER, self._output, self._upkeep)
+        }
+    
+    def track_changes(self) -> ChangeTracker:
+        """
+        Start tracking which report fields change, for sending clients
+        deltas (delta_publisher.DeltaPublisher). Every later change to the
+        turn, stability, population, debt, expansion rate, a stockpile, the
+        building count or net production is marked on the returned tracker,
+        as it happens. Calling it again returns the same tracker.
+        """
+        if self._tracker is None:
+            self._tracker = ChangeTracker()
+            self._resources = TrackedResourceStock(self._resources, self._tracker)
+        return self._tracker
+    
+    @property
+    def state_version(self) -> Optional[int]:
+        """
+        Number that grows whenever the planet's stockpiles, buildings,
+        running totals or report fields change, for caching results
+        computed from them. None until track_changes() is called: reading
+        it does not start tracking, which adds a little to every later change.
+        """
+        tracker = self._tracker
+        return None if tracker is None else tracker.version
+
+    def get_report_changes(self, epoch: int) -> Dict:
+        """
+        The get_economic_report fields changed since the tracker cut `epoch`,
+        with only the changed stockpiles under "resources".
+        """
+        fields_changed, resources_changed = self._tracker.changed_since(epoch)
+        changes = {}
+        for name in fields_changed:
+            if name == "buildings":
+                changes[name] = self._building_count()
+            elif name == "net_production":
+                changes[name] = self._net_production_report()
+            else:
+                changes[name] = getattr(self, name)
+        if resources_changed:
+            resources = self.resources
+            changes["resources"] = {rt.value: resources[rt] for rt in resources_changed}
+        return changes
+
+
+# Stockpiles are always a ResourceStock; building assignment goes through
+# BuildingList so the running totals and table stay in sync
+PlanetState.resources = property(PlanetState._get_resources, PlanetState._set_resources)
+PlanetState.buildings = property(PlanetState._get_buildings, PlanetState._set_buildings)
+
+
+def _tracked_property(name: str, doc: str) -> property:
+    """Property for a report field, marking changes on tracked planets."""
+    attribute = "_" + name
+    
+    def set(self, value):
+        tracker = self._tracker
+        if tracker is not None and value != getattr(self, attribute, None):
+            tracker.mark(name)
+        setattr(self, attribute, value)
+    
+    return property(attrgetter(attribute), set, doc=doc)
+
+
+# Scalar report fields, stored as _turn, _stability, ...
+TRACKED_SCALARS = ("turn", "stability", "population", "debt", "expansion_rate")
+PlanetState.turn = _tracked_property("turn", "Turn counter")
+PlanetState.stability = _tracked_property("stability", "Planet stability (0-100, below 30 is critical)")
+PlanetState.population = _tracked_property("population", "Population")
+PlanetState.debt = _tracked_property("debt", "Outstanding debt")
+PlanetState.expansion_rate = _tracked_property("expansion_rate", "Buildings added per turn, decaying")
 
 
 # Building templates - create instances of these for construction
@@ -534,10 +2672,321 @@ BUILDING_TEMPLATES = {
 }
 
 
+def next_completion(planets: Iterable[PlanetState]) -> Optional[Tuple[int, PlanetState]]:
+    """
+    The planet whose queued construction completes soonest, as (turns from
+    now, planet), or None when nothing is queued. For hosts ticking many
+    planets together: planets with nothing due within a stretch of turns
+    can be advanced through it in one advance_turns call.
+    """
+    soonest = None
+    for planet in planets:
+        due = planet.next_completion()
+        if due is not None and (soonest is None or due - planet.turn < soonest[0]):
+            soonest = (due - planet.turn, planet)
+    return soonest
+
+
 def create_building(building_type: BuildingType) -> ProductionBuilding:
-    """Create a new building instance from a template."""
-    import copy
-    return copy.deepcopy(BUILDING_TEMPLATES[building_type])
+    """Create a new building instance from a template (sharing its spec)."""
+    template = BUILDING_TEMPLATES[building_type]
+    return ProductionBuilding.from_spec(template.spec, template.production_efficiency)
+
+
+def get_building_spec(building_type: BuildingType, level: int = 1) -> BuildingSpec:
+    """Shared spec for a building type at a given level."""
+    spec = BUILDING_TEMPLATES[building_type].spec
+    while spec.level < level:
+        spec = spec.upgraded()
+    return spec
+
+
+def run_rollouts(snapshot: PlanetSnapshot, turns: int, seeds: Sequence[int]) -> List[tuple]:
+    """
+    Play one independent rollout of `turns` turns per seed, starting from the
+    snapshot. Returns (lowest_stability, final_stability, final_resources)
+    per rollout, in seed order. Module level so process pools can call it.
+    """
+    outcomes = []
+    start = PlanetState.from_snapshot(snapshot)
+    for seed in seeds:
+        planet = start.fork(seed=seed)
+        lowest = planet.calculate_stability()
+        for _ in range(turns):
+            planet.process_turn()
+            lowest = min(lowest, planet.stability)
+        final = planet.calculate_stability()
+        outcomes.append((
+            min(lowest, final),
+            final,
+            tuple(planet.resources[rt] for rt in RESOURCE_ORDER),
+        ))
+    return outcomes
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Linearly interpolated percentile (0-100) of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class HistoryRing:
+    """
+    Fixed-capacity ring buffer of turn records, one typed array per metric.
+    Once full, each new record overwrites the oldest.
+    """
+    
+    def __init__(self, capacity: int, typecodes: Sequence[str]):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = [array(code, [0]) * capacity for code in typecodes]
+        self.count = 0
+        self._next = 0  # slot the next record goes into
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def append(self, values: Sequence[float]):
+        slot = self._next
+        for column, value in zip(self.columns, values):
+            column[slot] = value
+        self._next = (slot + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def value(self, column: int, back: int = 0) -> float:
+        """Value `back` records before the latest one."""
+        if not 0 <= back < self.count:
+            raise IndexError("History record out of range")
+        return self.columns[column][(self._next - 1 - back) % self.capacity]
+    
+    def window(self, column: int, records: Optional[int] = None) -> array:
+        """The last `records` values (all by default), oldest first."""
+        records = self.count if records is None else max(0, min(records, self.count))
+        data = self.columns[column]
+        start = (self._next - records) % self.capacity
+        if start + records <= self.capacity:
+            return data[start:start + records]
+        return data[start:] + data[:self._next]
+
+
+# Metrics kept by EconomyHistory: turn, stability, building count, every
+# stockpile, then every net production rate (keyed like economic reports)
+HISTORY_METRICS = (
+    "turn", "stability", "buildings",
+    *(rt.value for rt in RESOURCE_ORDER),
+    *(f"{rt.value}_net" for rt in RESOURCE_ORDER),
+)
+HISTORY_TYPECODES = ("q", "d", "q", *("d" for _ in RESOURCE_ORDER), *("d" for _ in RESOURCE_ORDER))
+HISTORY_COLUMNS = {name: index for index, name in enumerate(HISTORY_METRICS)}
+
+
+def history_values(planet: PlanetState) -> tuple:
+    """A planet's current values of HISTORY_METRICS, in order."""
+    resources = planet.resources
+    return (
+        planet.turn, planet.stability, planet._building_count(),
+        *[resources[rt] for rt in RESOURCE_ORDER],
+        *map(sub, planet._output, planet._upkeep),
+    )
+
+
+class EconomyHistory:
+    """
+    Bounded per-turn history of a planet's economy.
+    
+    The last `capacity` turns are kept in a HistoryRing. With `downsample`
+    set, every downsample-th turn is also kept in a second ring of
+    `long_capacity` records, so long-range trends survive after the recent
+    turns have been overwritten.
+    """
+    
+    def __init__(self, capacity: int = 1000, downsample: Optional[int] = 10,
+                 long_capacity: int = 1000):
+        self.recent = HistoryRing(capacity, HISTORY_TYPECODES)
+        self.downsample = downsample
+        self.long_range = HistoryRing(long_capacity, HISTORY_TYPECODES) if downsample else None
+        self.recorded = 0  # turns recorded in total
+    
+    def __len__(self) -> int:
+        return len(self.recent)
+    
+    def record(self, planet: PlanetState):
+        """Record the planet's current state as the latest turn."""
+        values = history_values(planet)
+        self.recent.append(values)
+        if self.long_range is not None and self.recorded % self.downsample == 0:
+            self.long_range.append(values)
+        self.recorded += 1
+    
+    def column(self, metric: str, turns: Optional[int] = None, long_range: bool = False) -> array:
+        """
+        A metric's values over the last `turns` recorded turns (all kept
+        turns by default), oldest first. With long_range=True the values
+        come from the downsampled ring, one per downsample turns.
+        """
+        if long_range:
+            if self.long_range is None:
+                raise ValueError("History is not downsampled")
+            if turns is not None:
+                turns = -(-turns // self.downsample)
+            return self.long_range.window(HISTORY_COLUMNS[metric], turns)
+        return self.recent.window(HISTORY_COLUMNS[metric], turns)
+    
+    def value(self, metric: str, turns_ago: int = 0) -> float:
+        """
+        A metric as recorded `turns_ago` turns before the latest record.
+        Turns older than the recent ring come from the nearest earlier
+        downsampled record, and from the oldest one kept beyond that.
+        """
+        column = HISTORY_COLUMNS[metric]
+        if turns_ago < len(self.recent) or self.long_range is None or not self.long_range.count:
+            return self.recent.value(column, min(turns_ago, len(self.recent) - 1))
+        
+        # Downsampled records are turns 0, k, 2k, ... of the recording
+        wanted = max(0, self.recorded - 1 - turns_ago)
+        latest = (self.recorded - 1) // self.downsample
+        back = latest - wanted // self.downsample
+        return self.long_range.value(column, min(back, self.long_range.count - 1))
+
+
+def _payback_turns(building: ProductionBuilding, net_production: Dict[ResourceType, float]) -> float:
+    """Estimated turns for a building to recoup its construction cost."""
+    construction_cost = building.get_total_construction_cost()
+    total_value_per_turn = sum(
+        amount * (2.0 if rt == ResourceType.RARE_MINERALS else 1.0)
+        for rt, amount in net_production.items()
+    )
+    return construction_cost / max(0.1, total_value_per_turn) if total_value_per_turn > 0 else float('inf')
+
+
+class TemplateMatrix(NamedTuple):
+    """
+    What simulate_construction needs from each template, precomputed once:
+    one row per (building type, level), resources indexed like RESOURCE_ORDER.
+    """
+    specs: Tuple[BuildingSpec, ...]
+    costs: Tuple[Tuple[Tuple[int, float], ...], ...]  # (resource index, cost) per row
+    stability_costs: Tuple[float, ...]
+    net_production: Tuple[Tuple[float, ...], ...]
+    payback_turns: Tuple[float, ...]
+
+
+_TEMPLATE_MATRICES: Dict[bool, TemplateMatrix] = {}
+
+
+def template_matrix(all_levels: bool = False) -> TemplateMatrix:
+    """Template rows for every building type (and every level, with all_levels)."""
+    matrix = _TEMPLATE_MATRICES.get(all_levels)
+    if matrix is not None:
+        return matrix
+    
+    buildings = []
+    for building_type in BUILDING_ORDER:
+        buildings.append(create_building(building_type))
+        if all_levels:
+            spec = buildings[-1].spec
+            while spec.level < spec.max_level:
+                spec = spec.upgraded()
+                buildings.append(ProductionBuilding.from_spec(spec))
+    net_production = [building.get_net_production() for building in buildings]
+    matrix = _TEMPLATE_MATRICES[all_levels] = TemplateMatrix(
+        specs=tuple(building.spec for building in buildings),
+        costs=tuple(
+            tuple((rt.index, cost) for rt, cost in building.construction_costs.items())
+            for building in buildings
+        ),
+        stability_costs=tuple(building.stability_cost for building in buildings),
+        net_production=tuple(
+            tuple(net.get(rt, 0) for rt in RESOURCE_ORDER) for net in net_production
+        ),
+        payback_turns=tuple(
+            _payback_turns(building, net) for building, net in zip(buildings, net_production)
+        ),
+    )
+    return matrix
+
+
+class ConstructionTable(NamedTuple):
+    """
+    simulate_construction for many buildings at once, as columns with one
+    entry per row (see EconomyManager.simulate_all_constructions).
+    """
+    building_types: Tuple[BuildingType, ...]
+    levels: Tuple[int, ...]
+    current_stability: float
+    can_afford: Tuple[bool, ...]
+    projected_stability: Tuple[float, ...]
+    net_production: Tuple[Tuple[float, ...], ...]  # indexed like RESOURCE_ORDER
+    payback_turns: Tuple[float, ...]
+    risk_assessment: Tuple[str, ...]
+    recommendation: Tuple[str, ...]
+    
+    def __len__(self) -> int:
+        return len(self.building_types)
+    
+    def index(self, building_type: BuildingType, level: int = 1) -> int:
+        """Row of a building type at a level."""
+        for row, (row_type, row_level) in enumerate(zip(self.building_types, self.levels)):
+            if row_type == building_type and row_level == level:
+                return row
+        raise KeyError((building_type, level))
+    
+    def row(self, row: int) -> Dict:
+        """One row in simulate_construction's format."""
+        projected_stability = self.projected_stability[row]
+        return {
+            "can_afford": self.can_afford[row],
+            "current_stability": self.current_stability,
+            "projected_stability": projected_stability,
+            "stability_change": projected_stability - self.current_stability,
+            "net_production": {
+                rt.value: amount for rt, amount in zip(RESOURCE_ORDER, self.net_production[row])
+            },
+            "payback_turns": self.payback_turns[row],
+            "risk_assessment": self.risk_assessment[row],
+            "recommendation": self.recommendation[row],
+        }
+
+
+class LRUCache:
+    """Mapping of at most `maxsize` entries, evicting the least recently used."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key, default=None):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
 
 
 class EconomyManager:
@@ -546,16 +2995,55 @@ class EconomyManager:
     Provides helper methods for common operations.
     """
     
-    def __init__(self, planet: PlanetState):
+    def __init__(self, planet: PlanetState, seed: Optional[int] = None,
+                 history_capacity: int = 1000, history_downsample: Optional[int] = 10,
+                 history_log=None, instruments=None, simulation_cache_size: int = 256):
         self.planet = planet
-        self.history: List[Dict] = []
+        self.history = EconomyHistory(history_capacity, history_downsample)
+        
+        # Optional on-disk sink (history_log.HistoryLog) fed by record_turn
+        self.history_log = history_log
+        
+        # Optional turn instrumentation (instrumentation.TurnInstruments),
+        # kept on the planet so it can be shared with other planets
+        if instruments is not None:
+            planet.instruments = instruments
+        
+        # Manager-level stream for forecasts and planning, separate from the planet's
+        self.rng = random.Random(seed)
+        
+        # simulate_construction results by (planet, state version, type, level);
+        # planets that do not track changes have no state version and are not cached
+        self.simulation_cache = LRUCache(simulation_cache_size)
     
-    def simulate_construction(self, building_type: BuildingType) -> Dict:
+    def simulate_construction(self, building_type: BuildingType, level: int = 1) -> Dict:
         """
         Simulate what would happen if we constructed a building.
         Returns projected impact without actually building.
+        
+        On planets that track changes (PlanetState.track_changes) results
+        are cached until the planet changes (see PlanetState.state_version),
+        so repeated queries between turns are dictionary lookups.
         """
-        building = create_building(building_type)
+        planet = self.planet
+        version = planet.state_version if self.simulation_cache.maxsize > 0 else None
+        if version is not None:
+            # The tracker stands in for the planet, and the key keeps it alive
+            key = (planet._tracker, version, building_type, level)
+            cached = self.simulation_cache.get(key)
+            if cached is not None:
+                return {**cached, "net_production": dict(cached["net_production"])}
+        
+        result = self._simulate_construction(building_type, level)
+        if version is not None:
+            self.simulation_cache.put(key, {**result, "net_production": dict(result["net_production"])})
+        return result
+    
+    def _simulate_construction(self, building_type: BuildingType, level: int) -> Dict:
+        if level == 1:
+            building = create_building(building_type)
+        else:
+            building = ProductionBuilding.from_spec(get_building_spec(building_type, level))
         
         # Check current state
         current_stability = self.planet.calculate_stability()
@@ -574,15 +3062,7 @@ class EconomyManager:
         
         # Calculate payback period
         net_production = building.get_net_production()
-        construction_cost = building.get_total_construction_cost()
-        
-        # Estimate turns to recoup investment
-        total_value_per_turn = sum(
-            amount * (2.0 if rt == ResourceType.RARE_MINERALS else 1.0)
-            for rt, amount in net_production.items()
-        )
-        
-        payback_turns = construction_cost / max(0.1, total_value_per_turn) if total_value_per_turn > 0 else float('inf')
+        payback_turns = _payback_turns(building, net_production)
         
         return {
             "can_afford": can_afford,
@@ -597,6 +3077,45 @@ class EconomyManager:
             )
         }
     
+    def simulate_all_constructions(self, all_levels: bool = False) -> ConstructionTable:
+        """
+        simulate_construction for every building type (at every level, with
+        all_levels) in one pass: stability is computed once and each
+        template's costs, net production and payback come precomputed from
+        template_matrix(). Cached like simulate_construction.
+        """
+        planet = self.planet
+        version = planet.state_version if self.simulation_cache.maxsize > 0 else None
+        if version is not None:
+            key = (planet._tracker, version, "all", all_levels)
+            cached = self.simulation_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        matrix = template_matrix(all_levels)
+        current_stability = planet.calculate_stability()
+        stock = planet._stock_vector()
+        can_afford = tuple(
+            all(stock[index] - cost >= 0 for index, cost in costs) for costs in matrix.costs
+        )
+        projected = tuple(current_stability - cost for cost in matrix.stability_costs)
+        table = ConstructionTable(
+            building_types=tuple(spec.type for spec in matrix.specs),
+            levels=tuple(spec.level for spec in matrix.specs),
+            current_stability=current_stability,
+            can_afford=can_afford,
+            projected_stability=projected,
+            net_production=matrix.net_production,
+            payback_turns=matrix.payback_turns,
+            risk_assessment=tuple(map(self._assess_risk, projected, matrix.specs)),
+            recommendation=tuple(map(
+                self._get_recommendation, can_afford, projected, matrix.payback_turns, matrix.specs
+            )),
+        )
+        if version is not None:
+            self.simulation_cache.put(key, table)
+        return table
+    
     def _assess_risk(self, projected_stability: float, building: ProductionBuilding) -> str:
         """Assess risk level of construction."""
         if projected_stability < 30:
@@ -638,9 +3157,8 @@ class EconomyManager:
         """
         build_order = []
         
-        # Create a temporary copy to simulate
-        import copy
-        temp_planet = copy.deepcopy(self.planet)
+        # Simulate on a fork, which shares the planet's buildings
+        temp_planet = self.planet.fork()
         
         for _ in range(turns):
             best_building = None
@@ -680,7 +3198,7 @@ class EconomyManager:
                 building = create_building(best_building)
                 for rt, cost in building.construction_costs.items():
                     temp_planet.remove_resource(rt, cost)
-                temp_planet.buildings.append(building)
+                temp_planet.add_building(building)
                 temp_planet.process_turn()
             else:
                 # Can't build anything, just process turn
@@ -688,27 +3206,112 @@ class EconomyManager:
         
         return build_order
     
+    def forecast(
+        self, turns: int = 10, trials: int = 1000, workers: Optional[int] = None,
+        seed: Optional[int] = None, collapse_threshold: float = 30.0,
+        percentiles: Sequence[float] = (5, 50, 95)
+    ) -> Dict:
+        """
+        Monte Carlo forecast of the next N turns.
+        
+        Runs `trials` independent seeded rollouts of process_turn from the
+        planet's current state, spread over a process pool (workers=1 runs
+        them in this process), and summarises the spread of outcomes.
+        Workers only receive a compact PlanetSnapshot. Rollout seeds come
+        from the manager's random stream (or from `seed`), so the result does
+        not depend on the number of workers.
+        """
+        snapshot = self.planet.snapshot()
+        rng = self.rng if seed is None else random.Random(seed)
+        seeds = [rng.getrandbits(64) for _ in range(trials)]
+        
+        if workers is None:
+            import os
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, trials))
+        
+        if workers == 1:
+            outcomes = run_rollouts(snapshot, turns, seeds)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            
+            # A few chunks per worker keeps the pool busy without per-trial overhead
+            chunk_size = max(1, math.ceil(trials / (workers * 4)))
+            chunks = [seeds[i:i + chunk_size] for i in range(0, trials, chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(
+                    run_rollouts,
+                    itertools.repeat(snapshot, len(chunks)),
+                    itertools.repeat(turns, len(chunks)),
+                    chunks,
+                )
+                outcomes = [outcome for chunk in results for outcome in chunk]
+        
+        def summarise(values):
+            ordered = sorted(values)
+            return {pct: percentile(ordered, pct) for pct in percentiles}
+        
+        collapses = sum(1 for lowest, _, _ in outcomes if lowest < collapse_threshold)
+        return {
+            "turns": turns,
+            "trials": trials,
+            "collapse_threshold": collapse_threshold,
+            "collapse_probability": collapses / trials if trials else 0.0,
+            "stability": summarise(final for _, final, _ in outcomes),
+            "lowest_stability": summarise(lowest for lowest, _, _ in outcomes),
+            "resources": {
+                rt.value: summarise(stock[rt.index] for _, _, stock in outcomes)
+                for rt in RESOURCE_ORDER
+            },
+        }
+    
+    def plan_build_order(
+        self, turns: int = 10, beam_width: int = 2, max_nodes: Optional[int] = None,
+        time_budget: Optional[float] = None, min_stability: float = 40.0
+    ) -> Dict:
+        """
+        Search build schedules several turns ahead (see build_planner).
+        Returns the best schedule found within the budgets - one entry per
+        turn, a BuildingType or None - along with its value and the value of
+        the greedy plan it started from.
+        """
+        from build_planner import BuildPlanner
+        
+        planner = BuildPlanner(self.planet, min_stability=min_stability)
+        return planner.search(turns, beam_width=beam_width, max_nodes=max_nodes,
+                              time_budget=time_budget)
+    
     def record_turn(self):
         """Record current turn to history."""
-        self.history.append(self.planet.get_economic_report())
+        self.history.record(self.planet)
+        if self.history_log is not None:
+            self.history_log.record(self.planet)
     
     def get_economic_trends(self, turns: int = 10) -> Dict:
-        """Analyze economic trends over the last N turns."""
-        if len(self.history) < 2:
+        """
+        Analyze economic trends over the last N turns; turns=0 covers the
+        whole history (as far back as it is kept).
+        """
+        if turns < 0:
+            raise ValueError("turns must be non-negative")
+        history = self.history
+        if len(history) < 2:
             return {"error": "Insufficient history"}
         
-        recent = self.history[-turns:]
+        # Change from the first to the last of the last N records
+        start = min(turns or history.recorded, history.recorded) - 1
+        
+        def change(metric: str) -> float:
+            return history.value(metric) - history.value(metric, start)
         
         trends = {
-            "stability_trend": recent[-1]["stability"] - recent[0]["stability"],
-            "building_growth": recent[-1]["buildings"] - recent[0]["buildings"],
+            "stability_trend": change("stability"),
+            "building_growth": change("buildings"),
         }
         
         # Resource trends
         for resource_type in ResourceType:
             key = resource_type.value
-            start = recent[0]["resources"].get(key, 0)
-            end = recent[-1]["resources"].get(key, 0)
-            trends[f"{key}_trend"] = end - start
+            trends[f"{key}_trend"] = change(key)
         
         return trends
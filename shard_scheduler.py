@@ -0,0 +1,332 @@
+"""
+Genesis Frontier - Sharded Tick Scheduler
+Ticks planets across worker processes, with galaxy-wide state in shared memory.
+"""
+
+from array import array
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import multiprocessing
+import os
+import pickle
+import time
+
+from resource_economy import (
+    PlanetState, HISTORY_METRICS, HISTORY_COLUMNS, history_values
+)
+
+
+# One row of float64 per planet in the shared block, laid out like
+# HISTORY_METRICS (turn, stability, buildings, stockpiles, net production)
+METRIC_COUNT = len(HISTORY_METRICS)
+ROW_BYTES = 8 * METRIC_COUNT
+
+# Per-planet turn cost estimate: buildings plus this fixed overhead
+PLANET_BASE_COST = 5
+
+# Rebalance when the slowest shard takes this much longer than the mean
+REBALANCE_SKEW = 1.25
+
+
+def pack_planet(planet: PlanetState) -> bytes:
+    """Pickle a planet for another process (running totals included)."""
+    return pickle.dumps(planet, pickle.HIGHEST_PROTOCOL)
+
+
+def unpack_planet(packed: bytes) -> PlanetState:
+    """Rebuild a planet packed by pack_planet."""
+    return pickle.loads(packed)
+
+
+def _shard_worker(connection, block_name: str):
+    """
+    Worker process: owns one shard's planets, ticks them on request and
+    writes each planet's row of the shared block after every tick.
+    """
+    # Workers share the coordinator's resource tracker, so attaching here
+    # leaves cleanup to the coordinator's unlink
+    block = shared_memory.SharedMemory(name=block_name)
+    rows = block.buf.cast("d")
+    planets: Dict[int, PlanetState] = {}
+
+    def publish(index: int, planet: PlanetState):
+        rows[index * METRIC_COUNT:(index + 1) * METRIC_COUNT] = array("d", history_values(planet))
+
+    try:
+        while True:
+            message = connection.recv()
+            kind = message[0]
+            if kind == "tick":
+                turns = message[1]
+                start = time.perf_counter()
+                for index, planet in planets.items():
+                    for _ in range(turns):
+                        planet.process_turn()
+                    publish(index, planet)
+                connection.send(time.perf_counter() - start)
+            elif kind == "adopt":
+                for index, packed in message[1]:
+                    planets[index] = planet = unpack_planet(packed)
+                    publish(index, planet)
+                connection.send(None)
+            elif kind == "release":
+                connection.send([(index, pack_planet(planets.pop(index))) for index in message[1]])
+            elif kind == "fetch":
+                connection.send([(index, pack_planet(planets[index])) for index in message[1]])
+            elif kind == "call":
+                index, method, args = message[1:]
+                try:
+                    result = (True, getattr(planets[index], method)(*args))
+                except Exception as e:
+                    result = (False, e)
+                publish(index, planets[index])
+                connection.send(result)
+            elif kind == "stop":
+                break
+    finally:
+        rows.release()
+        block.close()
+        connection.close()
+
+
+class ShardedScheduler:
+    """
+    Ticks planets split across worker processes.
+
+    Every planet keeps its own random stream and planets never interact, so
+    a planet plays out exactly as it would in one process however the
+    planets are sharded or moved. Each tick goes to every shard and returns
+    once all of them have finished (a barrier), after which state() shows
+    every planet's turn, stability, building count, stockpiles and net
+    production straight from shared memory.
+
+    Shards are filled by estimated cost (buildings per planet). Every
+    `rebalance_interval` ticks, if the slowest shard took more than
+    REBALANCE_SKEW times the mean, planets move from slow shards to fast
+    ones.
+    """
+
+    def __init__(self, planets: Iterable[PlanetState], workers: Optional[int] = None,
+                 rebalance_interval: int = 10, assignment: Optional[Sequence[int]] = None,
+                 context=None):
+        planets = list(planets)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = max(1, min(workers, len(planets)))
+        self.names = [planet.name for planet in planets]
+        self.rebalance_interval = rebalance_interval
+        self.ticks = 0
+        self.moves = 0  # planets moved between shards by rebalancing
+
+        self._block = shared_memory.SharedMemory(create=True, size=max(1, len(planets) * ROW_BYTES))
+        self._rows = self._block.buf.cast("d")
+        self._shard_time = [0.0] * self.workers  # seconds since the last balance check
+        self._processes = []
+        self._connections = []
+        context = context or multiprocessing.get_context()
+        try:
+            for _ in range(self.workers):
+                parent, child = context.Pipe()
+                process = context.Process(target=_shard_worker, args=(child, self._block.name), daemon=True)
+                process.start()
+                child.close()
+                self._processes.append(process)
+                self._connections.append(parent)
+
+            if assignment is None:
+                assignment = self._partition([planet._building_count() + PLANET_BASE_COST for planet in planets])
+            elif len(assignment) != len(planets) or not all(0 <= s < self.workers for s in assignment):
+                raise ValueError("assignment needs a shard in range for every planet")
+            self._shard_of = list(assignment)
+            for shard, connection in enumerate(self._connections):
+                connection.send(("adopt", [
+                    (index, pack_planet(planet))
+                    for index, planet in enumerate(planets) if self._shard_of[index] == shard
+                ]))
+            for connection in self._connections:
+                connection.recv()
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _partition(self, costs: Sequence[float]) -> List[int]:
+        """Largest planets first, each to the least loaded shard."""
+        loads = [0.0] * self.workers
+        shard_of = [0] * len(costs)
+        for index in sorted(range(len(costs)), key=costs.__getitem__, reverse=True):
+            shard = loads.index(min(loads))
+            shard_of[index] = shard
+            loads[shard] += costs[index]
+        return shard_of
+
+    def shard_sizes(self) -> List[int]:
+        """Planets per shard."""
+        sizes = [0] * self.workers
+        for shard in self._shard_of:
+            sizes[shard] += 1
+        return sizes
+
+    # Ticks
+
+    def tick(self, turns: int = 1) -> List[float]:
+        """
+        Advance every planet `turns` turns and wait for all shards.
+        Returns each shard's busy time in seconds.
+        """
+        for connection in self._connections:
+            connection.send(("tick", turns))
+        elapsed = [connection.recv() for connection in self._connections]
+        self.ticks += 1
+        for shard, seconds in enumerate(elapsed):
+            self._shard_time[shard] += seconds
+        if self.rebalance_interval and self.ticks % self.rebalance_interval == 0:
+            self.rebalance()
+        return elapsed
+
+    def rebalance(self, force: bool = False) -> int:
+        """
+        Move planets off shards that took too long since the last check
+        (or whenever any move helps, with force=True). Returns the number
+        of planets moved.
+        """
+        times, self._shard_time = self._shard_time, [0.0] * self.workers
+        if self.workers < 2 or not any(times):
+            return 0
+        mean = sum(times) / self.workers
+        if not force and max(times) <= REBALANCE_SKEW * mean:
+            return 0
+
+        # Split each shard's measured time over its planets by estimated cost
+        buildings = self.column("buildings")
+        costs = [count + PLANET_BASE_COST for count in buildings]
+        buildings.release()
+        shard_cost = [0.0] * self.workers
+        for index, shard in enumerate(self._shard_of):
+            shard_cost[shard] += costs[index]
+        seconds = [
+            costs[index] * times[shard] / shard_cost[shard] if shard_cost[shard] else 0.0
+            for index, shard in enumerate(self._shard_of)
+        ]
+
+        # Greedy moves from the slowest shard to the fastest while they help
+        loads = list(times)
+        moves: List[Tuple[int, int, int]] = []  # (planet, from, to)
+        shard_of = list(self._shard_of)
+        for _ in range(len(shard_of)):
+            slow = loads.index(max(loads))
+            fast = loads.index(min(loads))
+            gap = loads[slow] - loads[fast]
+            candidates = [i for i, shard in enumerate(shard_of) if shard == slow and 0 < seconds[i] < gap]
+            if not candidates:
+                break
+            # The planet that evens the pair out best
+            index = min(candidates, key=lambda i: abs(gap / 2 - seconds[i]))
+            moves.append((index, slow, fast))
+            shard_of[index] = fast
+            loads[slow] -= seconds[index]
+            loads[fast] += seconds[index]
+
+        self._move(moves)
+        return len(moves)
+
+    def _move(self, moves: Sequence[Tuple[int, int, int]]):
+        outgoing: Dict[int, List[int]] = {}
+        for index, source, _ in moves:
+            outgoing.setdefault(source, []).append(index)
+        for source, indices in outgoing.items():
+            self._connections[source].send(("release", indices))
+        released = {}
+        for source in outgoing:
+            released.update(self._connections[source].recv())
+
+        incoming: Dict[int, list] = {}
+        for index, _, destination in moves:
+            incoming.setdefault(destination, []).append((index, released[index]))
+            self._shard_of[index] = destination
+        for destination, packed in incoming.items():
+            self._connections[destination].send(("adopt", packed))
+        for destination in incoming:
+            self._connections[destination].recv()
+        self.moves += len(moves)
+
+    # Planets
+
+    def _index(self, planet) -> int:
+        return planet if isinstance(planet, int) else self.names.index(planet)
+
+    def call(self, planet, method: str, *args):
+        """
+        Call a PlanetState method on a planet in its worker (by index or
+        name) and return the result, e.g. call("Kepler", "construct_building",
+        create_building(BuildingType.FARM)).
+        """
+        index = self._index(planet)
+        connection = self._connections[self._shard_of[index]]
+        connection.send(("call", index, method, args))
+        ok, result = connection.recv()
+        if not ok:
+            raise result
+        return result
+
+    def planets(self, indices: Optional[Iterable[int]] = None) -> List[PlanetState]:
+        """Copies of the planets (all of them by default), in index order."""
+        wanted = list(range(len(self)) if indices is None else indices)
+        by_shard: Dict[int, List[int]] = {}
+        for index in wanted:
+            by_shard.setdefault(self._shard_of[index], []).append(index)
+        for shard, shard_indices in by_shard.items():
+            self._connections[shard].send(("fetch", shard_indices))
+        fetched = {}
+        for shard in by_shard:
+            fetched.update(self._connections[shard].recv())
+        return [unpack_planet(fetched[index]) for index in wanted]
+
+    # Shared state
+
+    def state(self) -> memoryview:
+        """
+        Every planet's row as a (planets, metrics) view of the shared block,
+        indexed view[planet, HISTORY_COLUMNS[metric]]. Valid between ticks;
+        release views before close().
+        """
+        if not self.names:
+            return self._rows[:0]
+        return self._rows.cast("B").cast("d", (len(self.names), METRIC_COUNT))
+
+    def column(self, metric: str) -> memoryview:
+        """One metric for every planet, as a strided view of the shared block."""
+        offset = HISTORY_COLUMNS[metric]
+        return self._rows[offset:len(self.names) * METRIC_COUNT:METRIC_COUNT]
+
+    def value(self, planet, metric: str) -> float:
+        """One planet's metric (by index or name)."""
+        return self._rows[self._index(planet) * METRIC_COUNT + HISTORY_COLUMNS[metric]]
+
+    def close(self):
+        """Stop the workers and free the shared block."""
+        for connection in self._connections:
+            try:
+                connection.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._processes, self._connections = [], []
+        if self._block is not None:
+            self._rows.release()
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def __enter__(self) -> "ShardedScheduler":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,77 @@
+"""
+Tests for the economy benchmark suite.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import bench_economy
+
+
+def test_benchmark_records():
+    """Test that every benchmark runs and reports a complete record."""
+    print("Testing benchmark records...")
+
+    records = list(bench_economy.run_suite(max_size=10, min_time=0, max_ops=3))
+    covered = {(r["benchmark"], r["engine"]) for r in records}
+    expected = {(b.name, engine) for b in bench_economy.BENCHMARKS for engine in b.engines}
+    assert covered == expected, f"Missing benchmarks: {expected - covered}"
+    assert all(r["size"] <= 10 for r in records), "Sizes above max_size were run"
+
+    for record in records:
+        label = f"{record['benchmark']}/{record['engine']}/{record['size']}"
+        assert record["ops"] >= bench_economy.MIN_OPS, f"{label}: too few runs"
+        assert record["ops_per_second"] > 0, f"{label}: no throughput"
+        latency = record["latency_us"]
+        assert 0 <= latency["min"] <= latency["p50"] <= latency["p99"] <= latency["max"], \
+            f"{label}: percentiles out of order"
+        assert record["peak_memory_bytes"] > 0, f"{label}: no peak memory"
+
+    print(f"  ✓ {len(covered)} benchmark/engine pairs report throughput, percentiles and memory")
+
+
+def test_benchmark_command_line():
+    """Test the command line filters and JSON lines output."""
+    print("Testing benchmark command line...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.jsonl")
+        args = ["--quick", "--max-size", "100", "--only", "process_turn", "--engine", "vectorized",
+                "--min-time", "0", "--no-memory", "--output", path]
+        with contextlib.redirect_stderr(io.StringIO()):
+            assert bench_economy.main(args) == 0, "Benchmark run failed"
+        with open(path) as output:
+            records = [json.loads(line) for line in output]
+
+    assert [(r["benchmark"], r["engine"], r["size"]) for r in records] == \
+        [("process_turn", "vectorized", 10), ("process_turn", "vectorized", 100)], "Wrong cases run"
+    assert all(r["peak_memory_bytes"] is None for r in records), "Memory pass not skipped"
+
+    print("  ✓ Filters select cases and results are written as JSON lines")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_benchmark_records,
+        test_benchmark_command_line,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,172 @@
+"""
+Tests for multi-turn build-order planning with BuildPlanner.
+"""
+
+import copy
+import math
+import random
+
+from resource_economy import (
+    PlanetState, EconomyManager, BuildingType, ResourceType, create_building
+)
+from build_planner import BuildPlanner, plan_state
+import planet_save
+
+
+def _sample_colonies():
+    """A fresh colony, a rich one, and a few random established ones."""
+    colonies = [
+        PlanetState(name="Fresh", seed=1),
+        PlanetState(name="Rich", seed=2, population=2000,
+                    resources={rt: 20000.0 for rt in ResourceType}),
+    ]
+    for trial in range(6):
+        rng = random.Random(trial)
+        planet = PlanetState(
+            name=f"Colony {trial}", seed=trial, population=rng.choice([50, 200, 1000]),
+            resources={rt: float(rng.choice([300, 1000, 3000, 8000])) for rt in ResourceType},
+        )
+        for _ in range(rng.randint(0, 30)):
+            planet.buildings.append(create_building(rng.choice(list(BuildingType))))
+        colonies.append(planet)
+    return colonies
+
+
+def _play(planet, schedule):
+    """Play a schedule the way examples.py does and return the final planet."""
+    planet = copy.deepcopy(planet)
+    for building_type in schedule:
+        if building_type is not None:
+            planet.construct_building(create_building(building_type))
+        planet.process_turn()
+    return planet
+
+
+def test_greedy_replay():
+    """Test that the planner's greedy plan is get_optimal_build_order's."""
+    print("Testing greedy replay...")
+
+    for planet in _sample_colonies():
+        for turns in (5, 15):
+            expected = EconomyManager(planet).get_optimal_build_order(turns)
+            schedule = BuildPlanner(planet).greedy_schedule(turns)
+            assert len(schedule) == turns, "Schedule should have one entry per turn"
+            assert [bt for bt in schedule if bt is not None] == expected, \
+                f"{planet.name}: greedy replay diverged"
+
+    print("  ✓ Greedy replay matches get_optimal_build_order")
+
+
+def test_plan_values():
+    """Test that plans are never worse than greedy and values match real play."""
+    print("Testing planned build orders...")
+
+    improved = 0
+    for planet in _sample_colonies():
+        plan = EconomyManager(planet).plan_build_order(turns=10)
+        assert plan["complete"], "Unbudgeted search should complete"
+        assert len(plan["schedule"]) == 10, "Schedule should have one entry per turn"
+        assert plan["build_order"] == [bt for bt in plan["schedule"] if bt is not None]
+        assert plan["value"] >= plan["greedy_value"], f"{planet.name}: plan worse than greedy"
+        if plan["value"] > plan["greedy_value"]:
+            improved += 1
+
+        # The planner's turn model is exact
+        played = _play(planet, plan["schedule"])
+        actual = BuildPlanner(played).value(plan_state(played))
+        assert math.isclose(actual, plan["value"], rel_tol=1e-9, abs_tol=1e-6), \
+            f"{planet.name}: predicted {plan['value']}, played {actual}"
+
+    print(f"  ✓ Plans at least as good as greedy ({improved} improved)")
+    print("  ✓ Predicted values match played-out schedules")
+
+
+def test_search_budgets():
+    """Test node and time budgets."""
+    print("Testing search budgets...")
+
+    planet = PlanetState(name="Rich", seed=2, population=2000,
+                         resources={rt: 20000.0 for rt in ResourceType})
+    manager = EconomyManager(planet)
+
+    plan = manager.plan_build_order(turns=20, beam_width=8, max_nodes=10)
+    assert not plan["complete"], "Node budget should stop the search"
+    assert len(plan["schedule"]) == 20, "Budgeted plan should still cover every turn"
+    assert plan["value"] >= plan["greedy_value"], "Budgeted plan worse than greedy"
+
+    plan = manager.plan_build_order(turns=20, beam_width=8, time_budget=0.0)
+    assert not plan["complete"], "Time budget should stop the search"
+    assert plan["value"] >= plan["greedy_value"], "Budgeted plan worse than greedy"
+
+    plan = manager.plan_build_order(turns=20, beam_width=8, time_budget=60.0)
+    assert plan["complete"], "Generous time budget should let the search finish"
+
+    planner = BuildPlanner(planet)
+    planner.search(turns=10)
+    assert planner.cache_hits > 0, "Repeated states should hit the cache"
+
+    print("  ✓ Exhausted budgets return a complete schedule")
+    print("  ✓ Evaluated states are cached")
+
+
+def test_packed_buildings_stay_packed():
+    """Test planning on aggregated and lazily loaded planets."""
+    print("Testing planning on packed buildings...")
+
+    for planet in _sample_colonies()[2:5]:
+        expected = EconomyManager(planet).plan_build_order(turns=6)
+
+        aggregated = copy.deepcopy(planet)
+        aggregated.aggregate_buildings()
+        lazy = planet_save.loads(planet_save.dumps([planet]), lazy=True)[0]
+        for packed, label in ((aggregated, "aggregated"), (lazy, "lazily loaded")):
+            plan = EconomyManager(packed).plan_build_order(turns=6)
+            assert plan["schedule"] == expected["schedule"], f"{planet.name}: {label} plan differs"
+        assert aggregated.aggregated, f"{planet.name}: planning ended aggregation"
+        assert lazy._fork_base is not None, f"{planet.name}: planning unpacked a lazy load"
+
+    print("  ✓ Aggregated and lazily loaded planets plan without unpacking")
+
+
+def test_default_search_effort():
+    """Test that the default search stays within the greedy planner's effort."""
+    print("Testing default search effort...")
+
+    # get_optimal_build_order weighs every building type each turn; timings
+    # against it are in bench_economy (plan_build_order)
+    turns = 10
+    greedy_checks = turns * len(BuildingType)
+    for planet in _sample_colonies():
+        planner = BuildPlanner(planet)
+        planner.search(turns=turns)
+        assert planner.nodes < greedy_checks, \
+            f"{planet.name}: {planner.nodes} states evaluated, greedy checks {greedy_checks}"
+
+    print(f"  ✓ Default search evaluates fewer than {greedy_checks} states over {turns} turns")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_greedy_replay,
+        test_plan_values,
+        test_search_budgets,
+        test_default_search_effort,
+        test_packed_buildings_stay_packed,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
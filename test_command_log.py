@@ -0,0 +1,181 @@
+"""
+Tests for the event-sourced command log.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+
+from resource_economy import PlanetState, BuildingType, ResourceType, create_building
+from command_log import CommandLog, read_records, replay, CANCEL, CHECKPOINT, CONSTRUCT, QUEUE, TURN
+from planet_batch import PlanetBatch
+
+
+def _colony(vectorized):
+    planet = PlanetState(name="Logged", seed=11, population=500, vectorized=vectorized)
+    for building_type in [BuildingType.FARM, BuildingType.MINE, BuildingType.POWER_PLANT] * 2:
+        planet.buildings.append(create_building(building_type))
+    return planet
+
+
+def _play(planet, rounds):
+    """A mix of every logged call."""
+    for i in range(rounds):
+        planet.process_turn()
+        if i % 4 == 0:
+            planet.construct_building(create_building([BuildingType.FARM, BuildingType.QUARRY][i % 8 // 4]))
+        if i % 5 == 0:
+            planet.buildings[i % len(planet.buildings)].upgrade()
+        if i % 7 == 0:
+            planet.advance_turns(3)
+        if i % 6 == 1:
+            planet.queue_construction(create_building(BuildingType.FARM))
+        if i % 9 == 8 and planet.construction_queue:
+            _, building = list(planet.construction_queue)[-1]
+            planet.cancel_construction(building)
+
+
+def _same_planet(expected, actual, label):
+    assert (actual.turn, actual.stability, actual.expansion_rate) == \
+        (expected.turn, expected.stability, expected.expansion_rate), f"{label}: counters diverged"
+    assert [actual.resources[rt] for rt in ResourceType] == [expected.resources[rt] for rt in ResourceType], \
+        f"{label}: stockpiles diverged"
+    # Checkpoints are pickles, so compare specs by value
+    assert [(b.spec.__reduce__(), b.production_efficiency) for b in actual.buildings] == \
+        [(b.spec.__reduce__(), b.production_efficiency) for b in expected.buildings], \
+        f"{label}: buildings diverged"
+    assert [(turn, b.spec.__reduce__()) for turn, b in actual.construction_queue or ()] == \
+        [(turn, b.spec.__reduce__()) for turn, b in expected.construction_queue or ()], \
+        f"{label}: construction queue diverged"
+    assert actual.rng.getstate() == expected.rng.getstate(), f"{label}: random stream diverged"
+
+
+def test_crash_recovery():
+    """Test recovering a planet from checkpoints plus the log tail."""
+    print("Testing command log recovery...")
+
+    for vectorized in (False, True):
+        label = "vectorized" if vectorized else "loop"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "planet.gfcl")
+            planet = _colony(vectorized)
+            log = CommandLog(path, planet, checkpoint_every=5, sync_every=8)
+            _play(planet, 23)
+            log.sync()
+
+            # A crash mid-write leaves a torn record behind
+            crashed = os.path.join(directory, "crashed.gfcl")
+            shutil.copy(path, crashed)
+            with open(crashed, "ab") as crashed_file:
+                crashed_file.write(b"\x01\x00\x00")
+
+            records, _ = read_records(crashed)
+            kinds = [record.kind for record in records]
+            assert kinds.count(CHECKPOINT) > 3 and CONSTRUCT in kinds, f"{label}: events missing"
+            assert QUEUE in kinds and CANCEL in kinds, f"{label}: queue events missing"
+            assert kinds[-1] != CHECKPOINT, f"{label}: nothing left to replay after the checkpoint"
+
+            recovered = CommandLog.recover(crashed, checkpoint_every=5)
+            _same_planet(planet, recovered.planet, f"{label} recovered")
+
+            # Both carry on identically, and the recovered log stays valid
+            _play(planet, 9)
+            _play(recovered.planet, 9)
+            log.close()
+            recovered.close()
+            _same_planet(planet, recovered.planet, f"{label} after recovery")
+            _same_planet(planet, replay(crashed), f"{label} replayed after recovery")
+            assert planet.command_log is None and recovered.planet.command_log is None
+
+    print("  ✓ Recovery replays the log tail onto the last checkpoint")
+    print("  ✓ Torn records are dropped and logging continues")
+
+
+def test_audit_replay():
+    """Test replaying to an earlier turn and what logging leaves out."""
+    print("Testing command log audit replay...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "planet.gfcl")
+        planet = _colony(False)
+        with CommandLog(path, planet, checkpoint_every=4) as log:
+            reference = _colony(False)
+            for turn in range(1, 13):
+                planet.process_turn()
+                reference.process_turn()
+                if turn == 7:
+                    log.sync()
+                    audited = replay(path, turn=7)
+                    _same_planet(reference, audited, "turn 7")
+            assert pickle.loads(pickle.dumps(planet)).command_log is None, "Pickle kept the log"
+            assert planet.fork().command_log is None, "Fork kept the log"
+            assert log.planet is planet
+
+        records, _ = read_records(path)
+        turns = [record.value for record in records if record.kind == TURN]
+        assert turns == list(range(1, 13)), "Turn events out of order"
+        assert sum(record.kind == CHECKPOINT for record in records) == 3
+
+        for bad in (b"", b"not a log at all"):
+            with open(path, "wb") as log_file:
+                log_file.write(bad)
+            try:
+                replay(path)
+                assert False, "Corrupt log accepted"
+            except ValueError:
+                pass
+
+    print("  ✓ Audits replay to any turn from the nearest checkpoint")
+    print("  ✓ Copies and forks are not logged; foreign files are rejected")
+
+
+def test_batched_planets_are_logged():
+    """Test that batch turns of a logged planet reach its log."""
+    print("Testing command logs in planet batches...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "planet.gfcl")
+        planet = _colony(True)
+        log = CommandLog(path, planet, checkpoint_every=4)
+        batch = PlanetBatch([PlanetState(name="Unlogged", seed=3), planet])
+        view = batch[1]
+        assert log.planet is view and view.command_log is log, "Log did not follow the planet"
+        for turn in range(10):
+            batch.process_turn()
+            if turn % 3 == 0:
+                view.buildings[turn % len(view.buildings)].upgrade()
+                view.construct_building(create_building(BuildingType.FARM))
+        log.close()
+
+        records, _ = read_records(path)
+        turns = [record.value for record in records if record.kind == TURN]
+        assert turns == list(range(1, 11)), "Batch turns missing from the log"
+        _same_planet(view, replay(path), "batched")
+
+    print("  ✓ Batch turns, upgrades and construction replay onto the logged planet")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_crash_recovery,
+        test_audit_replay,
+        test_batched_planets_are_logged,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,153 @@
+"""
+Tests for delta-encoded planet updates.
+"""
+
+import copy
+import pickle
+
+from resource_economy import PlanetState, BuildingType, ResourceType, create_building
+from planet_batch import PlanetBatch
+from delta_publisher import DeltaPublisher
+
+
+def _colony(name, seed, vectorized):
+    planet = PlanetState(name=name, seed=seed, population=400, vectorized=vectorized)
+    for building_type in [BuildingType.FARM, BuildingType.MINE, BuildingType.POWER_PLANT] * 2:
+        planet.buildings.append(create_building(building_type))
+    return planet
+
+
+def _apply(view, frame):
+    """Merge a frame into a client's copy of the reports."""
+    if frame["keyframe"]:
+        view[frame["planet"]] = copy.deepcopy(frame["fields"])
+        return
+    report = view[frame["planet"]]
+    for name, value in frame["fields"].items():
+        if isinstance(value, dict):
+            report[name].update(value)
+        else:
+            report[name] = value
+
+
+def test_deltas_rebuild_reports():
+    """Test that clients applying deltas see the full reports."""
+    print("Testing delta updates...")
+
+    planets = [_colony("Kepler", 1, False), _colony("Proxima", 2, True)]
+    publisher = DeltaPublisher(planets, keyframe_interval=10)
+    prompt, lagging = {}, {}
+    publisher.subscribe("prompt")
+    publisher.subscribe("lagging")
+
+    for turn in range(1, 31):
+        for planet in planets:
+            planet.process_turn()
+        if turn == 5:
+            planets[0].construct_building(create_building(BuildingType.FARM))
+        if turn == 8:
+            planets[1].population = 450
+            planets[1].resources[ResourceType.RARE_MINERALS] += 5
+        if turn == 12:
+            planets[1].advance_turns(6)
+
+        published = publisher.publish()
+        for frame in published["prompt"]:
+            _apply(prompt, frame)
+            assert publisher.acknowledge("prompt", frame["planet"], frame["turn"])
+        for frame in published["lagging"]:
+            _apply(lagging, frame)
+            # Acknowledges every third turn only; deltas still cover the gap
+            if turn % 3 == 0:
+                publisher.acknowledge("lagging", frame["planet"], frame["turn"])
+
+        for planet in planets:
+            expected = planet.get_economic_report()
+            assert prompt[planet.name] == expected, f"Turn {turn}: prompt client diverged"
+            assert lagging[planet.name] == expected, f"Turn {turn}: lagging client diverged"
+        if turn == 1:
+            assert all(frame["keyframe"] for frame in published["prompt"]), "First frames not keyframes"
+        else:
+            for frame in published["prompt"]:
+                if not frame["keyframe"]:
+                    fields = frame["fields"]
+                    assert "debt" not in fields, "Unchanged field sent"
+                    assert ("population" in fields) == (turn == 8 and frame["planet"] == "Proxima")
+                    assert ("buildings" in fields) == (turn == 5 and frame["planet"] == "Kepler")
+                    assert "rare_minerals" not in fields["resources"] or turn == 8
+
+    # One keyframe per planet per interval for the client that acknowledges
+    assert publisher.keyframes >= 2 * 3 + 2
+    assert publisher.deltas > publisher.keyframes
+
+    # Nothing new, nothing sent
+    assert publisher.updates("prompt") == []
+    assert not publisher.acknowledge("prompt", "Kepler", 999), "Unsent turn acknowledged"
+
+    print("  ✓ Prompt and lagging clients rebuild the full reports from deltas")
+    print("  ✓ Unchanged fields and up-to-date planets are not sent")
+
+
+def test_tracking_is_opt_in():
+    """Test what tracking changes and what leaves it behind."""
+    print("Testing change tracking...")
+
+    tracked = _colony("Kepler", 3, True)
+    plain = _colony("Kepler", 3, True)
+    tracker = tracked.track_changes()
+    assert tracked.track_changes() is tracker
+    for _ in range(12):
+        tracked.process_turn()
+        plain.process_turn()
+    assert tracked.get_economic_report() == plain.get_economic_report(), "Tracking changed the turn"
+
+    epoch = tracker.cut()
+    assert tracked.get_report_changes(epoch) == {}
+    tracked.debt = 25.0
+    tracked.stability = tracked.stability  # not a change
+    tracked.buildings.pop()
+    assert set(tracked.get_report_changes(epoch)) == {"debt", "buildings", "net_production"}
+
+    for copied in (pickle.loads(pickle.dumps(tracked)), tracked.fork(), copy.deepcopy(tracked)):
+        assert copied._tracker is None, "Copy kept tracking"
+        assert type(copied.resources).__name__ == "ResourceStock"
+        assert copied.debt == 25.0
+
+    batch = PlanetBatch([_colony("Batch", 4, True)])
+    try:
+        batch[0].track_changes()
+        assert False, "Batch planet tracked"
+    except TypeError:
+        pass
+    try:
+        DeltaPublisher([tracked, tracked])
+        assert False, "Duplicate planet published"
+    except ValueError:
+        pass
+
+    print("  ✓ Tracked planets play out identically and mark only real changes")
+    print("  ✓ Copies drop tracking; batch planets refuse it")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_deltas_rebuild_reports,
+        test_tracking_is_opt_in,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -3,10 +3,19 @@ Comprehensive tests for the Genesis Frontier Resource Economy System.
 Validates all mechanics, edge cases, and design requirements.
 """
 
+import copy
+import math
+import pickle
+import random
+
+import resource_economy
 from resource_economy import (
     PlanetState, EconomyManager, BuildingType, ResourceType,
-    create_building, BUILDING_TEMPLATES, ProductionBuilding
+    create_building, get_building_spec, BUILDING_TEMPLATES, ProductionBuilding,
+    ResourceStock, EconomyHistory, efficiency_for_stability, cycled_stock
 )
+from planet_batch import PlanetBatch
+import planet_save
 
 
 def test_resource_types():
@@ -417,6 +426,768 @@ def test_resource_shortage_impact():
     print(f"  ✓ Shortages reduce stability")
 
 
+def _mixed_colony(name, vectorized=False, seed=None):
+    """Build a planet with a few of every building type."""
+    planet = PlanetState(name=name, vectorized=vectorized, seed=seed)
+    for building_type in BuildingType:
+        for _ in range(3):
+            planet.buildings.append(create_building(building_type))
+    return planet
+
+
+def test_vectorized_turn_matches_loop():
+    """Test that the array-backed turn gives the same results as the loop."""
+    print("\nTesting vectorized turn processing...")
+    
+    loop_planet = _mixed_colony("Loop", seed=42)
+    table_planet = _mixed_colony("Table", vectorized=True, seed=42)
+    
+    for _ in range(15):
+        loop_planet.process_turn()
+        table_planet.process_turn()
+    
+    assert loop_planet.turn == table_planet.turn, "Turn counters diverged"
+    assert math.isclose(loop_planet.stability, table_planet.stability), "Stability diverged"
+    for resource_type in ResourceType:
+        assert math.isclose(
+            loop_planet.resources[resource_type], table_planet.resources[resource_type],
+            rel_tol=1e-9, abs_tol=1e-6
+        ), f"{resource_type} diverged"
+    
+    loop_efficiency = [b.production_efficiency for b in loop_planet.buildings]
+    table_efficiency = [b.production_efficiency for b in table_planet.buildings]
+    assert loop_efficiency == table_efficiency, "Per-building efficiency diverged"
+    
+    print("  ✓ Stockpiles and stability match the per-building loop")
+    print("  ✓ Failure rolls and efficiencies match for the same seed")
+
+
+def test_building_table_sync():
+    """Test that the building table follows list changes and upgrades."""
+    print("\nTesting building table synchronisation...")
+    
+    planet = _mixed_colony("Sync", vectorized=True)
+    planet.process_turn()
+    table = planet.building_table()
+    
+    planet.buildings.append(create_building(BuildingType.FARM))
+    removed = planet.buildings.pop(0)
+    planet.buildings[0].upgrade()
+    assert len(table) == len(planet.buildings), "Table size out of sync"
+    assert removed._table is None, "Removed building still bound"
+    
+    expected_strain = sum(b.stability_cost for b in planet.buildings)
+    assert math.isclose(table.total_strain(), expected_strain), "Strain out of sync"
+    
+    planet.buildings = [create_building(BuildingType.MINE)]
+    assert len(table) == 1, "Reassigned building list not tracked"
+    
+    clone = copy.deepcopy(planet)
+    assert clone == planet, "Deep copy differs"
+    assert clone.buildings[0]._table is None, "Copy shares the original table"
+    
+    print("  ✓ Appends, removals and upgrades reach the table")
+    print("  ✓ Copies detach from the original table")
+
+
+def test_roll_order_survives_copies():
+    """Test that reordered buildings fail the same on copies as on the original."""
+    print("\nTesting risk roll order after removals...")
+    
+    for seed in range(40):
+        planet = _mixed_colony("Reordered", vectorized=True, seed=seed)
+        loop_planet = _mixed_colony("Reordered", seed=seed)
+        for colony in (planet, loop_planet):
+            colony.process_turn()
+            colony.buildings.pop(0)
+            colony.buildings.insert(3, create_building(BuildingType.MINE))
+            colony.buildings[5:7] = [create_building(BuildingType.FARM)]
+        copies = [copy.deepcopy(planet), pickle.loads(pickle.dumps(planet)),
+                  planet_save.loads(planet_save.dumps([planet]))[0], loop_planet]
+        for colony in [planet] + copies:
+            colony.process_turn()
+        failed = [b.production_efficiency for b in planet.buildings]
+        for colony in copies:
+            assert [b.production_efficiency for b in colony.buildings] == failed, \
+                f"Seed {seed}: different buildings failed on a copy"
+        table = planet.building_table()
+        assert all(b._row == row for row, b in enumerate(planet.buildings)), "Table rows out of list order"
+        assert list(table.risk_factor) == [b.risk_factor for b in planet.buildings]
+    
+    print("  ✓ Removals and inserts keep table rows in building order")
+    print("  ✓ Copies, pickles and saves roll the same failures")
+
+
+def test_copies_keep_running_totals():
+    """Test that copies carry the running totals as they are instead of recomputing them."""
+    print("\nTesting running totals on copies...")
+    
+    def totals(planet):
+        return (planet._strain, planet._gross, planet._upkeep, planet._output)
+    
+    planet = _mixed_colony("Totals", seed=5)
+    for _ in range(5):
+        planet.process_turn()
+    planet._strain += 1e-9  # rounding residue a recompute would drop
+    planet._output[0] += 1e-9
+    fork = planet.fork()
+    fork.add_building(create_building(BuildingType.FARM))
+    aggregated = copy.deepcopy(planet)
+    aggregated.aggregate_buildings()
+    aggregated._strain += 1e-9
+    
+    for original in (planet, fork, aggregated):
+        expected = copy.deepcopy(totals(original))
+        for copied in (copy.deepcopy(original), pickle.loads(pickle.dumps(original))):
+            assert totals(copied) == expected, f"{original.name}: copy recomputed the totals"
+        assert totals(original) == expected, "Copying changed the original's totals"
+    
+    print("  ✓ Deep copies and pickles keep the totals of planets, forks and aggregated planets")
+
+
+def test_running_totals():
+    """Test that cached stability and production totals track every change."""
+    print("\nTesting running totals...")
+    
+    resource_economy.DEBUG_AGGREGATES = True
+    try:
+        planet = PlanetState(name="Totals Test")
+        for resource_type in ResourceType:
+            planet.resources[resource_type] = 100000
+        
+        for building_type in BuildingType:
+            planet.construct_building(create_building(building_type))
+        planet.buildings[0].upgrade()
+        planet.buildings[3].production_efficiency = 0.3
+        for _ in range(3):
+            planet.process_turn()
+        planet.buildings.pop(2)
+        planet.vectorized = True
+        for _ in range(3):
+            planet.process_turn()
+        planet.buildings[1].upgrade()
+        
+        report = planet.get_economic_report()
+        expected = {rt.value: 0.0 for rt in ResourceType}
+        for building in planet.buildings:
+            for resource_type, amount in building.get_net_production().items():
+                expected[resource_type.value] += amount
+        for key, amount in expected.items():
+            assert math.isclose(report["net_production"][key], amount, abs_tol=1e-6), \
+                f"Net {key} out of sync"
+    finally:
+        resource_economy.DEBUG_AGGREGATES = False
+    
+    # Editing stats directly keeps the totals in step
+    planet.buildings[0].stability_cost += 5
+    planet.verify_aggregates()
+    
+    planet._strain += 5  # simulate a missed update
+    try:
+        planet.verify_aggregates()
+        raise AssertionError("Drift not detected")
+    except AssertionError as e:
+        assert "drifted" in str(e), str(e)
+    planet.verify_aggregates()  # the failed check resynchronised the totals
+    
+    planet.buildings.clear()
+    assert planet.calculate_stability() > 0, "Emptied planet lost its totals"
+    
+    print("  ✓ Construction, upgrades, removals and turns keep totals exact")
+    print("  ✓ Debug mode detects drift from a full recompute")
+
+
+def test_shared_building_specs():
+    """Test that buildings share immutable specs without leaking changes."""
+    print("\nTesting shared building specs...")
+    
+    first = create_building(BuildingType.MINE)
+    second = create_building(BuildingType.MINE)
+    assert first.spec is second.spec, "Buildings of one type don't share a spec"
+    assert first.id != second.id, "Buildings share an id"
+    
+    first.upgrade()
+    template = BUILDING_TEMPLATES[BuildingType.MINE]
+    assert second.level == 1, "Upgrade leaked into another building"
+    assert template.produces[ResourceType.METALS] == 40, "Upgrade leaked into the template"
+    assert first.spec is get_building_spec(BuildingType.MINE, 2), "Level specs not shared"
+    
+    try:
+        first.produces[ResourceType.METALS] = 0
+        raise AssertionError("Shared production table was writable")
+    except TypeError:
+        pass
+    
+    custom = ProductionBuilding(
+        type=BuildingType.FARM, name="Test Farm", description="Custom stats",
+        construction_costs={ResourceType.METALS: 1}, construction_time=1,
+        produces={ResourceType.FOOD: 5},
+    )
+    assert custom.get_net_production() == {ResourceType.FOOD: 5}, "Custom building broken"
+    assert copy.deepcopy(first) == first, "Copy differs from original"
+    
+    print("  ✓ Buildings share per-level specs")
+    print("  ✓ Upgrades only affect the upgraded building")
+    print("  ✓ Custom buildings and copies still work")
+
+
+def test_compact_storage():
+    """Test the slotted building and array-backed stockpile representation."""
+    print("\nTesting compact storage...")
+    
+    building = create_building(BuildingType.FARM)
+    assert not hasattr(building, "__dict__"), "Buildings carry a per-instance dict"
+    
+    planet = PlanetState(name="Compact Test", resources={ResourceType.FOOD: 10.0})
+    assert isinstance(planet.resources, ResourceStock), "Stockpiles not array-backed"
+    assert planet.resources[ResourceType.METALS] == 0.0, "Missing resource not zero"
+    assert planet.resources.get("not a resource", -1) == -1, "Unknown key not defaulted"
+    assert planet.resources == {rt: (10.0 if rt == ResourceType.FOOD else 0.0)
+                                for rt in ResourceType}, "Stock does not compare like a dict"
+    
+    planet.resources = {ResourceType.METALS: 500, ResourceType.MANUFACTURED_GOODS: 500}
+    assert isinstance(planet.resources, ResourceStock), "Reassigned stockpiles not wrapped"
+    assert planet.has_resources(building.construction_costs), "Affordability check broken"
+    assert planet.remove_resource(ResourceType.METALS, 100), "Removal failed"
+    assert planet.resources[ResourceType.METALS] == 400, "Removal not applied"
+    
+    assert [rt.index for rt in ResourceType] == list(range(len(ResourceType))), \
+        "Resource ordinals not dense"
+    
+    print("  ✓ Buildings are slotted")
+    print("  ✓ Stockpiles are a dict-like fixed-length array")
+
+
+def test_monte_carlo_forecast():
+    """Test planet snapshots and the multi-process outcome forecast."""
+    print("\nTesting Monte Carlo forecast...")
+    
+    planet = _mixed_colony("Forecast", seed=5)
+    planet.buildings[0].upgrade()
+    planet.buildings[1].production_efficiency = 0.5
+    
+    snapshot = planet.snapshot()
+    assert len(snapshot.specs) < len(planet.buildings), "Specs not shared in snapshot"
+    restored = PlanetState.from_snapshot(snapshot, seed=5, vectorized=False)
+    assert restored == planet, "Snapshot round trip lost state"
+    
+    manager = EconomyManager(planet)
+    serial = manager.forecast(turns=5, trials=40, workers=1, seed=11)
+    pooled = manager.forecast(turns=5, trials=40, workers=2, seed=11)
+    assert serial == pooled, "Forecast depends on the number of workers"
+    assert planet == restored, "Forecast changed the planet"
+    
+    assert 0.0 <= serial["collapse_probability"] <= 1.0, "Collapse probability out of range"
+    for summary in [serial["stability"], serial["lowest_stability"], *serial["resources"].values()]:
+        assert summary[5] <= summary[50] <= summary[95], "Percentiles out of order"
+    assert serial["lowest_stability"][50] <= serial["stability"][50], "Lowest above final"
+    
+    print(f"  ✓ Snapshot holds {len(snapshot.specs)} specs for {len(planet.buildings)} buildings")
+    print(f"  ✓ P(stability < 30 within 5 turns) = {serial['collapse_probability']:.2f}")
+    print("  ✓ Pooled and in-process forecasts agree for the same seed")
+
+
+def test_advance_turns():
+    """Test that fast-forwarding matches processing turns one by one."""
+    print("\nTesting fast-forwarded turns...")
+    
+    idle = PlanetState(name="Idle", seed=1)
+    for building_type in [BuildingType.FARM, BuildingType.FARM, BuildingType.POWER_PLANT]:
+        idle.buildings.append(create_building(building_type))
+    starving = PlanetState(name="Starving", seed=2, population=3000)
+    for _ in range(4):
+        starving.buildings.append(create_building(BuildingType.MINE))
+    expanding = PlanetState(name="Expanding", seed=3, expansion_rate=40.0, debt=800.0)
+    expanding.buildings.append(create_building(BuildingType.HYDROPONICS_BAY))
+    # Food only paid every other turn pushes stability across a tier bound
+    oscillating = PlanetState(name="Oscillating", seed=6, population=200)
+    oscillating.buildings.append(create_building(BuildingType.FARM))
+    colonies = [idle, starving, expanding, oscillating, _mixed_colony("Mixed", seed=4),
+                _mixed_colony("Mixed Table", vectorized=True, seed=5)]
+    
+    for colony in colonies:
+        for turns in (1, 2, 25, 400):
+            stepped = copy.deepcopy(colony)
+            for _ in range(turns):
+                stepped.process_turn()
+            jumped = copy.deepcopy(colony)
+            jumped.advance_turns(turns)
+            
+            label = f"{colony.name} after {turns} turns"
+            assert jumped.turn == stepped.turn, f"{label}: turn diverged"
+            assert math.isclose(jumped.stability, stepped.stability, abs_tol=1e-6), \
+                f"{label}: stability diverged"
+            for resource_type in ResourceType:
+                assert math.isclose(
+                    jumped.resources[resource_type], stepped.resources[resource_type],
+                    rel_tol=1e-9, abs_tol=1e-6
+                ), f"{label}: {resource_type} diverged"
+            assert [b.production_efficiency for b in jumped.buildings] == \
+                [b.production_efficiency for b in stepped.buildings], f"{label}: failures diverged"
+            assert jumped.rng.getstate() == stepped.rng.getstate(), f"{label}: random stream diverged"
+    
+    # Long catch-ups only step at events
+    steps = []
+    original = PlanetState.process_turn
+    PlanetState.process_turn = lambda planet: (steps.append(planet.turn), original(planet))
+    try:
+        copy.deepcopy(starving).advance_turns(100_000)
+    finally:
+        PlanetState.process_turn = original
+    assert len(steps) < 100, f"Fast-forward stepped {len(steps)} turns"
+    
+    # Three payments of 0.3 sum to just under 0.9 but pay it, as 0.9 >= 0.9 does
+    assert cycled_stock(0.0, 0.3, 0.9, 3) == 0.0, "Stockpile left just short of paying"
+    assert math.isclose(cycled_stock(0.0, 0.3, 0.9, 2), 0.6), "Cycling stockpile wrong"
+    assert math.isclose(cycled_stock(20.0, 30.0, 100.0, 5), 70.0), "Cycling stockpile wrong"
+    
+    try:
+        idle.advance_turns(-1)
+        assert False, "Negative turn count accepted"
+    except ValueError:
+        pass
+    
+    print(f"  ✓ {len(colonies)} colonies match turn-by-turn processing")
+    print(f"  ✓ 100,000 turns caught up with {len(steps)} stepped turns")
+
+
+def test_planet_fork():
+    """Test copy-on-write forks against deep copies."""
+    print("\nTesting planet forks...")
+    
+    for vectorized in (False, True):
+        planet = _mixed_colony("Parent", vectorized=vectorized, seed=4)
+        planet.process_turn()
+        # Removing a building reorders the building table
+        planet.buildings.remove(planet.buildings[1])
+        before = copy.deepcopy(planet)
+        
+        fork = planet.fork()
+        clone = copy.deepcopy(planet)
+        assert fork._fork_base is planet, "Fork copied the building list"
+        for building_type in [BuildingType.FARM, BuildingType.MINE, BuildingType.FARM]:
+            fork.construct_building(create_building(building_type))
+            clone.construct_building(create_building(building_type))
+            fork.process_turn()
+            clone.process_turn()
+        assert fork._fork_base is planet, "Turns and construction copied the building list"
+        
+        assert fork.turn == clone.turn, "Turn counters diverged"
+        assert math.isclose(fork.stability, clone.stability), "Stability diverged"
+        for resource_type in ResourceType:
+            assert math.isclose(
+                fork.resources[resource_type], clone.resources[resource_type],
+                rel_tol=1e-9, abs_tol=1e-6
+            ), f"{resource_type} diverged"
+        assert fork.rng.getstate() == clone.rng.getstate(), "Random stream diverged"
+        assert [(b.spec, b.production_efficiency) for b in fork.buildings] == \
+            [(b.spec, b.production_efficiency) for b in clone.buildings], "Buildings diverged"
+        fork.verify_aggregates()
+        
+        assert planet == before, "Fork changed its parent"
+    
+    # Parent changes after forking do not reach the fork
+    planet = _mixed_colony("Parent", seed=8)
+    fork = planet.fork(seed=1)
+    efficiency = [b.production_efficiency for b in planet.buildings]
+    count = len(planet.buildings)
+    planet.buildings.pop()
+    for _ in range(5):
+        planet.process_turn()
+    assert len(fork.buildings) == count, "Parent's building change reached the fork"
+    assert [b.production_efficiency for b in fork.buildings] == efficiency, \
+        "Parent's turns reached the fork"
+    assert not set(map(id, fork.buildings)) & set(map(id, planet.buildings)), \
+        "Fork and parent share building objects"
+    
+    print("  ✓ Forks match deep copies through construction and turns")
+    print("  ✓ Parent and fork changes stay separate")
+
+
+
+def test_aggregated_buildings():
+    """Test counted buildings against a planet of building objects."""
+    print("\nTesting aggregated buildings...")
+    
+    # Failures only last until the next efficiency reset, so stockpiles
+    # match a regular planet's whatever the random draws
+    planet = _mixed_colony("Counted", vectorized=True, seed=6)
+    reference = _mixed_colony("Objects", vectorized=True, seed=6)
+    for resource_type in ResourceType:
+        planet.resources[resource_type] = reference.resources[resource_type] = 5000.0
+    planet.aggregate_buildings()
+    assert planet.aggregated and len(planet._fork_base.counts) == len(BuildingType)
+    
+    failures = expected = 0
+    for turn in range(60):
+        expected += sum(spec.risk_factor * count for (spec, _), count in planet._fork_base.counts.items())
+        planet.process_turn()
+        reference.process_turn()
+        failures += planet._building_count() - sum(
+            count for (_, efficiency), count in planet._fork_base.counts.items()
+            if efficiency == efficiency_for_stability(planet.stability)
+        )
+        if turn % 20 == 5:
+            for target in (planet, reference):
+                target.add_building(create_building(BuildingType.FARM))
+        if turn == 30:
+            planet.advance_turns(10)
+            reference.advance_turns(10)
+        assert planet.turn == reference.turn and math.isclose(planet.stability, reference.stability)
+        for resource_type in ResourceType:
+            assert math.isclose(planet.resources[resource_type], reference.resources[resource_type],
+                                rel_tol=1e-9, abs_tol=1e-6), f"Turn {turn}: {resource_type} diverged"
+    planet.verify_aggregates()
+    assert planet.aggregated, "Turns or construction expanded the counts"
+    assert len(planet._fork_base.counts) <= 2 * (len(BuildingType) + 1), "Groups not merged each turn"
+    
+    # Binomial rolls fail buildings as often as one roll per building
+    assert abs(failures - expected) < 5 * math.sqrt(expected), f"{failures} failures, expected ~{expected:.0f}"
+    rng = random.Random(3)
+    for n, p in [(4, 0.02), (200, 0.05), (50000, 0.15), (40, 0.8)]:
+        draws = [resource_economy.binomial_variate(rng, n, p) for _ in range(4000)]
+        mean = sum(draws) / len(draws)
+        assert abs(mean - n * p) < 5 * math.sqrt(n * p * (1 - p) / len(draws)) and 0 <= min(draws) \
+            and max(draws) <= n, f"Binomial({n}, {p}) mean {mean}"
+    
+    # Copies stay aggregated and independent
+    for copied in (planet.fork(), copy.deepcopy(planet)):
+        assert copied.aggregated and copied._fork_base is not planet._fork_base
+        copied.add_building(create_building(BuildingType.MINE))
+        copied.process_turn()
+        assert copied._building_count() == planet._building_count() + 1
+    
+    # Using the building list expands the counts back into objects
+    count, report = planet._building_count(), planet.get_economic_report()
+    buildings = planet.buildings
+    assert not planet.aggregated and len(buildings) == count
+    expanded = planet.get_economic_report()["net_production"]
+    assert all(math.isclose(expanded[key], amount, rel_tol=1e-9, abs_tol=1e-6)
+               for key, amount in report["net_production"].items()), "Expanding changed net production"
+    planet.verify_aggregates()
+    
+    print("  ✓ Aggregated turns, construction and fast-forward match building objects")
+    print("  ✓ Failures per group follow the per-building odds")
+    print("  ✓ Forks and copies stay aggregated; the building list expands them")
+
+
+def _queue_colony(name, vectorized=False):
+    """A small, well-stocked planet with room to build."""
+    planet = PlanetState(name=name, vectorized=vectorized, seed=8, population=400)
+    for building_type in [BuildingType.FARM, BuildingType.MINE, BuildingType.POWER_PLANT]:
+        planet.buildings.append(create_building(building_type))
+    for resource_type in ResourceType:
+        planet.resources[resource_type] = 5000.0
+    return planet
+
+
+def test_construction_queue():
+    """Test queued construction completing on the turn it is due."""
+    print("\nTesting construction queue...")
+    
+    planet = _queue_colony("Builder")
+    farm, mine = create_building(BuildingType.FARM), create_building(BuildingType.MINE)
+    assert planet.queue_construction(mine)[0] and planet.queue_construction(farm)[0]
+    assert planet.resources[ResourceType.METALS] == 5000.0 - 250, "Costs not paid up front"
+    assert planet.expansion_rate == 2 and len(planet.buildings) == 3, "Queued buildings built at once"
+    assert planet.next_completion() == farm.construction_time
+    counts = []
+    for _ in range(mine.construction_time):
+        planet.process_turn()
+        counts.append(len(planet.buildings))
+    assert counts == [3, 4, 5], f"Buildings completed off schedule: {counts}"
+    assert [building.name for building in planet.buildings[3:]] == ["Farm", "Mine"]
+    assert planet.next_completion() is None and not planet.cancel_construction(farm)
+    
+    # Bulk queueing takes what the stockpiles allow; cancelling refunds the costs
+    planet.resources[ResourceType.MANUFACTURED_GOODS] = 220.0
+    results = planet.queue_constructions(create_building(BuildingType.FARM) for _ in range(5))
+    assert [success for success, _ in results] == [True] * 4 + [False]
+    queued = [building for _, building in planet.construction_queue]
+    assert planet.cancel_construction(queued[1]) and not planet.cancel_construction(queued[1])
+    assert planet.resources[ResourceType.MANUFACTURED_GOODS] == 70.0, "Cancelled build not refunded"
+    assert [building for _, building in planet.construction_queue] == [queued[0]] + queued[2:]
+    try:
+        planet.queue_construction(queued[0])
+        assert False, "Building queued twice"
+    except ValueError:
+        pass
+    
+    print("  ✓ Buildings join the planet construction_time turns after queueing")
+    print("  ✓ Bulk queueing and cancellation with refunds")
+    
+    # Every way of playing turns completes the builds on the same turns
+    def play(planet, advance=False):
+        planet.queue_constructions(create_building(building_type) for building_type in
+                                   [BuildingType.FACTORY, BuildingType.FARM, BuildingType.MINE])
+        for turns in (12, 28):
+            if turns == 28:
+                planet.queue_construction(create_building(BuildingType.HYDROPONICS_BAY))
+            if advance:
+                planet.advance_turns(turns)
+            else:
+                for _ in range(turns):
+                    planet.process_turn()
+        return planet
+    
+    reference = play(_queue_colony("Reference"))
+    aggregated = _queue_colony("Aggregated", vectorized=True)
+    aggregated.aggregate_buildings()
+    batch = PlanetBatch([_queue_colony("Batched", vectorized=True)])
+    batch[0].queue_constructions(create_building(building_type) for building_type in
+                                 [BuildingType.FACTORY, BuildingType.FARM, BuildingType.MINE])
+    for turn in range(40):
+        if turn == 12:
+            batch[0].queue_construction(create_building(BuildingType.HYDROPONICS_BAY))
+        batch.process_turn()
+    variants = [
+        play(_queue_colony("Vectorized", vectorized=True)),
+        play(_queue_colony("Advanced"), advance=True),
+        play(aggregated),
+        play(_queue_colony("Base").fork()),
+        batch[0],
+    ]
+    for variant in variants:
+        assert variant.turn == reference.turn and variant._building_count() == 7, \
+            f"{variant.name}: builds not completed"
+        assert math.isclose(variant.stability, reference.stability), f"{variant.name}: stability diverged"
+        for resource_type in ResourceType:
+            assert math.isclose(variant.resources[resource_type], reference.resources[resource_type],
+                                rel_tol=1e-9, abs_tol=1e-6), f"{variant.name}: {resource_type} diverged"
+    
+    # Copies carry their own queue; hosts find the soonest completion
+    planet = _queue_colony("Original")
+    planet.queue_construction(create_building(BuildingType.QUARRY))
+    planet.process_turn()
+    fork, copied = planet.fork(), copy.deepcopy(planet)
+    for other in (fork, copied):
+        assert other.construction_queue is not planet.construction_queue
+        assert other.next_completion() == planet.next_completion() == 4
+    fork.queue_construction(create_building(BuildingType.FARM))
+    assert len(planet.construction_queue) == 1
+    assert resource_economy.next_completion([planet, fork, reference]) == (2, fork)
+    assert resource_economy.next_completion([reference]) is None
+    
+    print("  ✓ Loop, vectorized, aggregated, fork, batch and advance_turns complete builds alike")
+    print("  ✓ Copies keep their own queues; the soonest completion across planets")
+
+
+def test_scheduled_failures():
+    """Test failures drawn ahead from a schedule against per-turn rolls."""
+    print("\nTesting scheduled failures...")
+    
+    # Failures only last until the next efficiency reset, so stockpiles
+    # match unscheduled planets whatever the random draws
+    planets = [_mixed_colony("Scheduled", vectorized=vectorized, seed=12) for vectorized in (False, True)]
+    references = [_mixed_colony("Rolled", vectorized=vectorized, seed=12) for vectorized in (False, True)]
+    for planet in planets + references:
+        for resource_type in ResourceType:
+            planet.resources[resource_type] = 5000.0
+    for planet in planets:
+        planet.schedule_failures()
+        assert planet.failures_scheduled and len(planet._failures) == len(planet.buildings)
+    
+    failures = [0] * len(planets)
+    expected = 0.0
+    for turn in range(300):
+        expected += sum(building.risk_factor for building in planets[0].buildings)
+        for index, (planet, reference) in enumerate(zip(planets, references)):
+            planet.process_turn()
+            reference.process_turn()
+            failures[index] += sum(building.production_efficiency < efficiency_for_stability(planet.stability)
+                                   for building in planet.buildings)
+            if turn % 50 == 10:
+                for target in (planet, reference):
+                    target.add_building(create_building(BuildingType.FUSION_REACTOR))
+                    target.buildings[turn % 7].upgrade()
+                    target.buildings.pop(3)
+            if turn == 150:
+                planet.advance_turns(40)
+                reference.advance_turns(40)
+            assert planet.turn == reference.turn
+            for resource_type in ResourceType:
+                assert math.isclose(planet.resources[resource_type], reference.resources[resource_type],
+                                    rel_tol=1e-9, abs_tol=1e-6), f"Turn {turn}: {resource_type} diverged"
+            assert len(planet._failures) == len(planet.buildings), "Schedule out of step with buildings"
+    for planet in planets:
+        planet.verify_aggregates()
+        assert min(turn for turn, _ in planet._failures) > planet.turn, "Failure left in the past"
+    
+    # Scheduled buildings fail with the per-turn odds
+    for count in failures:
+        assert abs(count - expected) < 5 * math.sqrt(expected), f"{count} failures, expected ~{expected:.0f}"
+    rng = random.Random(5)
+    for p in (0.01, 0.15, 0.5):
+        waits = [resource_economy.geometric_variate(rng, p) for _ in range(20000)]
+        mean = sum(waits) / len(waits)
+        assert min(waits) >= 1 and abs(mean - 1 / p) < 5 * math.sqrt((1 - p) / p ** 2 / len(waits)), \
+            f"Geometric({p}) mean {mean}"
+    assert resource_economy.geometric_variate(rng, 0.0) is None
+    
+    # Copies continue the schedule; forks roll per building
+    planet = planets[1]
+    for copied in (copy.deepcopy(planet), pickle.loads(pickle.dumps(planet))):
+        assert copied.failures_scheduled
+        assert [turn for turn, _ in copied._failures] == [turn for turn, _ in planet._failures]
+        original = copy.deepcopy(planet)
+        for _ in range(30):
+            copied.process_turn()
+            original.process_turn()
+            assert [b.production_efficiency for b in copied.buildings] == \
+                [b.production_efficiency for b in original.buildings], "Copy diverged from its original"
+    assert not planet.fork().failures_scheduled
+    planet.aggregate_buildings()
+    assert not planet.failures_scheduled
+    try:
+        planet.schedule_failures()
+        assert False, "Aggregated planet scheduled failures"
+    except ValueError:
+        pass
+    
+    print("  ✓ Scheduled failures leave loop, vectorized and fast-forwarded turns unchanged")
+    print("  ✓ Failures follow the per-turn odds; geometric waits have mean 1/p")
+    print("  ✓ Copies continue the schedule; forks and aggregated planets do not schedule")
+
+
+def test_history_ring():
+    """Test the bounded columnar turn history."""
+    print("\nTesting turn history...")
+    
+    planet = _mixed_colony("Recorder", seed=9)
+    manager = EconomyManager(planet)
+    bounded = EconomyManager(planet)
+    bounded.history = EconomyHistory(capacity=16, downsample=4, long_capacity=8)
+    reports = []
+    for turn in range(50):
+        if turn % 7 == 0:
+            planet.construct_building(create_building(BuildingType.FARM))
+        planet.process_turn()
+        manager.record_turn()
+        bounded.record_turn()
+        reports.append(planet.get_economic_report())
+    
+    assert len(bounded.history) == 16, "History grew past its capacity"
+    assert list(bounded.history.column("turn")) == [r["turn"] for r in reports[-16:]]
+    assert list(bounded.history.column("food", turns=5)) == \
+        [r["resources"]["food"] for r in reports[-5:]], "Window diverged"
+    assert list(manager.history.column("energy_net")) == \
+        [r["net_production"]["energy"] for r in reports], "Net production diverged"
+    
+    # Trends match the same computation over the full reports (turns=0: all of them)
+    for turns in (0, 2, 10, 16, 50):
+        recent = reports[-turns:]
+        trends = manager.get_economic_trends(turns)
+        assert trends["stability_trend"] == recent[-1]["stability"] - recent[0]["stability"]
+        assert trends["building_growth"] == recent[-1]["buildings"] - recent[0]["buildings"]
+        assert trends["food_trend"] == recent[-1]["resources"]["food"] - recent[0]["resources"]["food"]
+    
+    # Older turns come from the downsampled tier (every 4th turn, last 8 kept)
+    assert list(bounded.history.column("turn", long_range=True)) == \
+        [r["turn"] for r in reports[::4]][-8:], "Downsampled tier diverged"
+    assert bounded.history.value("turn", 20) == reports[28]["turn"], "Long-range lookup diverged"
+    assert bounded.get_economic_trends(50)["building_growth"] == \
+        reports[-1]["buildings"] - reports[20]["buildings"], "Long-range trend diverged"
+    assert bounded.get_economic_trends(0) == bounded.get_economic_trends(50), "Whole-history trend diverged"
+    try:
+        manager.get_economic_trends(-1)
+        assert False, "Negative trend window accepted"
+    except ValueError:
+        pass
+    
+    print("  ✓ Recent turns kept in fixed-size columns")
+    print("  ✓ Trends match the full history")
+    print("  ✓ Downsampled tier keeps long-range history")
+
+
+def test_simulation_cache():
+    """Test that cached simulations match fresh ones and expire on changes."""
+    print("\nTesting simulation cache...")
+    
+    planet = PlanetState(name="Cached", seed=5)
+    cached = EconomyManager(planet, simulation_cache_size=16)
+    fresh = EconomyManager(planet, simulation_cache_size=0)
+    
+    def check(label):
+        for building_type in BuildingType:
+            for level in (1, 2):
+                expected = fresh.simulate_construction(building_type, level)
+                for _ in range(2):
+                    assert cached.simulate_construction(building_type, level) == expected, \
+                        f"{label}: stale simulation of {building_type.value} level {level}"
+    
+    # Untracked planets are simulated afresh; reading the version does not track them
+    assert planet.state_version is None, "Untracked planet has a version"
+    check("untracked")
+    assert planet._tracker is None and cached.simulation_cache.hits == 0, "Simulating started tracking"
+    
+    planet.track_changes()
+    version = planet.state_version
+    check("start")
+    assert planet.state_version == version, "Simulating changed the planet"
+    hits = cached.simulation_cache.hits
+    assert hits >= len(BuildingType) * 2, "Repeated queries missed the cache"
+    assert len(cached.simulation_cache) == 16, "Cache not bounded"
+    
+    # Every kind of change moves the version
+    changes = [
+        lambda: planet.process_turn(),
+        lambda: planet.construct_building(create_building(BuildingType.FARM)),
+        lambda: planet.buildings[0].upgrade(),
+        lambda: planet.resources.__setitem__(ResourceType.METALS, 5.0),
+        lambda: setattr(planet, "debt", 40.0),
+        lambda: setattr(planet, "population", 2000),
+    ]
+    for index, change in enumerate(changes):
+        change()
+        assert planet.state_version > version, f"Change {index} kept the version"
+        version = planet.state_version
+        check(f"change {index}")
+    
+    # Results are copies; editing one leaves the cache alone
+    result = cached.simulate_construction(BuildingType.FARM)
+    result["net_production"]["food"] = -1
+    assert cached.simulate_construction(BuildingType.FARM)["net_production"]["food"] != -1
+    
+    print("  ✓ Repeated queries are served from the cache")
+    print("  ✓ Any change to the planet invalidates cached results")
+
+
+def test_simulate_all_constructions():
+    """Test the one-call build menu against per-building simulations."""
+    print("\nTesting simulate_all_constructions...")
+    
+    rng = random.Random(21)
+    for trial in range(10):
+        planet = PlanetState(name="Menu", seed=trial)
+        for resource_type in ResourceType:
+            planet.resources[resource_type] = rng.uniform(-50, 900)
+        for _ in range(rng.randrange(8)):
+            planet.buildings.append(create_building(rng.choice(list(BuildingType))))
+        planet.debt = rng.uniform(0, 600)
+        manager = EconomyManager(planet, simulation_cache_size=0)
+        
+        for all_levels in (False, True):
+            table = manager.simulate_all_constructions(all_levels)
+            expected_rows = sum(BUILDING_TEMPLATES[bt].max_level for bt in BuildingType) \
+                if all_levels else len(BuildingType)
+            assert len(table) == expected_rows, "Wrong number of rows"
+            for row in range(len(table)):
+                building_type, level = table.building_types[row], table.levels[row]
+                assert table.row(row) == manager.simulate_construction(building_type, level), \
+                    f"Trial {trial}: {building_type.value} level {level} diverged"
+                assert table.index(building_type, level) == row
+    
+    cached = EconomyManager(planet)
+    planet.track_changes()
+    assert cached.simulate_all_constructions() is cached.simulate_all_constructions(), "Table not cached"
+    planet.process_turn()
+    table = cached.simulate_all_constructions()
+    assert table.current_stability == planet.calculate_stability(), "Stale table after a turn"
+    
+    print("  ✓ Every row matches simulate_construction, for all levels too")
+    print("  ✓ Tables are cached until the planet changes")
+
+
 def run_all_tests():
     """Run all tests."""
     print("="*80)
@@ -443,6 +1214,22 @@ def run_all_tests():
         test_economic_report,
         test_critical_stability_prevention,
         test_resource_shortage_impact,
+        test_vectorized_turn_matches_loop,
+        test_building_table_sync,
+        test_roll_order_survives_copies,
+        test_copies_keep_running_totals,
+        test_running_totals,
+        test_shared_building_specs,
+        test_compact_storage,
+        test_monte_carlo_forecast,
+        test_advance_turns,
+        test_planet_fork,
+        test_aggregated_buildings,
+        test_construction_queue,
+        test_scheduled_failures,
+        test_history_ring,
+        test_simulation_cache,
+        test_simulate_all_constructions,
     ]
     
     passed = 0
@@ -0,0 +1,194 @@
+"""
+Tests for the asyncio economy server.
+"""
+
+import asyncio
+import json
+
+from resource_economy import PlanetState
+from instrumentation import TurnInstruments
+from economy_server import EconomyServer, CommandError
+
+
+async def _request(port, method, path, payload=None):
+    """One HTTP request; returns (status, decoded JSON body or None)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(body) if body else None
+
+
+def test_server_commands():
+    """Test reads, queued construction and errors over HTTP."""
+    print("Testing economy server commands...")
+
+    async def scenario():
+        server = EconomyServer(tick_interval=0.05, instruments=TurnInstruments())
+        server.add_planet(PlanetState(name="Kepler", seed=1), seed=1)
+        server.add_planet(PlanetState(name="Proxima", seed=2), seed=2)
+        port = (await server.start(port=0)).sockets[0].getsockname()[1]
+        try:
+            status, planets = await _request(port, "POST", "/command", {"command": "planets"})
+            assert status == 200 and [p["name"] for p in planets["planets"]] == ["Kepler", "Proxima"]
+
+            status, simulated = await _request(port, "POST", "/command",
+                                               {"command": "simulate", "planet": "Kepler", "building": "farm"})
+            assert status == 200 and "recommendation" in simulated, "Simulation failed"
+
+            # Construction waits for a tick and is applied before that tick's turn
+            ticks = server.ticks
+            status, built = await _request(port, "POST", "/command",
+                                           {"command": "construct", "planet": "Kepler", "building": "farm"})
+            assert status == 200 and built["success"], f"Construction failed: {built}"
+            assert server.ticks > ticks, "Construction answered before a tick"
+            status, report = await _request(port, "POST", "/command", {"command": "report", "planet": "Kepler"})
+            assert report["buildings"] == 1 and report["turn"] > built["turn"], "Construction not applied"
+
+            for payload, expected in [
+                ({"command": "report", "planet": "Nowhere"}, 404),
+                ({"command": "construct", "planet": "Kepler", "building": "castle"}, 400),
+                ({"command": "launch"}, 400),
+                ({"command": "report", "planet": ["Kepler"]}, 400),
+                ({"command": "trends", "planet": "Kepler", "turns": -1}, 400),
+                ({"command": "trends", "planet": "Kepler", "turns": True}, 400),
+                ([1, 2], 400),
+            ]:
+                status, error = await _request(port, "POST", "/command", payload)
+                assert status == expected and "error" in error, f"{payload}: got {status}"
+            assert (await _request(port, "GET", "/command"))[0] == 405
+            assert (await _request(port, "GET", "/missing"))[0] == 404
+
+            status, summary = await _request(port, "GET", "/status")
+            assert summary["planets"] == 2 and summary["instruments"]["turns"] == 2 * summary["ticks"]
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+    print("  ✓ Reads answer at once; construction is applied at the next tick")
+    print("  ✓ Unknown planets, buildings, commands and endpoints are rejected")
+
+
+def test_server_ticks_past_slow_clients():
+    """Test that stalled clients neither block ticks nor other clients."""
+    print("Testing economy server with slow clients...")
+
+    async def scenario():
+        server = EconomyServer(tick_interval=0.02, request_timeout=0.3)
+        server.add_planet(PlanetState(name="Kepler", seed=1))
+        port = (await server.start(port=0)).sockets[0].getsockname()[1]
+        try:
+            # Clients that send half a request and stall
+            stalled = []
+            for _ in range(5):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"POST /command HTTP/1.1\r\nContent-Length: 100\r\n\r\n{")
+                await writer.drain()
+                stalled.append((reader, writer))
+
+            ticks = server.ticks
+            status, _ = await _request(port, "POST", "/command", {"command": "report", "planet": "Kepler"})
+            assert status == 200, "Stalled clients blocked another client"
+            await asyncio.sleep(0.2)
+            assert server.ticks >= ticks + 5, "Stalled clients held up ticks"
+
+            # Stalled clients are timed out
+            for reader, writer in stalled:
+                response = await asyncio.wait_for(reader.read(), 2)
+                assert response.startswith(b"HTTP/1.1 408"), "Stalled client not timed out"
+                writer.close()
+        finally:
+            await server.stop()
+
+        # Queued commands fail if their planet is gone by the next tick
+        server = EconomyServer()
+        server.add_planet(PlanetState(name="Kepler", seed=1))
+        pending = asyncio.ensure_future(
+            server.submit({"command": "construct", "planet": "Kepler", "building": "farm"})
+        )
+        await asyncio.sleep(0)
+        server.remove_planet("Kepler")
+        server.tick()
+        try:
+            await pending
+            assert False, "Command for a removed planet succeeded"
+        except CommandError as e:
+            assert e.status == 404
+
+        # Queued commands time out if no tick comes
+        server = EconomyServer(request_timeout=0.05)
+        server.add_planet(PlanetState(name="Kepler", seed=1))
+        try:
+            await server.submit({"command": "construct", "planet": "Kepler", "building": "farm"})
+            assert False, "Command answered without a tick"
+        except CommandError as e:
+            assert e.status == 503 and server._pending[0][1].cancelled(), "Timed-out command left live"
+
+    asyncio.run(scenario())
+
+    print("  ✓ Ticks keep their schedule while clients stall")
+    print("  ✓ Stalled clients and untaken commands time out; commands for removed planets fail")
+
+
+def test_failed_tick_fails_commands():
+    """Test that a tick raising fails queued and later commands instead of hanging them."""
+    print("Testing economy server with a failing tick...")
+
+    async def scenario():
+        server = EconomyServer(tick_interval=0.05, request_timeout=5.0)
+        manager = server.add_planet(PlanetState(name="Kepler", seed=1))
+        port = (await server.start(port=0)).sockets[0].getsockname()[1]
+        try:
+            await asyncio.sleep(0.1)
+
+            def broken_turn():
+                raise RuntimeError("turn failed")
+            manager.planet.process_turn = broken_turn
+
+            construct = {"command": "construct", "planet": "Kepler", "building": "farm"}
+            status, error = await asyncio.wait_for(_request(port, "POST", "/command", construct), 2)
+            assert status == 503 and "turn failed" in error["error"], f"Queued command got {status}"
+            status, error = await asyncio.wait_for(_request(port, "POST", "/command", construct), 2)
+            assert status == 503, "Command queued after the tick loop stopped"
+
+            status, report = await _request(port, "POST", "/command", {"command": "report", "planet": "Kepler"})
+            assert status == 200, "Reads should still work"
+            status, summary = await _request(port, "GET", "/status")
+            assert "turn failed" in summary["tick_error"]
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+    print("  ✓ A failed tick answers queued and later commands with 503")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_server_commands,
+        test_server_ticks_past_slow_clients,
+        test_failed_tick_fails_commands,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
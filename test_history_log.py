@@ -0,0 +1,122 @@
+"""
+Tests for the append-only on-disk turn history.
+"""
+
+import os
+import tempfile
+
+from resource_economy import (
+    PlanetState, EconomyManager, BuildingType, create_building, HISTORY_COLUMNS
+)
+from history_log import HistoryLog, HistoryLogReader, HEADER, RECORD_SIZE
+
+
+def _colony():
+    planet = PlanetState(name="Archive", seed=5)
+    for building_type in [BuildingType.FARM, BuildingType.MINE, BuildingType.POWER_PLANT]:
+        planet.buildings.append(create_building(building_type))
+    return planet
+
+
+def test_log_round_trip():
+    """Test that logged turns read back as recorded."""
+    print("Testing history log round trip...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "archive.gfhl")
+        planet = _colony()
+        manager = EconomyManager(planet, history_log=HistoryLog(path, buffer_turns=8))
+        for _ in range(20):
+            planet.process_turn()
+            manager.record_turn()
+        
+        # Only whole buffers reach the file before a flush
+        assert os.path.getsize(path) == HEADER.size + 16 * RECORD_SIZE, "Turns not buffered"
+        manager.history_log.close()
+        
+        with HistoryLogReader(path) as reader:
+            assert len(reader) == 20, "Logged turn count wrong"
+            for metric in ("turn", "stability", "buildings", "food", "energy_net"):
+                column = reader.column(metric)
+                assert column.tolist() == list(manager.history.column(metric)), \
+                    f"{metric} diverged"
+                column.release()
+            
+            rows = reader.records(5, 9)
+            assert rows.shape == (4, len(HISTORY_COLUMNS)), "Record view has the wrong shape"
+            assert rows[0, HISTORY_COLUMNS["turn"]] == 6, "Record view starts at the wrong turn"
+            rows.release()
+            
+            rows = reader.turn_range(10, 12)
+            assert [row[HISTORY_COLUMNS["turn"]] for row in rows.tolist()] == [10, 11, 12]
+            rows.release()
+            assert reader.records(7, 7).tolist() == [], "Empty range not empty"
+    
+    print("  ✓ Logged turns match the in-memory history")
+    print("  ✓ Writes are buffered")
+
+
+def test_log_append_and_validation():
+    """Test reopening a log and rejecting other files."""
+    print("Testing history log reopening...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "archive.gfhl")
+        planet = _colony()
+        for _ in range(2):
+            with HistoryLog(path) as log:
+                for _ in range(3):
+                    planet.process_turn()
+                    log.record(planet)
+        
+        # A torn trailing record is ignored
+        with open(path, "ab") as log_file:
+            log_file.write(b"\0" * 10)
+        with HistoryLogReader(path) as reader:
+            turns = reader.column("turn")
+            assert turns.tolist() == [1, 2, 3, 4, 5, 6], "Reopened log lost turns"
+            turns.release()
+        with HistoryLog(path) as log:
+            planet.process_turn()
+            log.record(planet)
+        with HistoryLogReader(path) as reader:
+            turns = reader.column("turn")
+            assert turns.tolist() == [1, 2, 3, 4, 5, 6, 7], "Torn record not dropped"
+            turns.release()
+        
+        other = os.path.join(directory, "other.bin")
+        with open(other, "wb") as other_file:
+            other_file.write(b"not a history log")
+        for opener in (HistoryLog, HistoryLogReader):
+            try:
+                opener(other)
+                assert False, f"{opener.__name__} accepted a foreign file"
+            except ValueError:
+                pass
+    
+    print("  ✓ Reopened logs append after dropping torn records")
+    print("  ✓ Foreign files are rejected")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_log_round_trip,
+        test_log_append_and_validation,
+    ]
+    
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+    
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
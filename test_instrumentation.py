@@ -0,0 +1,122 @@
+"""
+Tests for turn instrumentation.
+"""
+
+import copy
+import pickle
+
+from resource_economy import PlanetState, EconomyManager, BuildingType, ResourceType, create_building
+from instrumentation import TurnInstruments
+
+
+def _colony(name, vectorized=False):
+    planet = PlanetState(name=name, seed=7, population=400, vectorized=vectorized)
+    for building_type in list(BuildingType) * 3:
+        planet.buildings.append(create_building(building_type))
+    return planet
+
+
+def test_instrumented_turns_match():
+    """Test that instrumented turns play out exactly like plain ones."""
+    print("Testing instrumented turns...")
+
+    instruments = TurnInstruments()
+    for vectorized in (False, True):
+        plain = _colony("Plain", vectorized)
+        timed = _colony("Timed", vectorized)
+        instruments.attach([timed])
+        for _ in range(15):
+            plain.process_turn()
+            timed.process_turn()
+        assert plain.get_economic_report() == timed.get_economic_report(), \
+            f"Instrumented turn diverged (vectorized={vectorized})"
+        assert [b.production_efficiency for b in plain.buildings] == \
+            [b.production_efficiency for b in timed.buildings], "Building failures diverged"
+
+    # Forks sharing buildings are timed like any planet
+    base = _colony("Base")
+    fork = base.fork(seed=3)
+    instruments.attach([fork])
+    fork.process_turn()
+    assert fork._fork_base is base, "Instrumented turn expanded a fork"
+    assert instruments.turns == 31, f"Expected 31 turns, got {instruments.turns}"
+
+    print("  ✓ Loop, vectorized and shared-building turns are unchanged by timing")
+
+
+def test_instrument_counters():
+    """Test counters, aggregation across planets, hooks and opting out."""
+    print("Testing instrument counters...")
+
+    samples = []
+    instruments = TurnInstruments(hooks=[lambda planet, sample: samples.append((planet.name, sample))])
+    loop, vectorized = _colony("Loop"), _colony("Vector", vectorized=True)
+    EconomyManager(loop, instruments=instruments)
+    EconomyManager(vectorized, instruments=instruments)
+    for _ in range(20):
+        loop.process_turn()
+        vectorized.process_turn()
+
+    by_planet = {"Loop": [], "Vector": []}
+    for name, sample in samples:
+        by_planet[name].append(sample)
+    assert [s.turn for s in by_planet["Loop"]] == list(range(1, 21)), "Hook missed turns"
+    # Same seed and building order: both engines roll the same failures
+    assert [s.failures for s in by_planet["Loop"]] == [s.failures for s in by_planet["Vector"]], \
+        "Engines counted different failures"
+    assert instruments.failures == sum(s.failures for _, s in samples) > 0, "Failures not aggregated"
+    assert instruments.buildings == 40 * len(loop.buildings), "Buildings not aggregated"
+
+    summary = instruments.summary()
+    assert summary["turns"] == 40, "Turns not aggregated across planets"
+    assert set(summary["phases"]) == {"stability", "production", "risk", "consumption"}
+    assert all(phase["max_us"] >= phase["mean_us"] > 0 for phase in summary["phases"].values())
+    assert summary["slowest"]["planet"] in ("Loop", "Vector"), "Slowest turn not tracked"
+
+    print("  ✓ Hooks see every turn; counters aggregate across planets")
+
+    # Shortages: neither food nor energy consumption can be paid
+    starving = PlanetState(name="Starving", seed=1, population=1000)
+    starving.buildings.append(create_building(BuildingType.MINE))
+    starving.resources[ResourceType.FOOD] = 0.0
+    starving.resources[ResourceType.ENERGY] = 0.0
+    instruments.reset()
+    instruments.attach([starving])
+    starving.process_turn()
+    assert instruments.shortages == 2, f"Expected 2 shortages, got {instruments.shortages}"
+
+    print("  ✓ Unpaid consumption counts as shortages")
+
+    # Copies, pickles and forks start uninstrumented; detach opts out
+    assert copy.deepcopy(starving).instruments is None, "Copy kept instruments"
+    assert pickle.loads(pickle.dumps(starving)).instruments is None, "Pickle kept instruments"
+    assert starving.fork().instruments is None, "Fork kept instruments"
+    instruments.detach([starving])
+    starving.process_turn()
+    assert instruments.turns == 1, "Detached planet still recorded"
+
+    print("  ✓ Copies, pickles and forks are not instrumented")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_instrumented_turns_match,
+        test_instrument_counters,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
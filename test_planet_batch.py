@@ -0,0 +1,159 @@
+"""
+Tests for lockstep multi-planet simulation with PlanetBatch.
+"""
+
+import copy
+import math
+import pickle
+import random
+
+from resource_economy import PlanetState, BuildingType, ResourceType, create_building
+from planet_batch import PlanetBatch, BatchPlanet
+
+
+def _colony(name, building_types, food=1000.0, seed=None):
+    """Build a planet with the given buildings."""
+    planet = PlanetState(name=name, seed=seed)
+    planet.resources[ResourceType.FOOD] = food
+    for building_type in building_types:
+        planet.buildings.append(create_building(building_type))
+    return planet
+
+
+def _sample_colonies():
+    return [
+        _colony("Alpha", [BuildingType.FARM, BuildingType.MINE], seed=1),
+        _colony("Beta", [BuildingType.DEEP_CORE_EXTRACTOR] * 6, food=50.0, seed=2),
+        _colony("Gamma", list(BuildingType), seed=3),
+        _colony("Delta", [], seed=4),
+    ]
+
+
+def test_batch_matches_individual_planets():
+    """Test that a batch turn matches ticking each planet on its own."""
+    print("Testing batch turn processing...")
+    
+    planets = _sample_colonies()
+    batch = PlanetBatch(copy.deepcopy(planets))
+    
+    # Tick the standalone planets in reverse order; per-planet streams make
+    # the order irrelevant
+    for _ in range(12):
+        for planet in reversed(planets):
+            planet.process_turn()
+    for _ in range(12):
+        batch.process_turn()
+    
+    for planet, view in zip(planets, batch):
+        assert view.turn == planet.turn, f"{planet.name}: turn diverged"
+        assert math.isclose(view.stability, planet.stability), f"{planet.name}: stability diverged"
+        for resource_type in ResourceType:
+            assert math.isclose(
+                view.resources[resource_type], planet.resources[resource_type],
+                rel_tol=1e-9, abs_tol=1e-6
+            ), f"{planet.name}: {resource_type} diverged"
+        efficiency = [b.production_efficiency for b in planet.buildings]
+        assert [b.production_efficiency for b in view.buildings] == efficiency, \
+            f"{planet.name}: efficiency diverged"
+    
+    print(f"  ✓ {len(batch)} planets match individually ticked planets")
+
+
+def test_seeded_streams_across_splits():
+    """Test that seeded planets follow the same trajectory however they are grouped."""
+    print("\nTesting seeded random streams...")
+    
+    # One batch holding everything vs. two batches in a different order
+    whole = PlanetBatch(_sample_colonies())
+    colonies = _sample_colonies()
+    halves = [PlanetBatch(colonies[2:]), PlanetBatch(reversed(colonies[:2]))]
+    
+    # Unrelated use of the global generator must not matter either
+    random.seed(99)
+    for _ in range(12):
+        whole.process_turn()
+        for half in halves:
+            random.random()
+            half.process_turn()
+    
+    split = {view.name: view for half in halves for view in half}
+    for view in whole:
+        other = split[view.name]
+        assert dict(view.resources) == dict(other.resources), f"{view.name}: stockpiles diverged"
+        assert view.stability == other.stability, f"{view.name}: stability diverged"
+        assert [b.production_efficiency for b in view.buildings] == \
+            [b.production_efficiency for b in other.buildings], f"{view.name}: failures diverged"
+    
+    # Copies carry the stream along with the state
+    standalone = copy.deepcopy(whole[2])
+    whole[2].process_turn()
+    standalone.process_turn()
+    assert dict(standalone.resources) == dict(whole[2].resources), "Copied stream diverged"
+    
+    print("  ✓ Trajectories depend only on each planet's seed")
+    print("  ✓ Standalone copies continue the same stream")
+
+
+def test_batch_planet_view():
+    """Test that batch views behave like PlanetState."""
+    print("\nTesting batch planet views...")
+    
+    batch = PlanetBatch(_sample_colonies())
+    view = batch[0]
+    assert isinstance(view, BatchPlanet) and isinstance(view, PlanetState)
+    
+    metals = view.resources[ResourceType.METALS]
+    success, message = view.construct_building(create_building(BuildingType.FARM))
+    assert success, f"Construction through view failed: {message}"
+    assert view.resources[ResourceType.METALS] < metals, "Costs not charged to batch"
+    assert len(view.buildings) == 3, "Building not added through view"
+    
+    batch.process_turn()
+    assert batch.building_count[0] == 3, "Building aggregates not refreshed"
+    
+    report = view.get_economic_report()
+    assert report["turn"] == 1, "Report does not read batch columns"
+    assert report["buildings"] == 3, "Report building count wrong"
+    
+    for standalone in (copy.deepcopy(view), pickle.loads(pickle.dumps(view))):
+        assert type(standalone) is PlanetState, "Copy of a view is not standalone"
+        assert standalone.resources == dict(view.resources), "Standalone copy lost stockpiles"
+    
+    # Batch turns need each planet's building table
+    for blocked in (view.aggregate_buildings, view.schedule_failures):
+        try:
+            blocked()
+            assert False, f"{blocked.__name__} allowed on a batch planet"
+        except TypeError:
+            pass
+    batch.process_turn()
+    assert batch.building_count[0] == 3, "Blocked call changed the batch"
+    
+    print("  ✓ Commands and reports work through views")
+    print("  ✓ Copies of views are standalone planets")
+    print("  ✓ Views refuse to aggregate or schedule failures")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_batch_matches_individual_planets,
+        test_seeded_streams_across_splits,
+        test_batch_planet_view,
+    ]
+    
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+    
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,199 @@
+"""
+Tests for the binary planet save format.
+"""
+
+import copy
+import math
+import os
+import tempfile
+
+from resource_economy import PlanetState, BuildingType, ResourceType, create_building
+import planet_save
+
+
+def _colony(name, seed, vectorized=False):
+    """A planet with a few buildings, some upgraded, after a few turns."""
+    planet = PlanetState(name=name, seed=seed, population=400, vectorized=vectorized)
+    for index, building_type in enumerate(list(BuildingType) * 2):
+        building = create_building(building_type)
+        for _ in range(index % 3):
+            building.upgrade()
+        planet.buildings.append(building)
+    for _ in range(3):
+        planet.process_turn()
+    return planet
+
+
+def _assert_same(expected, actual, label):
+    assert (actual.name, actual.turn, actual.seed, actual.vectorized) == \
+        (expected.name, expected.turn, expected.seed, expected.vectorized), f"{label}: fields diverged"
+    assert math.isclose(actual.stability, expected.stability, abs_tol=1e-9), f"{label}: stability diverged"
+    for resource_type in ResourceType:
+        assert math.isclose(
+            actual.resources[resource_type], expected.resources[resource_type],
+            rel_tol=1e-9, abs_tol=1e-6
+        ), f"{label}: {resource_type} diverged"
+    assert [(b.spec, b.production_efficiency) for b in actual.buildings] == \
+        [(b.spec, b.production_efficiency) for b in expected.buildings], f"{label}: buildings diverged"
+    assert actual.rng.getstate() == expected.rng.getstate(), f"{label}: random stream diverged"
+    assert [(turn, b.spec, b.production_efficiency) for turn, b in actual.construction_queue or ()] == \
+        [(turn, b.spec, b.production_efficiency) for turn, b in expected.construction_queue or ()], \
+        f"{label}: construction queue diverged"
+    actual.verify_aggregates()
+
+
+def test_save_round_trip():
+    """Test that saved planets load back identical, eagerly and lazily."""
+    print("Testing planet save round trip...")
+
+    planets = [_colony("Kepler", 1), _colony("Proxima", 2**80, vectorized=True),
+               PlanetState(name="Nova ✦", seed=None)]
+    planets[0]._strain += 1e-9  # rounding residue a recompute would drop
+    data = planet_save.dumps(planets)
+
+    for lazy in (False, True):
+        loaded = planet_save.loads(data, lazy=lazy)
+        assert len(loaded) == len(planets), "Planet count changed"
+        for expected, actual in zip(planets, loaded):
+            label = f"{expected.name} ({'lazy' if lazy else 'eager'})"
+            if lazy and expected.buildings:
+                assert actual._fork_base is not None, f"{label}: buildings expanded on load"
+            assert (actual._strain, actual._gross, actual._upkeep, actual._output) == \
+                (expected._strain, expected._gross, expected._upkeep, expected._output), \
+                f"{label}: saved running totals not restored"
+            _assert_same(expected, actual, label)
+
+    print("  ✓ Stockpiles, buildings, levels, efficiencies and random streams round-trip")
+    print("  ✓ Eager and lazy loads restore the saved running totals")
+
+    # Lazily loaded planets play on without expanding their buildings
+    for expected, actual in zip(copy.deepcopy(planets), planet_save.loads(data, lazy=True)):
+        for building_type in [BuildingType.FARM, BuildingType.MINE]:
+            expected.construct_building(create_building(building_type))
+            actual.construct_building(create_building(building_type))
+            expected.process_turn()
+            actual.process_turn()
+        assert actual._fork_base is not None, "Turns expanded a lazily loaded planet"
+        resaved = planet_save.loads(planet_save.dumps([actual]))[0]
+        _assert_same(expected, resaved, f"{expected.name} resaved")
+        _assert_same(expected, actual, f"{expected.name} played")
+
+    print("  ✓ Lazily loaded planets play and resave before expanding")
+
+    # Aggregated planets load as counts
+    counted = _colony("Counted", 3)
+    counted.aggregate_buildings()
+    counted.process_turn()
+    loaded = planet_save.loads(planet_save.dumps([counted]))[0]
+    assert loaded.aggregated, "Aggregated planet loaded as building objects"
+    assert list(loaded._fork_base.counts.items()) == list(counted._fork_base.counts.items()), \
+        "Building counts diverged"
+    _assert_same(counted, loaded, "Counted")
+
+    print("  ✓ Aggregated planets stay aggregated")
+
+    # Buildings under construction are saved with their completion turns
+    building = PlanetState(name="Building", seed=4, population=400)
+    building.buildings.extend(create_building(BuildingType.FARM) for _ in range(3))
+    building.process_turn()
+    building.queue_constructions(create_building(building_type) for building_type in
+                                 [BuildingType.MINE, BuildingType.FARM, BuildingType.FARM])
+    building.cancel_construction(list(building.construction_queue)[0][1])
+    for lazy in (False, True):
+        loaded = planet_save.loads(planet_save.dumps([building], random_state=lazy), lazy=lazy)[0]
+        if not lazy:
+            loaded.rng.setstate(building.rng.getstate())
+        assert len(loaded.construction_queue) == 2, "Queued buildings lost"
+        _assert_same(building, loaded, "Building")
+        loaded.advance_turns(5)
+        played = copy.deepcopy(building)
+        played.advance_turns(5)
+        _assert_same(played, loaded, "Building played")
+
+    print("  ✓ Construction queues round-trip")
+
+    # Scheduled failures continue where they left off
+    scheduled = _colony("Scheduled", 5, vectorized=True)
+    scheduled.schedule_failures()
+    scheduled.process_turn()
+    loaded = planet_save.loads(planet_save.dumps([scheduled]), lazy=True)[0]
+    assert loaded.failures_scheduled and loaded._fork_base is None, "Schedule not restored"
+    assert [(turn, b.spec) for turn, b in loaded._failures] == [(turn, b.spec) for turn, b in scheduled._failures]
+    for _ in range(20):
+        scheduled.process_turn()
+        loaded.process_turn()
+        _assert_same(scheduled, loaded, "Scheduled played")
+
+    print("  ✓ Failure schedules round-trip")
+
+
+def test_save_files_and_errors():
+    """Test file helpers, seed-free saves and rejected input."""
+    print("Testing planet save files...")
+
+    planets = [_colony("Kepler", 1), _colony("Proxima", 2)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "planets.gfps")
+        planet_save.save(path, planets, random_state=False)
+        loaded = planet_save.load(path)
+    assert [p.name for p in loaded] == ["Kepler", "Proxima"], "File round trip failed"
+    assert loaded[0].rng.getstate() == PlanetState(name="Fresh", seed=1).rng.getstate(), \
+        "Saves without random state should restart from the seed"
+    assert len(planet_save.dumps(planets, random_state=False)) < len(planet_save.dumps(planets)) - 4000
+
+    data = planet_save.dumps(planets)
+    # Byte 14 is the first planet's flags (after the file header and record length)
+    unknown_flag = data[:14] + bytes([data[14] | 128]) + data[15:]
+    queue_in_version_2 = data[:4] + b"\x02\x00" + data[6:14] + bytes([data[14] | 16]) + data[15:]
+    for bad in (b"not a save", data[:-10], b"GFPS\x63\x00" + data[6:], unknown_flag, queue_in_version_2):
+        try:
+            planet_save.loads(bad)
+            assert False, "Corrupt save accepted"
+        except ValueError:
+            pass
+    older = planet_save.loads(data[:4] + b"\x01\x00" + data[6:])
+    assert [p.name for p in older] == ["Kepler", "Proxima"], "Version 1 save not loaded"
+
+    custom = PlanetState(name="Custom")
+    building = create_building(BuildingType.FARM)
+    building.spec = building.spec.upgraded().upgraded()
+    custom.buildings.append(building)
+    planet_save.dumps([custom])  # a template spec at level 3 is fine
+    from resource_economy import ProductionBuilding
+    custom.buildings.append(ProductionBuilding(
+        type=BuildingType.FARM, name="Prototype Farm", description="",
+        construction_costs={}, construction_time=1, produces={ResourceType.FOOD: 999.0},
+    ))
+    try:
+        planet_save.dumps([custom])
+        assert False, "Non-template building saved"
+    except ValueError:
+        pass
+
+    print("  ✓ Files, seed-only saves and corrupt input handled")
+    print("  ✓ Older versions load; newer versions and unknown flags are rejected")
+    print("  ✓ Non-template buildings are rejected")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_save_round_trip,
+        test_save_files_and_errors,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,124 @@
+"""
+Tests for the sharded tick scheduler.
+"""
+
+import math
+
+from resource_economy import PlanetState, BuildingType, ResourceType, HISTORY_COLUMNS, create_building
+from shard_scheduler import ShardedScheduler, pack_planet, unpack_planet
+
+
+def _galaxy(count):
+    """Planets of uneven sizes, some vectorized, some with a removed building."""
+    planets = []
+    for i in range(count):
+        planet = PlanetState(name=f"Planet {i}", seed=100 + i, population=300 + 50 * i,
+                             vectorized=i % 2 == 0)
+        for building_type in list(BuildingType)[:2 + i % 5] * (1 + i % 4):
+            planet.buildings.append(create_building(building_type))
+        planet.process_turn()
+        if i % 3 == 0:
+            planet.buildings.pop(0)
+        planets.append(planet)
+    return planets
+
+
+def _same_planet(expected, actual, label):
+    assert (actual.turn, actual.stability) == (expected.turn, expected.stability), f"{label}: turn diverged"
+    assert [actual.resources[rt] for rt in ResourceType] == [expected.resources[rt] for rt in ResourceType], \
+        f"{label}: stockpiles diverged"
+    assert [b.production_efficiency for b in actual.buildings] == \
+        [b.production_efficiency for b in expected.buildings], f"{label}: failures diverged"
+    assert actual.rng.getstate() == expected.rng.getstate(), f"{label}: random stream diverged"
+
+
+def test_sharded_ticks_match_single_process():
+    """Test that sharded, rebalanced ticks match ticking in one process."""
+    print("Testing sharded ticks...")
+
+    planets = _galaxy(12)
+    reference = _galaxy(12)  # built the same way, never leaves this process
+    for expected in _galaxy(12):
+        moved = unpack_planet(pack_planet(expected))
+        for _ in range(3):
+            expected.process_turn()
+            moved.process_turn()
+        _same_planet(expected, moved, f"{expected.name} packed")
+
+    # Everything starts on shard 0, so rebalancing has to move planets
+    with ShardedScheduler(planets, workers=3, rebalance_interval=0, assignment=[0] * 12) as scheduler:
+        for tick in range(8):
+            scheduler.tick(turns=2)
+            if tick == 2:
+                assert scheduler.rebalance() > 0, "Skewed shards not rebalanced"
+                assert min(scheduler.shard_sizes()) > 0, "A shard was left empty"
+        scheduler.call("Planet 4", "construct_building", create_building(BuildingType.FARM))
+        scheduler.tick()
+
+        for expected in reference:
+            for _ in range(16):
+                expected.process_turn()
+        reference[4].construct_building(create_building(BuildingType.FARM))
+        for expected in reference:
+            expected.process_turn()
+
+        state = scheduler.state()
+        for index, (expected, actual) in enumerate(zip(reference, scheduler.planets())):
+            _same_planet(expected, actual, expected.name)
+            assert state[index, HISTORY_COLUMNS["turn"]] == expected.turn, "Shared turn is stale"
+            assert state[index, HISTORY_COLUMNS["food"]] == expected.resources[ResourceType.FOOD], \
+                "Shared stockpile is stale"
+        state.release()
+        assert scheduler.value("Planet 4", "buildings") == len(reference[4].buildings)
+        energy = scheduler.column("energy")
+        assert math.isclose(sum(energy), sum(p.resources[ResourceType.ENERGY] for p in reference))
+        energy.release()
+        assert scheduler.moves > 0
+
+    print("  ✓ Ticks, moves between shards and planet calls match one process")
+    print("  ✓ Shared memory shows every planet's state after each tick")
+
+
+def test_scheduler_partition():
+    """Test the initial partition and argument checks."""
+    print("Testing shard partition...")
+
+    planets = _galaxy(9)
+    with ShardedScheduler(planets, workers=3) as scheduler:
+        loads = [0] * 3
+        for planet, shard in zip(planets, scheduler._shard_of):
+            loads[shard] += len(planet.buildings) + 5
+        assert max(loads) - min(loads) <= max(len(p.buildings) + 5 for p in planets), "Partition is skewed"
+        assert scheduler.rebalance(force=True) == 0, "Rebalanced without any timings"
+
+    try:
+        ShardedScheduler(planets, workers=2, assignment=[5] * 9)
+        assert False, "Out of range assignment accepted"
+    except ValueError:
+        pass
+
+    print("  ✓ Planets are spread by cost and bad assignments are rejected")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_sharded_ticks_match_single_process,
+        test_scheduler_partition,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,282 @@
+"""
+Tests for the interplanetary trade network.
+"""
+
+import math
+import random
+
+from resource_economy import PlanetState, BuildingType, ResourceType, RESOURCE_ORDER, create_building
+from trade_network import TradeNetwork, planet_balance
+
+SHORTAGE_COST = 60.0
+
+
+def _network(size, seed, capacities=(math.inf,)):
+    """A random network with made-up balances; returns it with its balances and routes."""
+    rng = random.Random(seed)
+    planets = [PlanetState(name=f"P{i}") for i in range(size)]
+    balances = {planet.name: [rng.uniform(-50, 50) for _ in RESOURCE_ORDER] for planet in planets}
+    trade = TradeNetwork(planets, shortage_cost=SHORTAGE_COST, balance=lambda planet: balances[planet.name])
+    routes = {}
+    for _ in range(size * 2):
+        _random_route(trade, routes, rng, capacities)
+    return trade, balances, routes, rng
+
+
+def _random_route(trade, routes, rng, capacities):
+    source, destination = rng.sample(sorted(trade.planets), 2)
+    cost, capacity = rng.uniform(1, 30), rng.choice(capacities)
+    trade.set_route(source, destination, cost, capacity)
+    routes[(source, destination)] = routes[(destination, source)] = (cost, capacity)
+
+
+def _assert_optimal(plan, balances, routes):
+    """
+    Check a plan against its problem: shipments within capacity, the
+    reported shortfall, and no cheaper way to re-route any of it (no
+    negative cycle in the residual graph, the market included).
+    """
+    names = list(balances)
+    for resource_type in RESOURCE_ORDER:
+        flows = {
+            (transfer.source, transfer.destination): transfer.amount
+            for transfer in plan.transfers if transfer.resource is resource_type
+        }
+        shipped = dict.fromkeys(names, 0.0)
+        for (source, destination), amount in flows.items():
+            assert amount <= routes[(source, destination)][1] + 1e-6, "Route over capacity"
+            shipped[source] += amount
+            shipped[destination] -= amount
+
+        arcs = []
+        short = 0.0
+        for name in names:
+            left = balances[name][resource_type.index] - shipped[name]
+            if left > 1e-6:
+                arcs.append(("market", name, 0.0))
+            elif left < -1e-6:
+                arcs.append((name, "market", -SHORTAGE_COST))
+                short -= left
+            arcs.append((name, "market", 0.0))
+            arcs.append(("market", name, SHORTAGE_COST))
+        for pair, (cost, capacity) in routes.items():
+            amount = flows.get(pair, 0.0)
+            if amount < capacity - 1e-6:
+                arcs.append((*pair, cost))
+            if amount > 1e-6:
+                arcs.append((pair[1], pair[0], -cost))
+        assert abs(short - plan.shortfall[resource_type]) < 1e-4 * max(1.0, short), "Wrong shortfall"
+
+        # Bellman-Ford from everywhere at once
+        distances = dict.fromkeys(names + ["market"], 0.0)
+        for _ in range(len(distances)):
+            changed = False
+            for tail, head, cost in arcs:
+                if distances[tail] + cost < distances[head] - 1e-7:
+                    distances[head] = distances[tail] + cost
+                    changed = True
+            if not changed:
+                break
+        else:
+            assert False, f"Cheaper {resource_type.value} shipments left unused"
+
+
+def _total_cost(plan):
+    return plan.cost + SHORTAGE_COST * sum(plan.shortfall.values())
+
+
+def test_plans_are_optimal():
+    """Test that plans meet deficits as cheaply as the routes allow."""
+    print("Testing trade plans...")
+
+    for seed in range(15):
+        trade, balances, routes, _ = _network(2 + seed, seed, capacities=(math.inf, 20.0, 5.0))
+        _assert_optimal(trade.solve(), balances, routes)
+
+    # A deficit is met from the nearest surplus, then from the next one
+    planets = [PlanetState(name=name) for name in ("Kepler", "Proxima", "Vega")]
+    balances = {"Kepler": [-30.0, 0, 0, 0, 0], "Proxima": [20.0, 0, 0, 0, 0], "Vega": [20.0, 0, 0, 0, 0]}
+    trade = TradeNetwork(planets, shortage_cost=100.0, balance=lambda planet: balances[planet.name])
+    trade.set_route("Proxima", "Kepler", 2.0)
+    trade.set_route("Vega", "Kepler", 5.0, both_ways=False)
+    plan = trade.solve()
+    shipped = {(t.source, t.destination): t.amount for t in plan.transfers}
+    assert shipped == {("Proxima", "Kepler"): 20.0, ("Vega", "Kepler"): 10.0}, shipped
+    assert plan.cost == 90.0
+    assert plan.shortfall[ResourceType.FOOD] == 0.0
+    assert plan.unshipped[ResourceType.FOOD] == 10.0
+
+    # Capacity caps a route; past that the deficit goes short
+    trade.set_route("Vega", "Kepler", 5.0, capacity=4.0, both_ways=False)
+    plan = trade.solve()
+    assert abs(plan.shortfall[ResourceType.FOOD] - 6.0) < 1e-9
+    assert abs(plan.cost - 60.0) < 1e-9
+
+    # Routes dearer than a shortage are not used
+    trade.set_route("Proxima", "Kepler", 150.0)
+    plan = trade.solve()
+    assert [(t.source, t.amount) for t in plan.transfers] == [("Vega", 4.0)]
+
+    print("  ✓ Random networks have no cheaper plan")
+    print("  ✓ Capacities and the shortage cost bound what is shipped")
+
+
+def test_incremental_matches_cold():
+    """Test that re-solving after changes plans as well as solving afresh."""
+    print("Testing incremental re-solves...")
+
+    for seed in range(8):
+        trade, balances, routes, rng = _network(20, seed, capacities=(math.inf, 20.0))
+        trade.solve()
+        for step in range(12):
+            kind = rng.randrange(3)
+            if kind == 0:
+                balances[f"P{rng.randrange(20)}"][rng.randrange(len(RESOURCE_ORDER))] = rng.uniform(-50, 50)
+            elif kind == 1:
+                _random_route(trade, routes, rng, (math.inf, 20.0, 5.0))
+            else:
+                source, destination = rng.sample(sorted(trade.planets), 2)
+                trade.remove_route(source, destination)
+                if (source, destination) in routes:
+                    cost, _ = routes[(source, destination)]
+                    routes[(source, destination)] = routes[(destination, source)] = (cost, 0.0)
+            plan = trade.solve()
+            _assert_optimal(plan, balances, routes)
+
+            cold = TradeNetwork(trade.planets.values(), shortage_cost=SHORTAGE_COST, balance=trade.balance)
+            for (source, destination), (cost, capacity) in routes.items():
+                cold.set_route(source, destination, cost, capacity, both_ways=False)
+            expected = _total_cost(cold.solve())
+            assert abs(_total_cost(plan) - expected) < 1e-6 * expected, f"Seed {seed}, step {step}: costlier plan"
+
+    # A small change costs a few searches, not a full solve
+    trade, balances, routes, _ = _network(200, 99)
+    trade.solve()
+    cold = trade.searches
+    balances["P7"][0] += 5.0
+    trade.solve()
+    assert trade.searches - cold < cold / 10, "Re-solve searched as much as a cold solve"
+    searches = trade.searches
+    assert trade.solve() == trade.plan() and trade.searches == searches, "Unchanged network re-solved"
+
+    print("  ✓ Balance and route changes re-solve to the optimal cost")
+    print("  ✓ Small changes take a fraction of the searches")
+
+
+def test_planets_come_and_go():
+    """Test adding and removing planets between solves."""
+    print("Testing planet changes...")
+
+    trade, balances, routes, _ = _network(12, 3)
+    trade.solve()
+
+    removed = trade.remove_planet("P4")
+    assert removed.name == "P4" and "P4" not in trade.planets
+    del balances["P4"]
+    routes = {pair: route for pair, route in routes.items() if "P4" not in pair}
+    plan = trade.solve()
+    assert all("P4" not in (t.source, t.destination) for t in plan.transfers), "Removed planet still trades"
+    _assert_optimal(plan, balances, routes)
+
+    newcomer = PlanetState(name="P4")
+    balances["P4"] = [-40.0] * len(RESOURCE_ORDER)
+    trade.add_planet(newcomer)
+    trade.set_route("P4", "P0", 1.0)
+    routes[("P4", "P0")] = routes[("P0", "P4")] = (1.0, math.inf)
+    _assert_optimal(trade.solve(), balances, routes)
+
+    print("  ✓ Removed planets drop out of the plan; new ones join it")
+
+
+def test_ship_moves_stockpiles():
+    """Test shipping a plan built from real planet balances."""
+    print("Testing shipments...")
+
+    farmer = PlanetState(name="Kepler", population=100)
+    for _ in range(4):
+        farmer.buildings.append(create_building(BuildingType.FARM))
+    for _ in range(2):
+        farmer.buildings.append(create_building(BuildingType.POWER_PLANT))
+    city = PlanetState(name="Proxima", population=800)
+    city.buildings.append(create_building(BuildingType.POWER_PLANT))
+    for planet in (farmer, city):
+        planet.process_turn()
+
+    food = ResourceType.FOOD.index
+    assert planet_balance(farmer)[food] > 0 > planet_balance(city)[food], "Balances not surplus and deficit"
+
+    trade = TradeNetwork([farmer, city])
+    trade.set_route("Kepler", "Proxima", 1.0)
+    plan = trade.solve()
+    sent = sum(t.amount for t in plan.transfers if t.resource is ResourceType.FOOD)
+    expected = min(planet_balance(farmer)[food], -planet_balance(city)[food])
+    assert abs(sent - expected) < 1e-9, "Food shipment does not match the balances"
+
+    before = farmer.resources[ResourceType.FOOD], city.resources[ResourceType.FOOD]
+    trade.ship(plan)
+    assert abs(farmer.resources[ResourceType.FOOD] - (before[0] - sent)) < 1e-9
+    assert abs(city.resources[ResourceType.FOOD] - (before[1] + sent)) < 1e-9
+
+    # A sender short of stock ships what it has
+    farmer.resources[ResourceType.FOOD] = sent / 4
+    city_food = city.resources[ResourceType.FOOD]
+    trade.ship(plan)
+    assert farmer.resources[ResourceType.FOOD] == 0.0
+    assert abs(city.resources[ResourceType.FOOD] - (city_food + sent / 4)) < 1e-9
+
+    print("  ✓ Plans follow planet_balance and move stock between planets")
+    print("  ✓ Shipments never overdraw a stockpile")
+
+
+def test_invalid_networks():
+    """Test rejection of malformed planets and routes."""
+    print("Testing invalid input...")
+
+    trade = TradeNetwork([PlanetState(name="Kepler"), PlanetState(name="Proxima")])
+    attempts = [
+        lambda: TradeNetwork(shortage_cost=0),
+        lambda: trade.add_planet(PlanetState(name="Kepler")),
+        lambda: trade.set_route("Kepler", "Proxima", -1.0),
+        lambda: trade.set_route("Kepler", "Proxima", 1.0, capacity=-5.0),
+        lambda: trade.set_route("Kepler", "Proxima", math.nan),
+        lambda: trade.set_route("Kepler", "Proxima", math.inf),
+        lambda: trade.set_route("Kepler", "Proxima", 1.0, capacity=math.nan),
+        lambda: trade.set_route("Kepler", "Kepler", 1.0),
+        lambda: trade.set_route("Kepler", "Vega", 1.0),
+        lambda: trade.remove_route("Vega", "Kepler"),
+    ]
+    for attempt in attempts:
+        try:
+            attempt()
+            assert False, "Invalid input accepted"
+        except ValueError:
+            pass
+
+    print("  ✓ Bad costs, capacities, planets and routes are rejected")
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [
+        test_plans_are_optimal,
+        test_incremental_matches_cold,
+        test_planets_come_and_go,
+        test_ship_moves_stockpiles,
+        test_invalid_networks,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+
+    print(f"\nRESULTS: {len(tests) - failed} passed, {failed} failed out of {len(tests)} tests")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
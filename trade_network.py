@@ -0,0 +1,616 @@
+"""
+Genesis Frontier - Trade Network
+Standing shipments between planets, planned as a min-cost flow over trade routes.
+"""
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import collections
+import heapq
+import math
+
+from resource_economy import PlanetState, ResourceType, RESOURCE_ORDER
+
+# Amounts at or below this count as zero (rounding residue of augmenting)
+EPSILON = 1e-9
+
+# Arcs with reduced cost at or below this count as shortest-path arcs
+SLACK = 1e-7
+
+# Node 0 is the market: it takes surplus no planet needs and stands in for
+# deficits no route can cover
+MARKET = 0
+
+# Search heap entries standing for the market's next planet with unshipped
+# surplus to hand back and its next planet to send a shortage to
+_SPARES = -1
+_SHORTAGES = -2
+
+
+def planet_balance(planet: PlanetState) -> List[float]:
+    """
+    Per-turn surplus (positive) or deficit (negative) of every resource,
+    indexed like RESOURCE_ORDER: net production at current efficiencies less
+    population food and building energy.
+    """
+    return [
+        output - upkept - consumed
+        for output, upkept, consumed in zip(planet._output, planet._upkeep, planet._consumption_vector())
+    ]
+
+
+class _Candidates:
+    """
+    Nodes in order of highest potential, so a search can leave the market
+    by its cheapest arcs without relaxing the arc to every planet.
+    Potentials only ever fall, so a stale entry surfaces early and is
+    re-keyed then; nodes that no longer qualify are dropped as they surface.
+    """
+    __slots__ = ("_heap", "_listed", "_potentials", "_qualifies")
+
+    def __init__(self, potentials: List[float], qualifies: Callable[[int], bool]):
+        self._heap: List[Tuple[float, int]] = []
+        self._listed = bytearray()
+        self._potentials = potentials
+        self._qualifies = qualifies
+
+    def add(self, node: int):
+        listed = self._listed
+        if node >= len(listed):
+            listed.extend(bytes(node + 1 - len(listed)))
+        if not listed[node]:
+            listed[node] = 1
+            heapq.heappush(self._heap, (-self._potentials[node], node))
+
+    def peek(self) -> Optional[int]:
+        heap = self._heap
+        while heap:
+            key, node = heap[0]
+            if not self._qualifies(node):
+                heapq.heappop(heap)
+                self._listed[node] = 0
+                continue
+            current = -self._potentials[node]
+            if key != current:
+                heapq.heapreplace(heap, (current, node))
+                continue
+            return node
+        return None
+
+    def pop(self) -> int:
+        """Take the top node out for the length of a search (see restore)."""
+        self.peek()
+        return heapq.heappop(self._heap)[1]
+
+    def restore(self, nodes: List[int]):
+        for node in nodes:
+            heapq.heappush(self._heap, (-self._potentials[node], node))
+
+
+class Transfer(NamedTuple):
+    """Units of one resource shipped along one route each turn."""
+    resource: ResourceType
+    source: str
+    destination: str
+    amount: float
+
+
+class TradePlan(NamedTuple):
+    """
+    Per-turn shipments, their total route cost, and per resource the
+    deficits left unmet and the surplus left unshipped.
+    """
+    transfers: List[Transfer]
+    cost: float
+    shortfall: Dict[ResourceType, float]
+    unshipped: Dict[ResourceType, float]
+
+
+class TradeNetwork:
+    """
+    Trade routes between planets and the cheapest shipments balancing them.
+
+    Every planet's per-turn surplus or deficit (planet_balance, or any
+    `balance` callable returning a list indexed like RESOURCE_ORDER) is
+    routed over one-way routes with a per-unit cost and an optional
+    per-turn capacity. Each resource is planned on its own, so a capacity
+    applies to each resource separately. Deficits are met whenever a route
+    path costs less than `shortage_cost` per unit; whatever is left shows up
+    as the plan's shortfall and unshipped surplus.
+
+    The plan is a min-cost flow, found by successive shortest paths
+    (Dijkstra on reduced costs) over the sparse route graph. The flow and
+    node potentials are kept between solves, so a re-solve only routes what
+    changed: new surpluses and deficits, flow cut off by a route change, and
+    cheaper cycles a changed route opened up.
+    """
+
+    def __init__(self, planets: Iterable[PlanetState] = (), shortage_cost: float = 1e6,
+                 balance: Callable[[PlanetState], List[float]] = planet_balance):
+        if not shortage_cost > 0:
+            raise ValueError("Shortage cost must be positive")
+        self._shortage_cost = shortage_cost
+        self.balance = balance
+        self.planets: Dict[str, PlanetState] = {}
+        self.searches = 0  # shortest-path searches run so far
+
+        self._nodes: Dict[str, int] = {}
+        self._names: List[Optional[str]] = [None]
+        self._adjacent: List[List[int]] = [[]]
+        # Every planet's route to the market; the market's route back is next
+        self._market_routes = [-1]
+
+        # Route r is the arc pair 2r (forward) and 2r + 1 (its residual
+        # reverse); arcs carry their head node and signed per-unit cost.
+        # Columns are plain lists, which the searches index fastest
+        self._routes: Dict[Tuple[int, int], int] = {}
+        self._capacities: List[float] = []
+        self._heads: List[int] = []
+        self._costs: List[float] = []
+
+        # Per resource, indexed like RESOURCE_ORDER: the residual capacity of
+        # every arc (a route's flow is its reverse arc's residual), and per
+        # node the balance already in the flow, the part of it not yet
+        # routed, and the node potential
+        self._residuals: List[List[float]] = [[] for _ in RESOURCE_ORDER]
+        self._supplies = [[0.0] for _ in RESOURCE_ORDER]
+        self._excess = [[0.0] for _ in RESOURCE_ORDER]
+        self._potentials = [[0.0] for _ in RESOURCE_ORDER]
+
+        # Per resource, the planets the market leaves to, cheapest first: every
+        # planet by its shortage arc, and planets with unshipped surplus by
+        # the reverse of their arc in
+        self._shortages = [_Candidates(potentials, lambda node: True) for potentials in self._potentials]
+        self._spares = [
+            _Candidates(potentials, lambda node, residuals=residuals:
+                        residuals[2 * self._market_routes[node] + 1] > EPSILON)
+            for potentials, residuals in zip(self._potentials, self._residuals)
+        ]
+
+        for planet in planets:
+            self.add_planet(planet)
+
+    @property
+    def shortage_cost(self) -> float:
+        """Per-unit cost of leaving a deficit unmet (fixed at construction)."""
+        return self._shortage_cost
+
+    # Planets and routes
+
+    def add_planet(self, planet: PlanetState):
+        """Add a planet; its balance is read on every solve."""
+        if planet.name in self.planets:
+            raise ValueError(f"Planet {planet.name!r} is already in the network")
+        node = len(self._names)
+        self.planets[planet.name] = planet
+        self._nodes[planet.name] = node
+        self._names.append(planet.name)
+        self._adjacent.append([])
+        for supplies, excess, potentials in zip(self._supplies, self._excess, self._potentials):
+            supplies.append(0.0)
+            excess.append(0.0)
+            # Level with the market, so both market arcs keep reduced cost >= 0
+            potentials.append(potentials[MARKET])
+        self._market_routes.append(len(self._capacities))
+        self._add_route(node, MARKET, 0.0, math.inf)
+        self._add_route(MARKET, node, self._shortage_cost, math.inf)
+        for shortages in self._shortages:
+            shortages.add(node)
+
+    def remove_planet(self, name: str) -> PlanetState:
+        """Drop a planet and close its routes; its shipments are re-routed on the next solve."""
+        node = self._nodes[name]
+        for (tail, head), route in self._routes.items():
+            if MARKET != tail == node or MARKET != head == node:
+                self._change_route(route, self._costs[2 * route], 0.0)
+        self._set_balance(node, [0.0] * len(RESOURCE_ORDER))
+        del self._nodes[name]
+        return self.planets.pop(name)
+
+    def set_route(self, source: str, destination: str, cost: float,
+                  capacity: float = math.inf, both_ways: bool = True):
+        """
+        Open a route, or change its per-unit cost or per-turn capacity.
+        With both_ways the return route gets the same cost and capacity.
+        """
+        if not 0 <= cost < math.inf:
+            raise ValueError("Route cost must be a finite non-negative number")
+        if not capacity >= 0:
+            raise ValueError("Route capacity must be a non-negative number")
+        tail, head = self._node(source), self._node(destination)
+        if tail == head:
+            raise ValueError("A route needs two different planets")
+        pairs = [(tail, head), (head, tail)] if both_ways else [(tail, head)]
+        for pair in pairs:
+            route = self._routes.get(pair)
+            if route is None:
+                self._add_route(*pair, cost, capacity)
+            else:
+                self._change_route(route, cost, capacity)
+
+    def remove_route(self, source: str, destination: str, both_ways: bool = True):
+        """Close a route (and with both_ways its return route)."""
+        tail, head = self._node(source), self._node(destination)
+        pairs = [(tail, head), (head, tail)] if both_ways else [(tail, head)]
+        for pair in pairs:
+            route = self._routes.get(pair)
+            if route is not None:
+                self._change_route(route, self._costs[2 * route], 0.0)
+
+    def _node(self, name: str) -> int:
+        node = self._nodes.get(name)
+        if node is None:
+            raise ValueError(f"Planet {name!r} is not in the network")
+        return node
+
+    def _add_route(self, tail: int, head: int, cost: float, capacity: float):
+        route = len(self._capacities)
+        self._routes[(tail, head)] = route
+        self._capacities.append(capacity)
+        self._heads.extend((head, tail))
+        self._costs.extend((cost, -cost))
+        self._adjacent[tail].append(2 * route)
+        self._adjacent[head].append(2 * route + 1)
+        for resource, residuals in enumerate(self._residuals):
+            residuals.extend((capacity, 0.0))
+            self._cancel_cycles(resource, 2 * route)
+
+    def _change_route(self, route: int, cost: float, capacity: float):
+        self._capacities[route] = capacity
+        self._costs[2 * route] = cost
+        self._costs[2 * route + 1] = -cost
+        tail, head = self._heads[2 * route + 1], self._heads[2 * route]
+        for resource, (residuals, excess) in enumerate(zip(self._residuals, self._excess)):
+            # Flow over the new capacity goes back to be routed some other way
+            flow = residuals[2 * route + 1]
+            if flow > capacity:
+                excess[tail] += flow - capacity
+                excess[head] -= flow - capacity
+                flow = residuals[2 * route + 1] = capacity
+            residuals[2 * route] = capacity - flow
+            # A cheaper route may undercut paths in use, a dearer one may be
+            # worth leaving
+            self._cancel_cycles(resource, 2 * route)
+            self._cancel_cycles(resource, 2 * route + 1)
+
+    # Solving
+
+    def solve(self) -> TradePlan:
+        """Read every planet's balance, re-route what changed and return the plan."""
+        for name, planet in self.planets.items():
+            self._set_balance(self._nodes[name], self.balance(planet))
+        for resource in range(len(RESOURCE_ORDER)):
+            self._route_excess(resource)
+        return self.plan()
+
+    def plan(self) -> TradePlan:
+        """The plan as of the last solve."""
+        transfers = []
+        cost = 0.0
+        shortfall = {}
+        unshipped = {}
+        heads, costs, names = self._heads, self._costs, self._names
+        for resource_type, residuals in zip(RESOURCE_ORDER, self._residuals):
+            short = spare = 0.0
+            for route in range(len(self._capacities)):
+                flow = residuals[2 * route + 1]
+                if flow <= EPSILON:
+                    continue
+                tail, head = heads[2 * route + 1], heads[2 * route]
+                if head == MARKET:
+                    spare += flow
+                elif tail == MARKET:
+                    short += flow
+                else:
+                    transfers.append(Transfer(resource_type, names[tail], names[head], flow))
+                    cost += flow * costs[2 * route]
+            shortfall[resource_type] = short
+            unshipped[resource_type] = spare
+        return TradePlan(transfers, cost, shortfall, unshipped)
+
+    def _set_balance(self, node: int, balance: List[float]):
+        for supplies, excess, amount in zip(self._supplies, self._excess, balance):
+            change = amount - supplies[node]
+            if change:
+                supplies[node] = amount
+                excess[node] += change
+                # The market takes up the other side, so the problem stays balanced
+                supplies[MARKET] -= change
+                excess[MARKET] -= change
+
+    def _route_excess(self, resource: int):
+        """
+        Send every node's unrouted surplus along shortest paths to unrouted
+        deficits, a phase at a time: one search from every surplus at once,
+        then flow down its shortest-path tree to each deficit it reached,
+        and as much more as the arcs it left at zero reduced cost can carry.
+        """
+        residuals, excess = self._residuals[resource], self._excess[resource]
+        heads = self._heads
+        while True:
+            sources = self._sources(excess)
+            if not sources:
+                return
+            ends, settled, parents = self._search(resource, sources)
+            if not ends:
+                # Only rounding residue is left short
+                return
+            self._lower_potentials(resource, settled, settled[ends[-1]])
+
+            # Every tree arc now has zero reduced cost, so each of these
+            # paths is still a shortest one after the pushes before it
+            for end in ends:
+                arcs = self._path(parents, end)
+                source = heads[arcs[-1] ^ 1]
+                amount = min(excess[source], -excess[end], min(residuals[arc] for arc in arcs))
+                if amount > EPSILON:
+                    self._push(resource, arcs, amount)
+                    excess[source] -= amount
+                    excess[end] += amount
+            while self._push_blocking_flow(resource):
+                pass
+
+    def _sources(self, excess: List[float]) -> List[int]:
+        """
+        Nodes with unrouted surplus. The market's (shortage the routes
+        cannot cover) goes out only once the planets' is routed: it is the
+        dearest to place, and searching for it first would sweep the whole
+        network every phase.
+        """
+        sources = [node for node, amount in enumerate(excess) if amount > EPSILON and node != MARKET]
+        if not sources and excess[MARKET] > EPSILON:
+            sources.append(MARKET)
+        return sources
+
+    def _push_blocking_flow(self, resource: int) -> bool:
+        """
+        One round of Dinic's max-flow over the arcs at zero reduced cost,
+        from every unrouted surplus to every unrouted deficit. Flow in use
+        leaves most arcs there, so this routes far more than the tree
+        paths. Returns whether anything was pushed.
+        """
+        residuals, excess = self._residuals[resource], self._excess[resource]
+        heads = self._heads
+        sources = self._sources(excess)
+
+        # Levels by hops from the sources, up to the nearest deficits
+        levels = dict.fromkeys(sources, 0)
+        forward: Dict[int, List[int]] = {}
+        queue = collections.deque(sources)
+        deficit_level = None
+        while queue:
+            node = queue.popleft()
+            if excess[node] < -EPSILON:
+                deficit_level = levels[node]
+                continue
+            level = levels[node] + 1
+            if deficit_level is not None and level > deficit_level:
+                continue
+            arcs = forward[node] = []
+            for arc in self._admissible_arcs(resource, node):
+                head = heads[arc]
+                head_level = levels.get(head)
+                if head_level is None:
+                    levels[head] = level
+                    queue.append(head)
+                    arcs.append(arc)
+                elif head_level == level:
+                    arcs.append(arc)
+        if deficit_level is None:
+            return False
+
+        # Augment down the levels, dropping arcs as they fill and nodes as
+        # they dead-end
+        pushed = False
+        positions: Dict[int, int] = {}
+        dead = set()
+        for source in sources:
+            while excess[source] > EPSILON:
+                path = []
+                node = source
+                while excess[node] >= -EPSILON:
+                    arcs = forward.get(node, ())
+                    position = positions.get(node, 0)
+                    while position < len(arcs) and (residuals[arcs[position]] <= EPSILON
+                                                    or heads[arcs[position]] in dead):
+                        position += 1
+                    positions[node] = position
+                    if position < len(arcs):
+                        path.append(arcs[position])
+                        node = heads[arcs[position]]
+                        continue
+                    dead.add(node)
+                    if not path:
+                        break
+                    node = heads[path.pop() ^ 1]
+                if not path:
+                    break
+                amount = min(excess[source], -excess[node], min(residuals[arc] for arc in path))
+                self._push(resource, path, amount)
+                excess[source] -= amount
+                excess[node] += amount
+                pushed = True
+        return pushed
+
+    def _admissible_arcs(self, resource: int, node: int) -> List[int]:
+        """Residual arcs out of `node` at zero reduced cost."""
+        residuals, potentials = self._residuals[resource], self._potentials[resource]
+        heads, costs = self._heads, self._costs
+        if node != MARKET:
+            base = potentials[node]
+            return [
+                arc for arc in self._adjacent[node]
+                if residuals[arc] > EPSILON and base + costs[arc] - potentials[heads[arc]] <= SLACK
+            ]
+        # Pools list the market's arcs cheapest first
+        arcs = []
+        market = potentials[MARKET]
+        for pool, cost, offset in ((self._shortages[resource], self._shortage_cost, 2),
+                                   (self._spares[resource], 0.0, 1)):
+            taken = []
+            while True:
+                planet = pool.peek()
+                if planet is None or market + cost - potentials[planet] > SLACK:
+                    break
+                taken.append(pool.pop())
+                arcs.append(2 * self._market_routes[planet] + offset)
+            pool.restore(taken)
+        return arcs
+
+    def _cancel_cycles(self, resource: int, arc: int):
+        """
+        Restore optimality around one arc whose reduced cost went negative:
+        push flow round every cycle through it that is still a saving, then
+        lift the potentials so the arc prices at zero or more.
+        """
+        residuals, potentials = self._residuals[resource], self._potentials[resource]
+        tail, head = self._heads[arc ^ 1], self._heads[arc]
+        while True:
+            saving = -(self._costs[arc] + potentials[tail] - potentials[head])
+            if residuals[arc] <= EPSILON or saving <= EPSILON:
+                return
+            ends, settled, parents = self._search(resource, [head], target=tail)
+            if not ends or settled[tail] >= saving:
+                self._lower_potentials(resource, settled, saving)
+                return
+            self._lower_potentials(resource, settled, settled[tail])
+            arcs = self._path(parents, tail) + [arc]
+            self._push(resource, arcs, min(residuals[arc] for arc in arcs))
+
+    def _search(self, resource: int, sources: List[int], target: Optional[int] = None):
+        """
+        Dijkstra over residual arcs by reduced cost from every source at
+        once, up to `target`, or else until it has reached unrouted deficits
+        enough to take the sources' whole surplus (or everything reachable).
+        Returns the deficit nodes reached (or [target]) in the order they
+        were settled, the settled distances and the arc each reached node
+        was reached by.
+        """
+        self.searches += 1
+        residuals, excess, potentials = self._residuals[resource], self._excess[resource], self._potentials[resource]
+        heads, costs, adjacent, market_routes = self._heads, self._costs, self._adjacent, self._market_routes
+        pools = {_SPARES: self._spares[resource], _SHORTAGES: self._shortages[resource]}
+        taken = {_SPARES: [], _SHORTAGES: []}
+        distances = dict.fromkeys(sources, 0.0)
+        heap = [(0.0, source) for source in sources]
+        settled: Dict[int, float] = {}
+        parents: Dict[int, int] = {}
+        wanted = sum(excess[source] for source in sources)
+        ends = []
+        market = 0.0
+
+        def offer(pool: int, distance: float):
+            # Queue the pool's best planet at its distance from the market
+            node = pools[pool].peek()
+            if node is not None:
+                reached = market - potentials[node]
+                if pool == _SHORTAGES:
+                    reached += self._shortage_cost
+                heapq.heappush(heap, (max(reached, distance), pool))
+
+        try:
+            while heap:
+                distance, node = heapq.heappop(heap)
+                if node < 0:
+                    pool = node
+                    node = pools[pool].pop()
+                    taken[pool].append(node)
+                    route = market_routes[node]
+                    arc = 2 * route + 1 if pool == _SPARES else 2 * route + 2
+                    if node not in settled and distance < distances.get(node, math.inf):
+                        distances[node] = distance
+                        parents[node] = arc
+                        heapq.heappush(heap, (distance, node))
+                    offer(pool, distance)
+                    continue
+                if node in settled:
+                    continue
+                settled[node] = distance
+                if target is None:
+                    if excess[node] < -EPSILON:
+                        ends.append(node)
+                        wanted += excess[node]
+                        if wanted <= EPSILON:
+                            return ends, settled, parents
+                elif node == target:
+                    return [node], settled, parents
+
+                if node == MARKET:
+                    # The market has arcs to every planet; rather than relax
+                    # them all, leave by them one at a time, nearest first
+                    market = distance + potentials[MARKET]
+                    offer(_SHORTAGES, distance)
+                    offer(_SPARES, distance)
+                    continue
+
+                base = distance + potentials[node]
+                for arc in adjacent[node]:
+                    if residuals[arc] <= EPSILON:
+                        continue
+                    head = heads[arc]
+                    if head in settled:
+                        continue
+                    reached = base + costs[arc] - potentials[head]
+                    if reached < distance:
+                        # Reduced costs are never negative; this is rounding
+                        reached = distance
+                    if reached < distances.get(head, math.inf):
+                        distances[head] = reached
+                        parents[head] = arc
+                        heapq.heappush(heap, (reached, head))
+            return ends, settled, parents
+        finally:
+            for pool, nodes in taken.items():
+                pools[pool].restore(nodes)
+
+    def _lower_potentials(self, resource: int, settled: Dict[int, float], cap: float):
+        # Unsettled nodes are at least `cap` away; settled nodes closer than
+        # that drop by the difference, keeping every residual reduced cost >= 0
+        potentials = self._potentials[resource]
+        for node, distance in settled.items():
+            if distance < cap:
+                potentials[node] -= cap - distance
+
+    def _path(self, parents: Dict[int, int], end: int) -> List[int]:
+        """Arcs from the search source to `end`, last arc first."""
+        arcs = []
+        node = end
+        while node in parents:
+            arc = parents[node]
+            arcs.append(arc)
+            node = self._heads[arc ^ 1]
+        return arcs
+
+    def _push(self, resource: int, arcs: List[int], amount: float):
+        residuals, heads = self._residuals[resource], self._heads
+        for arc in arcs:
+            residuals[arc] -= amount
+            residuals[arc ^ 1] += amount
+            if heads[arc] == MARKET and not arc & 1:
+                # Surplus left unshipped, for the market to hand back later
+                self._spares[resource].add(heads[arc ^ 1])
+
+    # Shipping
+
+    def ship(self, plan: TradePlan):
+        """
+        Move one turn of a plan's shipments between the planets' stockpiles.
+        A resource's shipments are scaled down together when a planet cannot
+        cover what it sends on, so no stockpile goes below zero.
+        """
+        changes = {name: [0.0] * len(RESOURCE_ORDER) for name in self.planets}
+        for transfer in plan.transfers:
+            index = transfer.resource.index
+            changes[transfer.source][index] -= transfer.amount
+            changes[transfer.destination][index] += transfer.amount
+
+        for resource_type in RESOURCE_ORDER:
+            index = resource_type.index
+            scale = 1.0
+            for name, change in changes.items():
+                if change[index] < 0:
+                    stock = max(self.planets[name].resources.get(resource_type, 0.0), 0.0)
+                    scale = min(scale, stock / -change[index])
+            for name, change in changes.items():
+                if change[index]:
+                    resources = self.planets[name].resources
+                    resources[resource_type] = resources.get(resource_type, 0.0) + scale * change[index]